@@ -0,0 +1,239 @@
+from collections.abc import Mapping
+from datetime import datetime
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, insert, and_, func, case, Float
+
+from database_schema import (
+    db, RiskPrediction, RiskCategory, Alert, WellnessData, SurveyResponse, SurveyQuestion
+)
+from alert_stream import record_alert_events
+from response_cache import bump_data_versions
+
+# Rules applied to every batch of new predictions. Each fires at most one
+# alert of its alert_type per user; set a rule to None to disable it.
+ALERT_RULES = {
+    # Score rose by at least min_increase since the user's previous prediction
+    'score_jump': {'alert_type': 'risk_increase', 'priority': 'high', 'min_increase': 15},
+    # Critical prediction the model is reasonably sure of
+    'critical_risk': {'alert_type': 'high_risk', 'priority': 'urgent', 'min_confidence': 0.6},
+    # Latest wellness week at or above either threshold
+    'overtime': {'alert_type': 'overtime', 'priority': 'high', 'hours_per_week': 60, 'overtime_hours': 15},
+    # Average pulse-survey scale answer fell by at least min_drop since the previous survey
+    'survey_decline': {'alert_type': 'survey_concern', 'priority': 'medium', 'min_drop': 1.5}
+}
+OPEN_ALERT_STATUSES = ('active', 'acknowledged')
+CHUNK_SIZE = 500  # Keeps IN (...) lists well under database parameter limits
+
+predictions = RiskPrediction.__table__
+alerts = Alert.__table__
+wellness = WellnessData.__table__
+responses = SurveyResponse.__table__
+questions = SurveyQuestion.__table__
+
+
+def alert_rules(overrides=None):
+    """ALERT_RULES with per-rule overrides merged in (a rule overridden with None is disabled)"""
+    rules = {name: dict(rule) for name, rule in ALERT_RULES.items()}
+    for name, override in (overrides or {}).items():
+        if name not in rules:
+            raise ValueError(f"Unknown alert rule '{name}' (expected one of: {', '.join(ALERT_RULES)})")
+        rules[name] = None if override is None else {**(rules[name] or {}), **override}
+    return rules
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, Mapping) else getattr(row, name)
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _previous_scores(connection, latest):
+    """user_id -> (prediction_date, risk_score) of each user's newest prediction other than the given one"""
+    previous = {}
+    for chunk in _chunks(latest.items()):
+        user_ids, exclude = [user_id for user_id, _ in chunk], [p['id'] for _, p in chunk]
+        # MAX per user walks ix_risk_predictions_user_date; a window over the history is about twice as slow
+        newest = select(predictions.c.user_id, func.max(predictions.c.prediction_date).label('prediction_date')).where(
+            predictions.c.user_id.in_(user_ids), predictions.c.id.notin_(exclude)
+        ).group_by(predictions.c.user_id).subquery()
+        for row in connection.execute(
+            select(predictions.c.user_id, predictions.c.prediction_date, predictions.c.risk_score)
+            .join(newest, and_(
+                predictions.c.user_id == newest.c.user_id, predictions.c.prediction_date == newest.c.prediction_date
+            ))
+            .where(predictions.c.id.notin_(exclude)).order_by(predictions.c.id)
+        ):
+            previous[row.user_id] = (row.prediction_date, row.risk_score)  # Highest id wins a date tie
+    return previous
+
+
+def _latest_wellness(connection, user_ids):
+    """user_id -> (date, hours_per_week, overtime_hours) of each user's latest wellness week"""
+    latest = {}
+    for chunk in _chunks(user_ids):
+        newest = select(wellness.c.user_id, func.max(wellness.c.date).label('date')).where(
+            wellness.c.user_id.in_(chunk)
+        ).group_by(wellness.c.user_id).subquery()
+        for row in connection.execute(
+            select(wellness.c.user_id, wellness.c.date, wellness.c.hours_per_week, wellness.c.overtime_hours)
+            .join(newest, and_(wellness.c.user_id == newest.c.user_id, wellness.c.date == newest.c.date))
+        ):
+            latest[row.user_id] = (row.date, row.hours_per_week, row.overtime_hours)
+    return latest
+
+
+def _survey_averages(connection, user_ids):
+    """user_id -> [(day, mean scale answer)] for each user's two most recent survey days, newest first"""
+    averages = {}
+    for chunk in _chunks(user_ids):
+        day = func.date(responses.c.response_date)
+        per_day = select(
+            responses.c.user_id, day.label('day'),
+            func.avg(func.cast(responses.c.response_value, Float)).label('average'),
+            func.row_number().over(partition_by=responses.c.user_id, order_by=day.desc()).label('rank')
+        ).join(questions, questions.c.id == responses.c.question_id).where(
+            responses.c.user_id.in_(chunk), questions.c.question_type == 'scale'
+        ).group_by(responses.c.user_id, day).subquery()
+        for row in connection.execute(
+            select(per_day.c.user_id, per_day.c.day, per_day.c.average)
+            .where(per_day.c.rank <= 2).order_by(per_day.c.user_id, per_day.c.rank)
+        ):
+            averages.setdefault(row.user_id, []).append((row.day, row.average))
+    return averages
+
+
+def _alert_history(connection, user_ids, alert_types):
+    """(user_id, alert_type) -> (has an open alert, created_at of the newest alert)"""
+    history = {}
+    for chunk in _chunks(user_ids):
+        for row in connection.execute(
+            select(
+                alerts.c.user_id, alerts.c.alert_type,
+                func.max(case((alerts.c.status.in_(OPEN_ALERT_STATUSES), 1), else_=0)).label('open'),
+                func.max(alerts.c.created_at).label('newest')
+            ).where(alerts.c.user_id.in_(chunk), alerts.c.alert_type.in_(alert_types))
+            .group_by(alerts.c.user_id, alerts.c.alert_type)
+        ):
+            history[(row.user_id, row.alert_type)] = (bool(row.open), row.newest)
+    return history
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+
+
+def evaluate_alerts(connection, new_predictions, rules=None):
+    """Apply the alert rules to newly written predictions and bulk-insert the alerts they raise
+    
+    new_predictions may be RiskPrediction objects or mappings with id,
+    user_id, prediction_date, risk_category, risk_score and
+    confidence_score; only each user's latest one is evaluated. A user
+    gets no new alert of a type while one is still open, or when the
+    data that triggered it is not newer than the last such alert.
+    Returns the inserted alert rows.
+    """
+    if rules is None:
+        rules = current_app.config.get('ALERT_RULES', ALERT_RULES) if has_app_context() else ALERT_RULES
+    rules = {name: rule for name, rule in rules.items() if rule}
+    
+    latest = {}
+    for p in new_predictions:
+        p = {name: _field(p, name) for name in
+             ('id', 'user_id', 'prediction_date', 'risk_category', 'risk_score', 'confidence_score')}
+        current = latest.get(p['user_id'])
+        if current is None or (p['prediction_date'], p['id']) > (current['prediction_date'], current['id']):
+            latest[p['user_id']] = p
+    if not latest or not rules:
+        return []
+    
+    user_ids = np.fromiter(latest, dtype=np.int64, count=len(latest))
+    batch = list(latest.values())
+    predicted_at = [p['prediction_date'] for p in batch]
+    scores = np.array([p['risk_score'] for p in batch], dtype=float)
+    confidence = np.array([p['confidence_score'] for p in batch], dtype=float)
+    critical = np.array([RiskCategory(p['risk_category']) == RiskCategory.CRITICAL for p in batch])
+    
+    # candidates: (rule name, mask over batch, evidence time per user, message per user)
+    candidates = []
+    if 'score_jump' in rules:
+        previous = _previous_scores(connection, latest)
+        previous_scores = np.array([
+            previous[p['user_id']][1] if p['user_id'] in previous and previous[p['user_id']][0] <= p['prediction_date']
+            else np.nan
+            for p in batch
+        ], dtype=float)
+        jump = scores - previous_scores
+        with np.errstate(invalid='ignore'):
+            fired = jump >= rules['score_jump']['min_increase']
+        candidates.append(('score_jump', fired, predicted_at,
+                           lambda i: f"Risk score increased {jump[i]:.0f} points - schedule check-in"))
+    if 'critical_risk' in rules:
+        fired = critical & (confidence > rules['critical_risk']['min_confidence'])
+        candidates.append(('critical_risk', fired, predicted_at,
+                           lambda i: f"Critical burnout risk detected ({confidence[i]:.0%} confidence)"))
+    if 'overtime' in rules:
+        weeks = _latest_wellness(connection, latest)
+        week = [weeks.get(user_id, (None, None, None)) for user_id in latest]
+        hours = np.array([w[1] for w in week], dtype=float)
+        overtime = np.array([w[2] for w in week], dtype=float)
+        with np.errstate(invalid='ignore'):
+            fired = (hours >= rules['overtime']['hours_per_week']) | (overtime >= rules['overtime']['overtime_hours'])
+        candidates.append(('overtime', fired, [w[0] for w in week],
+                           lambda i: f"Worked {hours[i]:.0f} hours last week"
+                           if hours[i] >= rules['overtime']['hours_per_week']
+                           else f"Logged {overtime[i]:.0f} overtime hours last week"))
+    if 'survey_decline' in rules:
+        surveys = _survey_averages(connection, latest)
+        pairs = [surveys.get(user_id, []) for user_id in latest]
+        drop = np.array([pair[1][1] - pair[0][1] if len(pair) == 2 else np.nan for pair in pairs], dtype=float)
+        with np.errstate(invalid='ignore'):
+            fired = drop >= rules['survey_decline']['min_drop']
+        candidates.append(('survey_decline', fired, [pair[0][0] if pair else None for pair in pairs],
+                           lambda i: f"Pulse survey scores dropped {drop[i]:.1f} points since the previous survey"))
+    
+    fired_any = np.zeros(len(batch), dtype=bool)
+    for _, fired, _, _ in candidates:
+        fired_any |= fired
+    if not fired_any.any():
+        return []
+    
+    history = _alert_history(connection, user_ids[fired_any].tolist(), [rule['alert_type'] for rule in rules.values()])
+    now = datetime.utcnow()
+    rows = []
+    for name, fired, evidence, message in candidates:
+        rule = rules[name]
+        for i in np.flatnonzero(fired):
+            user_id = int(user_ids[i])
+            is_open, newest = history.get((user_id, rule['alert_type']), (False, None))
+            if is_open or (newest is not None and _as_datetime(evidence[i]) <= newest):
+                continue
+            # Rules sharing an alert_type raise one alert between them
+            history[(user_id, rule['alert_type'])] = (True, now)
+            rows.append({
+                'user_id': user_id, 'alert_type': rule['alert_type'], 'message': message(i),
+                'priority': rule['priority'], 'status': 'active', 'created_at': now
+            })
+    if rows:
+        ids = connection.execute(
+            insert(alerts).returning(alerts.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        for row, alert_id in zip(rows, ids):
+            row['id'] = alert_id
+        record_alert_events(connection, rows, 'created')
+        bump_data_versions(connection, [row['user_id'] for row in rows], user=False)
+    return rows
+
+
+@event.listens_for(db.session, 'after_flush')
+def _alert_new_predictions(session, flush_context):
+    """Evaluate the alert rules for predictions written through the ORM"""
+    new_predictions = [obj for obj in session.new if isinstance(obj, RiskPrediction)]
+    if new_predictions:
+        evaluate_alerts(session.connection(), new_predictions)
@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import event, inspect, select, insert, func
+
+from database_schema import db, User, Alert, AlertEvent
+
+QUEUE_SIZE = 256  # Undelivered events held per connection before it is told to resync
+POLL_BATCH_SIZE = 1000
+REPLAY_LIMIT = 5000  # Events replayed after a Last-Event-ID before the client is told to reload instead
+CHUNK_SIZE = 500  # Keeps IN (...) lists well under database parameter limits
+
+alert_events = AlertEvent.__table__
+alerts = Alert.__table__
+users = User.__table__
+
+
+def record_alert_events(connection, alert_rows, event_name):
+    """Log an event for each alert row (mappings with id, user_id and status) under the employee's current manager"""
+    alert_rows = list(alert_rows)
+    if not alert_rows:
+        return
+    managers = {}
+    user_ids = list({row['user_id'] for row in alert_rows})
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        managers.update(connection.execute(
+            select(users.c.id, users.c.manager_id).where(users.c.id.in_(user_ids[start:start + CHUNK_SIZE]))
+        ).all())
+    now = datetime.utcnow()
+    connection.execute(insert(alert_events), [
+        {'alert_id': row['id'], 'user_id': row['user_id'], 'manager_id': managers.get(row['user_id']),
+         'event': event_name, 'status': row['status'], 'created_at': now}
+        for row in alert_rows
+    ])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _log_alert_changes(session, flush_context):
+    """Log creations and status changes of alerts written through the ORM"""
+    created, changed = [], {}
+    for obj in session.new:
+        if isinstance(obj, Alert):
+            created.append({'id': obj.id, 'user_id': obj.user_id, 'status': obj.status})
+    for obj in session.dirty:
+        if isinstance(obj, Alert) and inspect(obj).attrs.status.history.has_changes():
+            changed.setdefault(obj.status, []).append({'id': obj.id, 'user_id': obj.user_id, 'status': obj.status})
+    record_alert_events(session.connection(), created, 'created')
+    for status, rows in changed.items():
+        record_alert_events(session.connection(), rows, status)
+
+
+def _event_query():
+    return select(
+        alert_events.c.id, alert_events.c.manager_id, alert_events.c.alert_id, alert_events.c.event,
+        alert_events.c.status, alert_events.c.created_at, alerts.c.alert_type, alerts.c.priority,
+        alerts.c.message, users.c.employee_id, users.c.display_name
+    ).join(alerts, alerts.c.id == alert_events.c.alert_id).join(users, users.c.id == alert_events.c.user_id)
+
+
+def _payload(row):
+    return {
+        'id': row.id,
+        'event': row.event,
+        'alert': {
+            'id': row.alert_id,
+            'employee_id': row.employee_id,
+            'employee': row.display_name,
+            'type': row.alert_type,
+            'message': row.message,
+            'priority': row.priority,
+            'status': row.status
+        },
+        'timestamp': row.created_at.isoformat()
+    }
+
+
+def replay_events(manager_user_id, after_event_id, limit=REPLAY_LIMIT):
+    """A manager's events after after_event_id, oldest first"""
+    rows = db.session.execute(
+        _event_query().where(alert_events.c.manager_id == manager_user_id, alert_events.c.id > after_event_id)
+        .order_by(alert_events.c.id).limit(limit)
+    ).all()
+    return [(row.id, _payload(row)) for row in rows]
+
+
+class Subscription:
+    """One connected stream's queue of undelivered (event id, payload) pairs"""
+    
+    def __init__(self, manager_user_id, after_event_id):
+        self.manager_user_id = manager_user_id
+        self.after_event_id = after_event_id  # Hub cursor when subscribed; later events arrive through the queue
+        self.overflowed = False
+        self._queue = deque()
+        self._ready = threading.Event()
+    
+    def put(self, item):
+        if len(self._queue) >= QUEUE_SIZE:
+            self.overflowed = True
+        else:
+            self._queue.append(item)
+        self._ready.set()
+    
+    def get(self, timeout):
+        """Wait up to timeout seconds and return the queued events (an empty list on timeout)"""
+        if self._ready.wait(timeout):
+            self._ready.clear()
+        items = []
+        while self._queue:
+            items.append(self._queue.popleft())
+        return items
+
+
+class AlertHub:
+    """Fans alert_events out to every connected stream in this process
+    
+    A single thread polls alert_events once per poll_seconds, whatever
+    the number of connections, and routes each event to the streams of
+    the employee's manager. Events written by other processes (batch
+    scoring, other workers) arrive the same way.
+    """
+    
+    def __init__(self, poll_seconds=1.0):
+        self.poll_seconds = poll_seconds
+        self.last_event_id = None
+        self.events_delivered = 0
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def start(self, app):
+        """Start polling from the newest existing event (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            with app.app_context():
+                self.last_event_id = db.session.execute(select(func.max(alert_events.c.id))).scalar() or 0
+            self._thread = threading.Thread(target=self._run, args=(app,), name='alert-hub', daemon=True)
+            self._thread.start()
+    
+    def subscribe(self, manager_user_id):
+        with self._lock:
+            subscription = Subscription(manager_user_id, self.last_event_id)
+            self._subscribers.setdefault(manager_user_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscribers.get(subscription.manager_user_id, set())
+            streams.discard(subscription)
+            if not streams:
+                self._subscribers.pop(subscription.manager_user_id, None)
+    
+    def publish(self, rows):
+        """Route polled event rows to their managers' streams and advance the cursor"""
+        with self._lock:
+            for row in rows:
+                for subscription in self._subscribers.get(row.manager_id, ()):
+                    subscription.put((row.id, _payload(row)))
+                    self.events_delivered += 1
+                self.last_event_id = row.id
+    
+    def poll(self):
+        rows = db.session.execute(
+            _event_query().where(alert_events.c.id > self.last_event_id)
+            .order_by(alert_events.c.id).limit(POLL_BATCH_SIZE)
+        ).all()
+        db.session.remove()
+        self.publish(rows)
+        return len(rows)
+    
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                try:
+                    if self.poll() == POLL_BATCH_SIZE:
+                        continue  # Catching up
+                except Exception:
+                    db.session.remove()
+                    app.logger.exception("Alert hub poll failed")
+                time.sleep(self.poll_seconds)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None,
+                'connections': sum(len(streams) for streams in self._subscribers.values()),
+                'managers': len(self._subscribers),
+                'last_event_id': self.last_event_id,
+                'events_delivered': self.events_delivered
+            }
+
+
+def format_event(event_id, payload, event_name='alert'):
+    return f"id: {event_id}\nevent: {event_name}\ndata: {json.dumps(payload)}\n\n"
+
+
+def event_stream(hub, subscription, replay, heartbeat_seconds=15):
+    """Server-sent events for one connection: the replayed events, then live ones until the client goes away
+    
+    Touches neither the database nor the request, so an idle connection
+    costs only a blocked wait on its queue: a greenlet under serve.py, but
+    a whole thread under a threaded server such as python app_backend.py. A connection that falls
+    QUEUE_SIZE events behind is sent a resync event and closed; the
+    browser reconnects with Last-Event-ID and catches up from the log.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        last_sent = 0
+        for event_id, payload in replay:
+            yield format_event(event_id, payload)
+            last_sent = event_id
+        while True:
+            items = subscription.get(heartbeat_seconds)
+            if subscription.overflowed:
+                yield format_event(max(last_sent, subscription.after_event_id), {'reason': 'overflow'}, 'resync')
+                return
+            if not items:
+                yield ": keep-alive\n\n"
+                continue
+            for event_id, payload in items:
+                if event_id > last_sent:
+                    yield format_event(event_id, payload)
+                    last_sent = event_id
+    finally:
+        hub.unsubscribe(subscription)
@@ -1,46 +1,116 @@
-from flask import Flask, jsonify, request, session
+from flask import Flask, Response, jsonify, make_response, request, session
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import numpy as np
-import joblib
 import os
 from functools import wraps
-import ldap3
+from concurrent.futures import ThreadPoolExecutor
+import click
 from werkzeug.security import check_password_hash
 import json
 
 # Import your ML model predictor
-from stress_predictor import RealisticMentalHealthPredictor
+from stress_predictor import (
+    RealisticMentalHealthPredictor, RAW_FEATURE_COLUMNS, TREND_FEATURE_COLUMNS, TREND_VERSION, RISK_SCORES
+)
+from model_loader import ModelLoader, ModelNotReady
+from prediction_cache import PredictionCache
+from database_schema import (
+    db, init_db, User, Alert, get_team_latest_data, get_team_recent_alerts, get_latest_prediction,
+    activate_model_version, record_trained_model
+)
+from batch_scoring import run_batch_scoring
+from wellness_ingest import ingest_wellness_file, ingest_wellness_request
+from synthetic_org import load_synthetic_org
+from streaming_training import train_from_wellness
+from feature_store import backfill_features, backfill_status, start_backfill
+from rolling_features import rebuild_stale_trends
+from risk_rollups import (
+    risk_rollup_period, parse_rollup_period, has_risk_rollups, get_department_rollups, rebuild_risk_rollups,
+    check_risk_rollups
+)
+from risk_trends import TREND_GRANULARITIES, periods_back, get_risk_trend, rebuild_risk_trends
+from alert_engine import alert_rules
+from alert_stream import AlertHub, REPLAY_LIMIT, replay_events, event_stream, format_event
+from listings import LISTINGS, PAGE_SIZE, MAX_PAGE_SIZE, EXPORT_FORMATS
+from directory import Directory, DirectoryUnavailable, MOCK_URL
+from response_cache import ResponseCache, ORG, user_scope, team_scope, read_data_versions, bump_epoch
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change in production
 app.config['JWT_SECRET_KEY'] = 'your-jwt-secret-key'  # Change in production
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['JWT_TOKEN_LOCATION'] = ['headers']  # ?jwt= is accepted only where EventSource needs it (see STREAM_TOKEN_LOCATIONS)
+app.config['MAX_PREDICTION_BATCH'] = 50000  # Records per /api/predict/risk/batch call
+app.config['PREDICTION_CACHE_ENABLED'] = os.environ.get('PREDICTION_CACHE_ENABLED', '1') != '0'
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///workwell.db')
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['MODEL_LOADING'] = os.environ.get('MODEL_LOADING', 'background')  # background or lazy
+app.config['MODEL_WAIT_SECONDS'] = float(os.environ.get('MODEL_WAIT_SECONDS', '10'))
+app.config['MODEL_WATCH_SECONDS'] = float(os.environ.get('MODEL_WATCH_SECONDS', '0'))  # 0 disables
+app.config['FEATURE_BACKFILL'] = os.environ.get('FEATURE_BACKFILL', '1') != '0'  # Backfill stale stored features once serving
+app.config['ALERT_STREAM_POLL_SECONDS'] = float(os.environ.get('ALERT_STREAM_POLL_SECONDS', '1'))
+app.config['ALERT_STREAM_HEARTBEAT_SECONDS'] = float(os.environ.get('ALERT_STREAM_HEARTBEAT_SECONDS', '15'))
+app.config['BOOTSTRAP_WORKERS'] = int(os.environ.get('BOOTSTRAP_WORKERS', '4'))  # Sections of one bootstrap run side by side
+app.config['LDAP_URL'] = os.environ.get('LDAP_URL', MOCK_URL)  # e.g. ldaps://dc1.corp.company.com; 'mock' serves MOCK_AD_USERS
+app.config['LDAP_BASE_DN'] = os.environ.get('LDAP_BASE_DN', 'DC=corp,DC=company,DC=com')
+app.config['LDAP_BIND_DN'] = os.environ.get('LDAP_BIND_DN')  # Service account for user searches
+app.config['LDAP_BIND_PASSWORD'] = os.environ.get('LDAP_BIND_PASSWORD')
+app.config['LDAP_POOL_SIZE'] = int(os.environ.get('LDAP_POOL_SIZE', '4'))
+app.config['LDAP_CACHE_SECONDS'] = float(os.environ.get('LDAP_CACHE_SECONDS', '300'))  # How long role changes take to apply
+app.config['LDAP_NEGATIVE_CACHE_SECONDS'] = float(os.environ.get('LDAP_NEGATIVE_CACHE_SECONDS', '60'))
+app.config['ALERT_RULES'] = alert_rules(json.loads(os.environ.get('ALERT_RULES', '{}')))  # Per-rule overrides as JSON
 
 # Enable CORS for React frontend
 CORS(app, supports_credentials=True)
 jwt = JWTManager(app)
+init_db(app)
 
-# Initialize ML model
-predictor = RealisticMentalHealthPredictor()
-model_path = 'models/realistic_mental_health_model.pkl'
-
-# Load or train model
-if os.path.exists(model_path):
-    model_data = joblib.load(model_path)
-    predictor.model = model_data['model']
-    predictor.scaler = model_data['scaler']
-    predictor.feature_names = model_data['feature_names']
-    predictor.feature_importance = model_data['feature_importance']
-else:
-    # Train model if not exists
-    training_data = predictor.create_realistic_data(n_samples=2000)
-    predictor.train_realistic_model(training_data)
-    predictor.save_model(model_path)
-
-# Mock AD users (same as frontend)
+# ML model: loaded off the import path and never trained inline
+# (create a missing artifact with: flask --app app_backend train-model).
+# A directory is a memory-mapped artifact shared by all workers; a .pkl is
+# unpickled per process.
+MODEL_NAME = 'realistic_mental_health_model'
+model_path = os.environ.get('MODEL_PATH', f'models/{MODEL_NAME}')
+models_dir = os.path.dirname(os.path.abspath(model_path))
+
+def record_live_model(predictor):
+    """Keep model_metrics in step with the model that is serving"""
+    with app.app_context():
+        activate_model_version(MODEL_NAME, predictor.model_version, predictor.training_metrics)
+
+model_loader = ModelLoader(model_path, mode=app.config['MODEL_LOADING'], on_load=record_live_model, logger=app.logger)
+if model_loader.mode == 'background':
+    model_loader.start()
+if app.config['MODEL_WATCH_SECONDS'] > 0:
+    # Hot-swap whenever a new artifact is written to model_path
+    model_loader.watch(app.config['MODEL_WATCH_SECONDS'])
+
+# Stored engineered features and trends are recomputed in the background
+# when FEATURE_VERSION changes. The first request starts it rather than the
+# import, so CLI commands never do; on PostgreSQL one process at a time runs
+# it. flask --app app_backend backfill-features does the same on demand.
+@app.before_request
+def start_feature_backfill():
+    if app.config['FEATURE_BACKFILL']:
+        start_backfill(app)
+
+# One poller per process fans new alert events out to every open alert stream
+alert_hub = AlertHub(poll_seconds=app.config['ALERT_STREAM_POLL_SECONDS'])
+
+# Cache of predict_risk results, invalidated whenever predictor.model_version changes
+prediction_cache = PredictionCache(max_entries=50000, ttl_seconds=6 * 3600)
+
+# Shared by all bootstrap requests; threads start on first use
+bootstrap_executor = ThreadPoolExecutor(max_workers=app.config['BOOTSTRAP_WORKERS'], thread_name_prefix='bootstrap')
+
+# Rendered dashboard responses, invalidated through the data_versions table
+response_cache = ResponseCache(max_entries=5000, max_bytes=64 * 1024 * 1024)
+
+# Users of the stand-in directory served when LDAP_URL is 'mock' (same as frontend)
 MOCK_AD_USERS = {
     'sarah.johnson@corp.company.com': {
         'password': 'employee123',
@@ -115,6 +185,14 @@ MOCK_AD_USERS = {
     }
 }
 
+# Directory lookups are cached, so only logins and cache misses reach the LDAP server
+directory = Directory(
+    app.config['LDAP_URL'], base_dn=app.config['LDAP_BASE_DN'], bind_dn=app.config['LDAP_BIND_DN'],
+    bind_password=app.config['LDAP_BIND_PASSWORD'], pool_size=app.config['LDAP_POOL_SIZE'],
+    ttl_seconds=app.config['LDAP_CACHE_SECONDS'], negative_ttl_seconds=app.config['LDAP_NEGATIVE_CACHE_SECONDS'],
+    seed=MOCK_AD_USERS
+)
+
 # Mock employee data for predictions
 MOCK_EMPLOYEE_DATA = {
     '1001': {  # Sarah Johnson
@@ -179,20 +257,124 @@ MOCK_EMPLOYEE_DATA = {
     }
 }
 
+# Fields every prediction request must supply
+REQUIRED_FIELDS = RAW_FEATURE_COLUMNS
+
 # Helper functions
-def role_required(allowed_roles):
+def get_predictor():
+    """The loaded predictor; raises ModelNotReady (503) if it is not available in time"""
+    return model_loader.get(timeout=app.config['MODEL_WAIT_SECONDS'])
+
+@app.errorhandler(ModelNotReady)
+def model_not_ready(error):
+    return jsonify({'error': str(error), 'model': model_loader.status()}), 503, {'Retry-After': '5'}
+
+@app.errorhandler(DirectoryUnavailable)
+def directory_unavailable(error):
+    app.logger.warning("Directory unavailable: %s", error)
+    return jsonify({'error': 'Directory service unavailable'}), 503, {'Retry-After': '5'}
+
+def cached_predict_risk(employee_data):
+    """predict_risk through the prediction cache (skip with ?nocache=1 for debugging)"""
+    predictor = get_predictor()
+    bypass = request.args.get('nocache', '').lower() in ('1', 'true', 'yes')
+    if bypass or not app.config['PREDICTION_CACHE_ENABLED']:
+        return predictor.predict_risk(employee_data)
+    return prediction_cache.get_or_compute(employee_data, predictor.model_version, predictor.predict_risk)
+
+# EventSource cannot send headers, so the alert stream alone also reads the token from ?jwt=
+STREAM_TOKEN_LOCATIONS = ['headers', 'query_string']
+
+def role_required(allowed_roles, locations=None):
     def decorator(f):
         @wraps(f)
-        @jwt_required()
+        @jwt_required(locations=locations)
         def decorated_function(*args, **kwargs):
             current_user = get_jwt_identity()
-            user_data = MOCK_AD_USERS.get(current_user['email'])
+            user_data = directory.get_user(current_user['email'])
             if not user_data or user_data['role'] not in allowed_roles:
                 return jsonify({'error': 'Insufficient permissions'}), 403
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+def current_role():
+    """The caller's role as the directory currently has it (the lookup role_required just cached)"""
+    user_data = directory.get_user(get_jwt_identity()['email'])
+    return user_data['role'] if user_data else None
+
+def own_team_required(f):
+    """Managers may only reach their own team's /manager/<manager_id> routes; HR and admin reach every team
+    
+    Goes above cached_response, so a cached team is never served to another manager.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_role() == 'manager' and kwargs['manager_id'] != get_jwt_identity()['employeeId']:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def current_month():
+    return datetime.utcnow().strftime('%Y-%m')
+
+def cached_response(scopes, vary=None):
+    """Serve a GET endpoint from response_cache with ETag/Last-Modified validation
+    
+    scopes(**view_args) names the data_versions scopes the response is
+    built from; a write to any of them (or a model swap) makes the next
+    request rebuild it. vary() returns anything else the response depends
+    on, such as the current month for a default date range; responses
+    carry absolute times and never "N hours ago". Goes below the auth
+    decorators, so nothing is served before the caller's permissions are
+    checked.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not app.config['RESPONSE_CACHE_ENABLED']:
+                return f(*args, **kwargs)
+            
+            current_user = get_jwt_identity()
+            versions, changed_at = read_data_versions(scopes(**kwargs))
+            key = (
+                request.endpoint, tuple(sorted(kwargs.items())), request.query_string,
+                current_user['role'],
+                # Employees may only see their own dashboard; other roles share entries
+                current_user['employeeId'] if current_user['role'] == 'employee' else None,
+                model_loader.status()['model_version'],
+                vary() if vary is not None else None
+            )
+            cached = response_cache.get(key, versions)
+            if cached is None:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                cached = response_cache.put(key, versions, response.get_data(), response.mimetype,
+                                            (changed_at or datetime.utcnow()).replace(microsecond=0))
+                response.headers['X-Cache'] = 'miss'
+            else:
+                response = Response(cached[2], mimetype=cached[3])
+                response.headers['X-Cache'] = 'hit'
+            
+            response.set_etag(cached[0])
+            response.last_modified = cached[1].replace(tzinfo=timezone.utc)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                response_cache.record_not_modified()
+            return response
+        return decorated_function
+    return decorator
+
+def employee_scopes(employee_id):
+    user = User.query.filter_by(employee_id=employee_id).first()
+    return [user_scope(user.id)] if user else []
+
+def manager_scopes(manager_id):
+    manager = User.query.filter_by(employee_id=manager_id).first()
+    return [team_scope(manager.id)] if manager else []
+
 # Authentication endpoints
 @app.route('/api/auth/login', methods=['POST'])
 def login():
@@ -200,9 +382,11 @@ def login():
     email = data.get('email', '').lower()
     password = data.get('password')
     
-    user = MOCK_AD_USERS.get(email)
-    if not user or user['password'] != password:
+    user = directory.authenticate(email, password)
+    if not user:
         return jsonify({'error': 'Invalid credentials'}), 401
+    if user['role'] is None:
+        return jsonify({'error': 'Not a member of any WorkWell group'}), 403
     
     # Create JWT token
     access_token = create_access_token(
@@ -233,6 +417,7 @@ def logout():
 # Dashboard endpoints
 @app.route('/api/dashboard/employee/<employee_id>', methods=['GET'])
 @jwt_required()
+@cached_response(employee_scopes, vary=current_month)  # Trends cover the six months to date
 def get_employee_dashboard(employee_id):
     current_user = get_jwt_identity()
     
@@ -240,27 +425,38 @@ def get_employee_dashboard(employee_id):
     if current_user['employeeId'] != employee_id and current_user['role'] not in ['manager', 'hr', 'admin']:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Get employee data
+    user = User.query.filter_by(employee_id=employee_id).first()
+    prediction = dashboard_prediction(employee_id, get_latest_prediction(user.id) if user else None)
+    return jsonify(employee_dashboard(employee_id, user.id if user else None, prediction)), 200
+
+def dashboard_prediction(employee_id, latest):
+    """The stored latest prediction in predict_risk's shape, or without one a fresh prediction for the demo profile"""
+    if latest is not None:
+        return {'predicted_risk_category': latest.risk_category.value, 'confidence_score': latest.confidence_score}
+    return cached_predict_risk(MOCK_EMPLOYEE_DATA.get(employee_id, {}))
+
+def employee_dashboard(employee_id, user_id, prediction):
+    """Employee landing page; needs no request context, so it can run on a bootstrap worker"""
     employee_data = MOCK_EMPLOYEE_DATA.get(employee_id, {})
     
-    # Get ML prediction
-    prediction = predictor.predict_risk(employee_data)
-    
     # Calculate risk score (0-100)
-    risk_scores = {'Low': 25, 'Medium': 50, 'High': 75, 'Critical': 95}
-    risk_score = risk_scores.get(prediction['predicted_risk_category'], 50)
+    risk_score = RISK_SCORES.get(prediction['predicted_risk_category'], 50)
     
-    # Generate trend data
-    trends = []
-    for i in range(6):
-        month_date = datetime.now() - timedelta(days=30*i)
-        trends.append({
-            'month': month_date.strftime('%b'),
-            'score': risk_score + np.random.randint(-10, 10)
-        })
-    trends.reverse()
+    # Monthly trend from the precomputed risk buckets
+    today = datetime.utcnow().date()
+    points = get_risk_trend(user_id, periods_back(today, 'month', 6), today) if user_id is not None else []
+    if points:
+        trends = [
+            {
+                'month': datetime.fromisoformat(point['period_start']).strftime('%b'),
+                'score': round(point['avg_risk_score'])
+            }
+            for point in points
+        ]
+    else:
+        trends = demo_trends(risk_score)
     
-    return jsonify({
+    return {
         'wellness_score': risk_score,
         'risk_category': prediction['predicted_risk_category'],
         'confidence': prediction['confidence_score'],
@@ -285,77 +481,329 @@ def get_employee_dashboard(employee_id):
                 'reason': 'Recommended for your level'
             }
         ]
+    }
+
+def demo_trends(risk_score, months=6):
+    """Randomly generated monthly trend for employees with no stored predictions"""
+    trends = []
+    for i in range(months):
+        month_date = datetime.now() - timedelta(days=30*i)
+        trends.append({
+            'month': month_date.strftime('%b'),
+            'score': risk_score + np.random.randint(-10, 10)
+        })
+    trends.reverse()
+    return trends
+
+@app.route('/api/dashboard/employee/<employee_id>/trends', methods=['GET'])
+@jwt_required()
+def get_employee_trends(employee_id):
+    """Risk history in week or month buckets over any date range, for HR drill-down"""
+    current_user = get_jwt_identity()
+    
+    if current_user['employeeId'] != employee_id and current_user['role'] not in ['manager', 'hr', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in TREND_GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of: {', '.join(TREND_GRANULARITIES)}"}), 400
+    try:
+        end = datetime.fromisoformat(request.args['end']).date() if 'end' in request.args else datetime.utcnow().date()
+        start = (
+            datetime.fromisoformat(request.args['start']).date() if 'start' in request.args
+            else periods_back(end, granularity, 12 if granularity == 'week' else 6)
+        )
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates (YYYY-MM-DD)'}), 400
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+    
+    user = User.query.filter_by(employee_id=employee_id).first()
+    if user is None:
+        return jsonify({'error': 'Employee not found'}), 404
+    
+    return jsonify({
+        'employee_id': employee_id,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'points': get_risk_trend(user.id, start, end, granularity)
     }), 200
 
+def load_team_risk(manager_user_id):
+    """Latest risk for every direct report, scored in one batched predictor call
+    
+    Reports whose stored RiskPrediction is at least as recent as their
+    latest WellnessData reuse it; everyone else is scored together.
+    """
+    rows = get_team_latest_data(manager_user_id)
+    if not rows:
+        return pd.DataFrame(columns=['id', 'name', 'role', 'department', 'risk_score', 'risk_category'])
+    team = pd.DataFrame.from_records(rows, columns=list(rows[0]._fields))
+    
+    categories = team['risk_category'].map(lambda category: category.value, na_action='ignore')
+    scores = team['risk_score'].astype(float)
+    
+    has_wellness = team['wellness_date'].notna()
+    prediction_day = pd.to_datetime(team['prediction_date']).dt.normalize()
+    stale = has_wellness & (categories.isna() | (prediction_day < pd.to_datetime(team['wellness_date'])))
+    if stale.any():
+        # Trend state from another TREND_VERSION is ignored until it is rebuilt
+        team.loc[team['trend_version'] != TREND_VERSION, TREND_FEATURE_COLUMNS] = np.nan
+        predictions = get_predictor().predict_risk_batch(team.loc[stale, RAW_FEATURE_COLUMNS + TREND_FEATURE_COLUMNS])
+        categories[stale] = predictions['predicted_risk_category']
+        scores[stale] = pd.Series(predictions['predicted_risk_category']).map(RISK_SCORES).values
+    
+    return pd.DataFrame({
+        'id': team['employee_id'],
+        'name': team['display_name'],
+        'role': team['title'],
+        'department': team['department'],
+        'risk_score': scores,
+        'risk_category': categories
+    })
+
+def demo_team_risk(size=12):
+    """Randomly generated team for managers who are not in the database yet"""
+    employees = pd.DataFrame({
+        'hours_per_week': np.random.uniform(35, 65, size),
+        'overtime_hours': np.random.uniform(0, 20, size),
+        'meetings_per_day': np.random.randint(2, 8, size),
+        'manager_support_score': np.random.uniform(4, 9, size),
+        'vacation_days_taken': np.random.uniform(5, 20, size),
+        'after_hours_emails': np.random.randint(5, 30, size),
+        'deadline_pressure': np.random.uniform(3, 9, size),
+        'work_life_balance_score': np.random.uniform(3, 8, size),
+        'team_collaboration_score': np.random.uniform(4, 9, size),
+        'daily_breaks': np.random.uniform(1, 4, size),
+        'weekend_work_days': np.random.randint(0, 4, size),
+        'role_clarity_score': np.random.uniform(4, 9, size),
+        'job_tenure_months': np.random.randint(6, 60, size)
+    })
+    categories = get_predictor().predict_risk_batch(employees)['predicted_risk_category']
+    
+    return pd.DataFrame({
+        'id': [f'emp_{i}' for i in range(size)],
+        'name': [f'Employee {i+1}' for i in range(size)],
+        'role': ['Developer' if i % 2 == 0 else 'Analyst' for i in range(size)],
+        'department': 'Engineering',
+        'risk_score': pd.Series(categories).map(RISK_SCORES),
+        'risk_category': categories
+    })
+
+def _iso_utc(moment):
+    """ISO 8601 UTC time for the client to show relative to now (so cached responses never go stale)"""
+    return moment.replace(microsecond=0).isoformat() + 'Z'
+
+DEMO_RECENT_ALERTS = [
+    {
+        'id': 1,
+        'employee': 'Sarah Johnson',
+        'type': 'high_risk',
+        'message': 'Risk score increased 15 points - schedule check-in',
+        'timestamp': _iso_utc(datetime.utcnow() - timedelta(hours=2)),
+        'priority': 'urgent'
+    },
+    {
+        'id': 2,
+        'employee': 'Alex Brown',
+        'type': 'overtime',
+        'message': 'Worked 65+ hours this week',
+        'timestamp': _iso_utc(datetime.utcnow() - timedelta(days=1)),
+        'priority': 'high'
+    }
+]
+
+def load_recent_alerts(manager_user_id, limit=10):
+    """The manager's latest active alerts, shaped for the dashboard"""
+    return [
+        {
+            'id': alert.id,
+            'employee': alert.display_name,
+            'type': alert.alert_type,
+            'message': alert.message,
+            'timestamp': _iso_utc(alert.created_at),
+            'priority': alert.priority
+        }
+        for alert in get_team_recent_alerts(manager_user_id, limit)
+    ]
+
 @app.route('/api/dashboard/manager/<manager_id>', methods=['GET'])
 @role_required(['manager', 'hr', 'admin'])
+@own_team_required
+@cached_response(manager_scopes)
 def get_manager_dashboard(manager_id):
-    # Generate team data
-    team_members = []
-    for i in range(12):
-        employee_data = {
-            'hours_per_week': np.random.uniform(35, 65),
-            'overtime_hours': np.random.uniform(0, 20),
-            'meetings_per_day': np.random.randint(2, 8),
-            'manager_support_score': np.random.uniform(4, 9),
-            'vacation_days_taken': np.random.uniform(5, 20),
-            'after_hours_emails': np.random.randint(5, 30),
-            'deadline_pressure': np.random.uniform(3, 9),
-            'work_life_balance_score': np.random.uniform(3, 8),
-            'team_collaboration_score': np.random.uniform(4, 9),
-            'daily_breaks': np.random.uniform(1, 4),
-            'weekend_work_days': np.random.randint(0, 4),
-            'role_clarity_score': np.random.uniform(4, 9),
-            'job_tenure_months': np.random.randint(6, 60)
-        }
-        
-        prediction = predictor.predict_risk(employee_data)
-        risk_scores = {'Low': 25, 'Medium': 50, 'High': 75, 'Critical': 95}
-        
-        team_members.append({
-            'id': f'emp_{i}',
-            'name': f'Employee {i+1}',
-            'role': 'Developer' if i % 2 == 0 else 'Analyst',
-            'department': 'Engineering',
-            'risk_score': risk_scores.get(prediction['predicted_risk_category'], 50),
-            'risk_category': prediction['predicted_risk_category']
-        })
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
     
-    # Count by category
-    risk_counts = {'Low': 0, 'Medium': 0, 'High': 0, 'Critical': 0}
-    for member in team_members:
-        risk_counts[member['risk_category']] = risk_counts.get(member['risk_category'], 0) + 1
+    manager = User.query.filter_by(employee_id=manager_id).first()
+    return jsonify(manager_dashboard(manager.id if manager is not None else None, page, per_page)), 200
+
+def manager_dashboard(manager_user_id, page=1, per_page=50):
+    """One page of a manager's team with whole-team risk counts (a demo team when manager_user_id is None)"""
+    team = load_team_risk(manager_user_id) if manager_user_id is not None else demo_team_risk()
     
-    return jsonify({
+    # Count by category across the whole team, not just this page
+    risk_counts = {category: int(count) for category, count in team['risk_category'].value_counts().items()}
+    
+    page_rows = team.iloc[(page - 1) * per_page:page * per_page]
+    team_members = page_rows.astype(object).where(page_rows.notna(), None).to_dict('records')
+    
+    return {
         'team_members': team_members,
-        'team_size': len(team_members),
+        'team_size': len(team),
+        'page': page,
+        'per_page': per_page,
+        'total_pages': max(1, -(-len(team) // per_page)),
         'high_risk_count': risk_counts.get('High', 0) + risk_counts.get('Critical', 0),
         'at_risk_count': risk_counts.get('Medium', 0),
         'healthy_count': risk_counts.get('Low', 0),
-        'recent_alerts': [
-            {
-                'id': 1,
-                'employee': 'Sarah Johnson',
-                'type': 'high_risk',
-                'message': 'Risk score increased 15 points - schedule check-in',
-                'timestamp': '2 hours ago',
-                'priority': 'urgent'
-            },
-            {
-                'id': 2,
-                'employee': 'Alex Brown',
-                'type': 'overtime',
-                'message': 'Worked 65+ hours this week',
-                'timestamp': '1 day ago',
-                'priority': 'high'
-            }
-        ]
-    }), 200
+        'recent_alerts': load_recent_alerts(manager_user_id) if manager_user_id is not None else DEMO_RECENT_ALERTS
+    }
+
+@app.route('/api/dashboard/manager/<manager_id>/alerts/stream', methods=['GET'])
+@role_required(['manager', 'hr', 'admin'], locations=STREAM_TOKEN_LOCATIONS)
+@own_team_required
+def stream_manager_alerts(manager_id):
+    """Server-sent events for alerts raised or changing status on the manager's team
+    
+    Pass the token as ?jwt=... from an EventSource. On reconnect the
+    browser's Last-Event-ID (or ?last_event_id=) replays what was missed.
+    Managers may only follow their own team. Serve with serve.py (gevent)
+    to hold thousands of idle streams without a thread each.
+    """
+    manager = User.query.filter_by(employee_id=manager_id).first()
+    if manager is None:
+        return jsonify({'error': 'Manager not found'}), 404
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None and not last_event_id.isdigit():
+        return jsonify({'error': 'Last-Event-ID must be an event id'}), 400
+    
+    alert_hub.start(app)
+    subscription = alert_hub.subscribe(manager.id)
+    replay = replay_events(manager.id, int(last_event_id)) if last_event_id is not None else []
+    db.session.remove()  # Nothing below touches the database
+    
+    def stream():
+        if len(replay) < REPLAY_LIMIT:
+            yield from event_stream(alert_hub, subscription, replay, app.config['ALERT_STREAM_HEARTBEAT_SECONDS'])
+        else:
+            # Too far behind to replay: have the client reload the dashboard and follow from now
+            yield format_event(subscription.after_event_id, {'reason': 'too_far_behind'}, 'reset')
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+    })
+    # Also runs when the client leaves before the first event was written
+    response.call_on_close(lambda: alert_hub.unsubscribe(subscription))
+    return response
+
+@app.route('/api/alerts/<int:alert_id>/<action>', methods=['POST'])
+@role_required(['manager', 'hr', 'admin'])
+def update_alert_status(alert_id, action):
+    """Acknowledge or resolve an alert (managers only for their direct reports)"""
+    statuses = {'acknowledge': 'acknowledged', 'resolve': 'resolved'}
+    if action not in statuses:
+        return jsonify({'error': 'Action must be acknowledge or resolve'}), 404
+    alert = db.session.get(Alert, alert_id)
+    if alert is None:
+        return jsonify({'error': 'Alert not found'}), 404
+    actor = User.query.filter_by(employee_id=get_jwt_identity()['employeeId']).first()
+    if current_role() == 'manager' and (actor is None or alert.user.manager_id != actor.id):
+        return jsonify({'error': 'Insufficient permissions'}), 403
+    if alert.status == 'resolved' or alert.status == statuses[action]:
+        return jsonify({'error': f'Alert is already {alert.status}'}), 409
+    
+    now = datetime.utcnow()
+    if alert.acknowledged_at is None:
+        alert.acknowledged_at = now
+        alert.acknowledged_by = actor.id if actor is not None else None
+    if action == 'resolve':
+        alert.resolved_at = now
+    alert.status = statuses[action]
+    db.session.commit()
+    return jsonify({'id': alert.id, 'status': alert.status}), 200
 
 @app.route('/api/dashboard/hr', methods=['GET'])
 @role_required(['hr', 'admin'])
+@cached_response(lambda: [ORG], vary=current_month)  # The default period is this month
 def get_hr_dashboard():
-    # Generate organizational data
+    try:
+        return jsonify(hr_dashboard(request.args.get('period'), request.args.get('office'))), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def hr_dashboard(period=None, office=None):
+    """Organization risk by department for a YYYY-MM period (default: the current month)
+    
+    Raises ValueError for a malformed period. A period without predictions
+    has no departments; only a database with no rollups at all, asked for
+    the default period, gets the generated demo organization.
+    """
+    if period is None and not has_risk_rollups():
+        return demo_hr_dashboard()
+    first_of_month = parse_rollup_period(period) if period else datetime.utcnow()
+    period = risk_rollup_period(first_of_month)
+    
+    # Read the incrementally maintained rollups: O(departments x offices) rows
+    rollup_rows = get_department_rollups(period, office)
+    if not rollup_rows:
+        return {
+            'period': period,
+            'total_employees': 0,
+            'high_risk_count': 0,
+            'high_risk_percentage': 0.0,
+            'avg_risk_score': None,
+            'score_change': None,
+            'survey_response_rate': 87,
+            'departments': []
+        }
+    
+    departments = {}
+    for row in rollup_rows:
+        dept = departments.setdefault(row.department, {
+            'department': row.department, 'total': 0, 'healthy': 0, 'at_risk': 0, 'high_risk': 0, 'score_sum': 0.0
+        })
+        dept['total'] += row.employee_count
+        dept['healthy'] += row.healthy_count
+        dept['at_risk'] += row.at_risk_count
+        dept['high_risk'] += row.high_risk_count
+        dept['score_sum'] += row.risk_score_sum
+    
+    org_data = []
+    for dept in sorted(departments.values(), key=lambda d: d['department']):
+        score_sum = dept.pop('score_sum')
+        dept['avg_risk_score'] = round(score_sum / dept['total'], 1)
+        dept['risk_percentage'] = round((dept['high_risk'] + dept['at_risk']) / dept['total'] * 100, 1)
+        org_data.append(dept)
+    
+    total_employees = sum(d['total'] for d in org_data)
+    total_high_risk = sum(d['high_risk'] for d in org_data)
+    avg_risk_score = sum(row.risk_score_sum for row in rollup_rows) / total_employees
+    
+    # Month-over-month change in the average score
+    first_of_month = first_of_month.replace(day=1)
+    previous_rows = get_department_rollups(risk_rollup_period(first_of_month - timedelta(days=1)), office)
+    previous_total = sum(row.employee_count for row in previous_rows)
+    score_change = None
+    if previous_total:
+        previous_avg = sum(row.risk_score_sum for row in previous_rows) / previous_total
+        score_change = round(avg_risk_score - previous_avg, 1)
+    
+    return {
+        'period': period,
+        'total_employees': total_employees,
+        'high_risk_count': total_high_risk,
+        'high_risk_percentage': round(total_high_risk / total_employees * 100, 1),
+        'avg_risk_score': round(avg_risk_score, 1),
+        'score_change': score_change,
+        'survey_response_rate': 87,
+        'departments': org_data
+    }
+
+def demo_hr_dashboard():
+    """Generated organization for databases without any predictions yet"""
     departments = ['Engineering', 'Sales', 'Product', 'Design', 'Marketing']
     org_data = []
     
@@ -380,7 +828,7 @@ def get_hr_dashboard():
             'risk_percentage': round((high_risk + medium_risk) / dept_size * 100, 1)
         })
     
-    return jsonify({
+    return {
         'total_employees': total_employees,
         'high_risk_count': total_high_risk,
         'high_risk_percentage': round(total_high_risk / total_employees * 100, 1),
@@ -388,12 +836,16 @@ def get_hr_dashboard():
         'score_change': -2.1,
         'survey_response_rate': 87,
         'departments': org_data
-    }), 200
+    }
 
 @app.route('/api/dashboard/admin', methods=['GET'])
 @role_required(['admin'])
+@cached_response(lambda: [])
 def get_admin_dashboard():
-    return jsonify({
+    return jsonify(admin_dashboard()), 200
+
+def admin_dashboard():
+    return {
         'system_health': {
             'uptime': 99.94,
             'response_time': 23,
@@ -421,13 +873,140 @@ def get_admin_dashboard():
                 'predictions_today': 1247
             }
         ]
-    }), 200
+    }
+
+# Landing page bootstrap: one request instead of the dashboard, survey and health calls
+BOOTSTRAP_SECTIONS = ('user', 'dashboard', 'survey', 'health')
+
+def in_app_context(f, *args):
+    """Run f on a worker thread with its own app context (and so its own database session)"""
+    with app.app_context():
+        return f(*args)
+
+def landing_dashboard(role, employee_id, user_id, prediction):
+    if role == 'employee':
+        return employee_dashboard(employee_id, user_id, prediction)
+    if role == 'manager':
+        return manager_dashboard(user_id)
+    if role == 'hr':
+        return hr_dashboard()
+    return admin_dashboard()
+
+def user_profile(user, user_id, latest):
+    return {
+        'displayName': user['displayName'],
+        'email': user['userPrincipalName'],
+        'department': user['department'],
+        'title': user['title'],
+        'office': user['office'],
+        'role': user['role'],
+        'employeeId': user['employeeId'],
+        'userId': user_id,
+        'latest_prediction': {
+            'prediction_date': latest.prediction_date.isoformat(),
+            'risk_category': latest.risk_category.value,
+            'risk_score': latest.risk_score,
+            'confidence': latest.confidence_score
+        } if latest is not None else None
+    }
+
+@app.route('/api/bootstrap', methods=['GET'])
+@jwt_required()
+def get_bootstrap():
+    """Everything the caller's landing page needs in one response
+    
+    ?sections=user,dashboard,survey,health picks a subset (default: all).
+    The user record and latest prediction are looked up once, then the
+    sections are built concurrently. A section that fails is reported
+    under errors and the others are still returned.
+    """
+    current_user = get_jwt_identity()
+    directory_user = directory.get_user(current_user['email'])
+    if directory_user is None:
+        return jsonify({'error': 'Unknown user'}), 403
+    
+    requested = request.args.get('sections')
+    sections = list(dict.fromkeys(
+        name.strip() for name in requested.split(',') if name.strip()
+    )) if requested else list(BOOTSTRAP_SECTIONS)
+    unknown = [name for name in sections if name not in BOOTSTRAP_SECTIONS]
+    if unknown or not sections:
+        return jsonify({'error': f"sections must be a comma-separated subset of: {', '.join(BOOTSTRAP_SECTIONS)}"}), 400
+    
+    role, employee_id = current_user['role'], current_user['employeeId']
+    user_id, latest, prediction = None, None, None
+    if 'user' in sections or 'dashboard' in sections:
+        user = User.query.filter_by(employee_id=employee_id).first()
+        user_id = user.id if user else None
+        if user_id is not None and ('user' in sections or role == 'employee'):
+            latest = get_latest_prediction(user_id)
+    
+    body, errors = {}, {}
+    if 'dashboard' in sections and role == 'employee':
+        try:
+            # Scored here rather than on a worker: the prediction cache reads ?nocache from the request
+            prediction = dashboard_prediction(employee_id, latest)
+        except ModelNotReady as e:
+            sections.remove('dashboard')
+            errors['dashboard'] = str(e)
+    
+    builders = {
+        'user': (user_profile, directory_user, user_id, latest),
+        'dashboard': (landing_dashboard, role, employee_id, user_id, prediction),
+        'survey': (current_survey,),
+        'health': (health_status,)
+    }
+    futures = {name: bootstrap_executor.submit(in_app_context, *builders[name]) for name in sections}
+    for name, future in futures.items():
+        try:
+            body[name] = future.result()
+        except ModelNotReady as e:
+            errors[name] = str(e)
+        except Exception:
+            app.logger.exception("Bootstrap section %s failed", name)
+            errors[name] = 'Section failed to load'
+    
+    if errors:
+        body['errors'] = errors
+    return jsonify(body), 200
+
+# HR/admin listings: keyset pages (?cursor=&limit=) or a streamed export of every match (?format=ndjson|csv)
+LISTING_ARGS = ('cursor', 'limit', 'format')
+
+@app.route('/api/<any(users, alerts, predictions):name>', methods=['GET'])
+@role_required(['hr', 'admin'])
+def list_records(name):
+    listing = LISTINGS[name]
+    fmt = request.args.get('format', 'json')
+    filters = {key: value for key, value in request.args.items() if key not in LISTING_ARGS}
+    cursor = request.args.get('cursor')
+    
+    if fmt == 'json':
+        limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        try:
+            return jsonify(listing.page(filters, cursor, limit)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be json or one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        stmt = listing.query(filters, cursor)  # Validated now; the response body runs after this view returns
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(listing.export(db.engine, stmt, fmt), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{name}.{fmt}"',
+        'X-Accel-Buffering': 'no'
+    })
 
 # Survey endpoints
 @app.route('/api/surveys/current', methods=['GET'])
 @jwt_required()
 def get_current_survey():
-    return jsonify({
+    return jsonify(current_survey()), 200
+
+def current_survey():
+    return {
         'id': 'monthly_wellness_202506',
         'title': 'Monthly Wellness Check-in',
         'questions': [
@@ -456,7 +1035,7 @@ def get_current_survey():
                 'scale': [1, 2, 3, 4, 5]
             }
         ]
-    }), 200
+    }
 
 @app.route('/api/surveys/submit', methods=['POST'])
 @jwt_required()
@@ -510,19 +1089,12 @@ def predict_employee_risk():
     data = request.get_json()
     
     # Validate required fields
-    required_fields = [
-        'hours_per_week', 'overtime_hours', 'meetings_per_day',
-        'manager_support_score', 'vacation_days_taken', 'after_hours_emails',
-        'deadline_pressure', 'work_life_balance_score', 'team_collaboration_score',
-        'daily_breaks', 'weekend_work_days', 'role_clarity_score', 'job_tenure_months'
-    ]
-    
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
     # Get prediction
-    prediction = predictor.predict_risk(data)
+    prediction = cached_predict_risk(data)
     
     return jsonify({
         'predicted_risk_category': prediction['predicted_risk_category'],
@@ -532,14 +1104,256 @@ def predict_employee_risk():
         'intervention_priority': prediction['intervention_priority']
     }), 200
 
-# Health check endpoint
+@app.route('/api/predict/risk/batch', methods=['POST'])
+@jwt_required()
+def predict_employee_risk_batch():
+    data = request.get_json()
+    records = data.get('employees') if isinstance(data, dict) else data
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'Expected a non-empty list of employee records'}), 400
+    if len(records) > app.config['MAX_PREDICTION_BATCH']:
+        return jsonify({'error': f"Batch exceeds {app.config['MAX_PREDICTION_BATCH']} records"}), 413
+    if not all(isinstance(record, dict) for record in records):
+        return jsonify({'error': 'Every employee record must be an object'}), 400
+    
+    # Validate required fields once for the whole payload
+    employees = pd.DataFrame.from_records(records)
+    for field in REQUIRED_FIELDS:
+        if field not in employees.columns:
+            return jsonify({'error': f'Missing required field: {field}'}), 400
+    
+    incomplete = employees[REQUIRED_FIELDS].isnull()
+    if incomplete.values.any():
+        bad_rows = np.flatnonzero(incomplete.values.any(axis=1))
+        return jsonify({
+            'error': 'Records with missing required fields',
+            'invalid_records': [
+                {
+                    'index': int(i),
+                    'missing_fields': [f for f in REQUIRED_FIELDS if incomplete.at[i, f]]
+                }
+                for i in bad_rows[:100]
+            ]
+        }), 400
+    
+    # Get predictions (records may also carry rolling trend features)
+    trend_fields = [col for col in TREND_FEATURE_COLUMNS if col in employees.columns]
+    predictions = get_predictor().predict_risk_batch(employees[REQUIRED_FIELDS + trend_fields])
+    
+    response = {
+        'count': len(employees),
+        'classes': predictions['classes'],
+        'predicted_risk_category': predictions['predicted_risk_category'].tolist(),
+        'confidence_score': predictions['confidence_score'].tolist(),
+        'class_probabilities': predictions['class_probabilities'].tolist(),
+        'prediction_reliability': predictions['prediction_reliability'].tolist(),
+        'intervention_priority': predictions['intervention_priority'].tolist()
+    }
+    if 'employee_id' in employees.columns:
+        response['employee_id'] = employees['employee_id'].tolist()
+    
+    return jsonify(response), 200
+
+# Bulk wellness data ingestion (CSV or NDJSON request body)
+@app.route('/api/wellness/ingest', methods=['POST'])
+@role_required(['hr', 'admin'])
+def ingest_wellness():
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'ndjson' if 'json' in (request.mimetype or '') else 'csv'
+    chunk_size = min(max(request.args.get('chunk_size', 10000, type=int), 100), 100000)
+    
+    try:
+        report = ingest_wellness_request(request.stream, fmt, chunk_size=chunk_size)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(report), 200
+
+# Model management: swap in a new artifact without restarting
+@app.route('/api/admin/model', methods=['GET'])
+@role_required(['admin'])
+def get_model_status():
+    return jsonify(model_loader.status()), 200
+
+@app.route('/api/admin/model/reload', methods=['POST'])
+@role_required(['admin'])
+def reload_model():
+    data = request.get_json(silent=True) or {}
+    path = data.get('path') or model_loader.model_path
+    
+    # Only artifacts from the models directory (pickles can run code when loaded)
+    resolved = os.path.abspath(path)
+    if os.path.commonpath([resolved, models_dir]) != models_dir:
+        return jsonify({'error': f'Model path must be inside {models_dir}'}), 400
+    if not os.path.exists(resolved):
+        return jsonify({'error': f'{path} does not exist'}), 404
+    
+    if not model_loader.reload(path):
+        return jsonify({'error': 'A model reload is already in progress', 'model': model_loader.status()}), 409
+    return jsonify({'message': 'Reload started', 'model': model_loader.status()}), 202
+
+# Health check endpoints: liveness never depends on the model, readiness does
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({
+    return jsonify(health_status()), 200
+
+def health_status():
+    model = model_loader.status()
+    return {
         'status': 'healthy',
+        'ready': model['state'] == 'ready',
         'timestamp': datetime.now().isoformat(),
-        'model_loaded': predictor.model is not None
-    }), 200
+        'model_loaded': model['state'] == 'ready',
+        'model_version': model['model_version'],
+        'model': model,
+        'prediction_cache': prediction_cache.stats(),
+        'feature_store': backfill_status,
+        'alert_stream': alert_hub.stats(),
+        'response_cache': response_cache.stats(),
+        'directory': directory.stats()
+    }
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    return jsonify({'status': 'alive', 'timestamp': datetime.now().isoformat()}), 200
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    model = model_loader.status()
+    ready = model['state'] == 'ready'
+    # Stale stored features only cost recomputation, so they are reported without failing readiness
+    return jsonify({'ready': ready, 'model': model, 'feature_store': backfill_status}), 200 if ready else 503
+
+# Maintenance commands (run with: flask --app app_backend <command>)
+@app.cli.command('train-model')
+@click.option('--samples', default=2000, show_default=True, help='Synthetic rows to train on (ignored with --data)')
+@click.option('--seed', default=42, show_default=True, help='Seed for the synthetic rows')
+@click.option('--data', 'data_path', type=click.Path(exists=True), help='Labelled CSV (metrics + risk_category)')
+@click.option('--from-db', is_flag=True, help='Stream wellness_data history, labelled by risk_predictions')
+@click.option('--chunk-users', default=2000, show_default=True, help='Users read per chunk with --from-db')
+@click.option('--max-samples', type=int, help='Rows each tree draws with --from-db (default: all)')
+@click.option('--jobs', type=int, help='Cores to use (default: TRAINING_JOBS or all)')
+@click.option('--cv-folds', default=5, show_default=True, help='0 skips cross-validation')
+@click.option('--incremental', is_flag=True, help='Warm-start extra trees on the new data instead of refitting')
+@click.option('--extra-trees', default=20, show_default=True, help='Trees added by --incremental')
+@click.option('--trend-features', is_flag=True,
+              help='Also train on rolling trends (history from --from-db, or trend columns in --data)')
+@click.option('--report', is_flag=True, help='Print the full evaluation report')
+def train_model_command(samples, seed, data_path, from_db, chunk_users, max_samples, jobs, cv_folds,
+                        incremental, extra_trees, trend_features, report):
+    """Train the risk model and save it to the model path"""
+    if from_db and (incremental or data_path):
+        raise click.ClickException("--from-db trains from scratch and cannot be combined with --incremental or --data")
+    
+    predictor = RealisticMentalHealthPredictor()
+    if data_path:
+        training_data = pd.read_csv(data_path)
+        missing = [col for col in RAW_FEATURE_COLUMNS + ['risk_category'] if col not in training_data.columns]
+        if missing:
+            raise click.ClickException(f"{data_path} is missing columns: {', '.join(missing)}")
+    elif not from_db:
+        training_data = predictor.create_realistic_data(n_samples=samples, seed=seed)
+    
+    try:
+        if from_db:
+            train_from_wellness(predictor, chunk_users=chunk_users, n_jobs=jobs, max_samples=max_samples,
+                                verbose=report, trend_features=trend_features)
+        elif incremental:
+            predictor.load_estimator(model_path)
+            predictor.update_model(training_data, extra_trees=extra_trees, n_jobs=jobs, verbose=report)
+        else:
+            predictor.train_realistic_model(training_data, n_jobs=jobs, cv_folds=cv_folds, verbose=report,
+                                            trend_features=trend_features)
+    except (OSError, ValueError) as e:
+        raise click.ClickException(str(e))
+    record_trained_model(MODEL_NAME, predictor.model_version, predictor.training_metrics)
+    if model_path.endswith('.pkl'):
+        predictor.save_model(model_path)
+    else:
+        predictor.save_artifact(model_path)
+
+@app.cli.command('backfill-features')
+def backfill_features_command():
+    """Compute stored features and rolling trends that are missing or at an old version"""
+    result = backfill_features()
+    print(f"Backfilled {result['rows']} wellness rows in {result['seconds']}s")
+    result = rebuild_stale_trends()
+    print(f"Rebuilt rolling trends for {result['users']} users in {result['seconds']}s")
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the department risk rollups from risk_predictions"""
+    result = rebuild_risk_rollups()
+    with db.engine.begin() as connection:
+        bump_epoch(connection)
+    print(f"Rebuilt {result['rollups']} rollup rows from {result['members']} employee-periods")
+
+@app.cli.command('rebuild-risk-trends')
+def rebuild_risk_trends_command():
+    """Recompute the per-employee weekly and monthly risk trend buckets from risk_predictions"""
+    result = rebuild_risk_trends()
+    with db.engine.begin() as connection:
+        bump_epoch(connection)
+    print(f"Rebuilt {result['buckets']} risk trend buckets")
+
+@app.cli.command('check-rollups')
+def check_rollups_command():
+    """Verify the department risk rollups against risk_predictions"""
+    problems = check_risk_rollups()
+    for problem in problems[:50]:
+        print(problem)
+    if problems:
+        print(f"{len(problems)} inconsistencies found - run 'rebuild-rollups' to repair")
+        raise SystemExit(1)
+    print("Rollups are consistent")
+
+@app.cli.command('ingest-wellness')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension')
+@click.option('--chunk-size', default=10000, show_default=True)
+@click.option('--rejects', 'rejects_path', help='Write every rejected line and reason to this CSV')
+def ingest_wellness_command(path, fmt, chunk_size, rejects_path):
+    """Stream a CSV/NDJSON export into wellness_data (upsert on user_id, date)"""
+    report = ingest_wellness_file(path, fmt, chunk_size=chunk_size, rejects_path=rejects_path)
+    print(f"Read {report['rows_read']} rows, wrote {report['rows_written']}, "
+          f"rejected {report['rows_rejected']} in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s, peak RSS {report['peak_rss_mb']} MB)")
+    for rejection in report['rejections']:
+        print(f"  line {rejection['line']}: {rejection['reason']}")
+
+@app.cli.command('score-all')
+@click.option('--chunk-size', default=5000, show_default=True)
+@click.option('--workers', type=int, help='Scoring processes (default: one per CPU)')
+@click.option('--no-resume', is_flag=True, help='Start a new run instead of continuing an unfinished one')
+def score_all_command(chunk_size, workers, no_resume):
+    """Nightly job: score every user's latest wellness data into risk_predictions"""
+    report = run_batch_scoring(model_path, chunk_size=chunk_size, workers=workers, resume=not no_resume)
+    if report['resumed_from_user_id'] is not None:
+        print(f"Resumed run {report['run_id']} after user {report['resumed_from_user_id']}")
+    print(f"Run {report['run_id']} ({report['model_version']}): scored {report['users_scored']} users, "
+          f"{report['users_scored_this_invocation']} in {report['seconds']}s "
+          f"({report['users_per_second']} users/s), raised {report['alerts_raised']} alerts")
+
+@app.cli.command('load-synthetic-org')
+@click.option('--employees', default=1000, show_default=True, type=click.IntRange(1, 100000))
+@click.option('--weeks', default=52, show_default=True, type=click.IntRange(1, 520))
+@click.option('--seed', default=7, show_default=True)
+@click.option('--end-date', type=click.DateTime(['%Y-%m-%d']), help='Last wellness week (default: this Monday)')
+@click.option('--reset', is_flag=True, help='Drop and recreate every table first')
+def load_synthetic_org_command(employees, weeks, seed, end_date, reset):
+    """Fill the database with a deterministic synthetic organization for load testing"""
+    predictor = model_loader.get(timeout=None)
+    try:
+        report = load_synthetic_org(predictor, employees, weeks=weeks, seed=seed,
+                                    end_date=end_date.date() if end_date else None, reset=reset, model_name=MODEL_NAME)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for table, count in report['counts'].items():
+        print(f"  {table}: {count}")
+    print(f"Loaded {employees} employees x {weeks} weeks in {report['seconds']}s "
+          f"(seed {report['seed']}, end date {report['end_date']})")
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
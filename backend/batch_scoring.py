@@ -0,0 +1,262 @@
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, insert, update, func, and_
+
+from database_schema import (
+    db, WellnessData, WellnessFeatures, WellnessTrends, RiskPrediction, RiskCategory, BatchScoringRun
+)
+from feature_store import stored_features_join
+from rolling_features import stored_trends_join
+from risk_rollups import apply_predictions_to_rollups
+from risk_trends import apply_predictions_to_trends
+from alert_engine import evaluate_alerts
+from response_cache import bump_data_versions
+from stress_predictor import (
+    RealisticMentalHealthPredictor, RAW_FEATURE_COLUMNS, ENGINEERED_FEATURE_COLUMNS, TREND_FEATURE_COLUMNS, RISK_SCORES
+)
+
+wellness = WellnessData.__table__
+features = WellnessFeatures.__table__
+trends = WellnessTrends.__table__
+predictions = RiskPrediction.__table__
+runs = BatchScoringRun.__table__
+
+# Chunks queued per worker, so reading and writing overlap with scoring
+PREFETCH_PER_WORKER = 2
+
+# A running run whose last chunk is older than this is taken to be dead and may be claimed
+STALE_RUN_AFTER = timedelta(minutes=10)
+# Unfinished runs started longer ago than this are left alone and a new run starts
+MAX_RESUME_AGE = timedelta(hours=20)
+
+# Set in each pool process by _init_worker
+_worker_predictor = None
+
+
+def _init_worker(model_path):
+    """Load the model artifact once per worker process"""
+    global _worker_predictor
+    _worker_predictor = RealisticMentalHealthPredictor()
+    _worker_predictor.load_model(model_path)
+    if _worker_predictor.model is not None:
+        _worker_predictor.model.n_jobs = 1  # The pool already uses every core
+
+
+def _score_features(raw, engineered, trend_features):
+    result = _worker_predictor.predict_risk_batch(raw, engineered=engineered, trends=trend_features)
+    result['model_version'] = _worker_predictor.model_version
+    return result
+
+
+def _latest_wellness_chunk(connection, after_user_id, chunk_size):
+    """Latest WellnessData of the next chunk_size users after after_user_id (keyset order), with stored features and trends"""
+    latest = (
+        select(wellness.c.user_id, func.max(wellness.c.date).label('date'))
+        .where(wellness.c.user_id > after_user_id)
+        .group_by(wellness.c.user_id)
+        .order_by(wellness.c.user_id)
+        .limit(chunk_size)
+        .subquery()
+    )
+    return connection.execute(
+        select(
+            wellness.c.user_id,
+            *[wellness.c[col] for col in RAW_FEATURE_COLUMNS],
+            *[features.c[col] for col in ENGINEERED_FEATURE_COLUMNS],
+            *[trends.c[col] for col in TREND_FEATURE_COLUMNS]
+        )
+        .join(latest, and_(wellness.c.user_id == latest.c.user_id, wellness.c.date == latest.c.date))
+        .outerjoin(features, stored_features_join())
+        .outerjoin(trends, stored_trends_join())
+        .order_by(wellness.c.user_id)
+    ).all()
+
+
+def _read_chunks(after_user_id, chunk_size):
+    """Yield (user_ids, raw metrics, stored features, stored trends) matrix chunks until every user has been read"""
+    while True:
+        with db.engine.connect() as connection:
+            rows = _latest_wellness_chunk(connection, after_user_id, chunk_size)
+        if not rows:
+            return
+        user_ids = [row[0] for row in rows]
+        # None (missing metric, or no stored feature) becomes NaN and is
+        # imputed / recomputed by the predictor
+        matrix = np.array([row[1:] for row in rows], dtype=float)
+        engineered_end = len(RAW_FEATURE_COLUMNS) + len(ENGINEERED_FEATURE_COLUMNS)
+        yield (user_ids, matrix[:, :len(RAW_FEATURE_COLUMNS)],
+               matrix[:, len(RAW_FEATURE_COLUMNS):engineered_end], matrix[:, engineered_end:])
+        after_user_id = user_ids[-1]
+
+
+def _write_chunk(run_id, claim, user_ids, result):
+    """Insert one chunk's predictions with their rollups, trends and alerts and advance the run cursor atomically
+    
+    Predictions are stamped with the time they are written. Raises
+    RuntimeError, writing nothing, if another process has claimed the run.
+    Returns the number of alerts raised.
+    """
+    now = datetime.utcnow()
+    classes = result['classes']
+    rows = [
+        {
+            'user_id': user_id,
+            'prediction_date': now,
+            'risk_category': RiskCategory(category),
+            'risk_score': float(RISK_SCORES[category]),
+            'confidence_score': float(confidence),
+            'class_probabilities': dict(zip(classes, probabilities.tolist())),
+            'model_version': result['model_version'],
+            'intervention_priority': priority
+        }
+        for user_id, category, confidence, probabilities, priority in zip(
+            user_ids, result['predicted_risk_category'], result['confidence_score'],
+            result['class_probabilities'], result['intervention_priority']
+        )
+    ]
+    
+    with db.engine.begin() as connection:
+        # Advance the cursor first: the row lock it takes holds off a
+        # concurrent claim until this chunk commits
+        advanced = connection.execute(
+            update(runs).where(runs.c.id == run_id, runs.c.claimed_by == claim).values(
+                last_user_id=user_ids[-1], users_scored=runs.c.users_scored + len(rows), heartbeat_at=now
+            )
+        ).rowcount
+        if not advanced:
+            raise RuntimeError(f"Batch scoring run {run_id} was claimed by another process")
+        ids = connection.execute(
+            insert(predictions).returning(predictions.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        for row, prediction_id in zip(rows, ids):
+            row['id'] = prediction_id
+        apply_predictions_to_rollups(connection, rows)
+        apply_predictions_to_trends(connection, rows)
+        raised = evaluate_alerts(connection, rows)
+        bump_data_versions(connection, user_ids, org=True)
+    return len(raised)
+
+
+def _start_run(model_version, chunk_size, resume, claim):
+    """Claim the unfinished run for this model version when resuming, otherwise start a new run
+    
+    Only a failed run, or a running one whose heartbeat is older than
+    STALE_RUN_AFTER, is resumed, and only if it started within
+    MAX_RESUME_AGE. The claim is a compare-and-set on status and heartbeat,
+    so of two processes resuming the same run only one wins. Raises
+    RuntimeError if the run is still live in another process.
+    """
+    now = datetime.utcnow()
+    if resume:
+        run = BatchScoringRun.query.filter(
+            BatchScoringRun.status.in_(['running', 'failed'])
+        ).order_by(BatchScoringRun.id.desc()).first()
+        # A run is only continued with the model it started with
+        if run is not None and run.model_version == model_version and run.started_at > now - MAX_RESUME_AGE:
+            if run.status == 'running' and run.heartbeat_at > now - STALE_RUN_AFTER:
+                raise RuntimeError(f"Batch scoring run {run.id} is still in progress ({run.claimed_by})")
+            claimed = db.session.execute(
+                update(runs).where(
+                    runs.c.id == run.id, runs.c.status == run.status, runs.c.heartbeat_at == run.heartbeat_at
+                ).values(status='running', claimed_by=claim, heartbeat_at=now, error_details=None)
+            ).rowcount
+            db.session.commit()
+            if not claimed:
+                raise RuntimeError(f"Batch scoring run {run.id} was claimed by another process")
+            db.session.refresh(run)
+            return run, True
+    
+    run = BatchScoringRun(model_version=model_version, chunk_size=chunk_size, claimed_by=claim, heartbeat_at=now)
+    db.session.add(run)
+    db.session.commit()
+    return run, False
+
+
+def run_batch_scoring(model_path, chunk_size=5000, workers=None, resume=True):
+    """Score every user's latest WellnessData and bulk-insert RiskPrediction rows
+    
+    Users are read in user_id order, chunk_size at a time, and scored across
+    a pool of worker processes that each load the model once. Every chunk is
+    written in its own transaction together with the run's cursor, so an
+    interrupted run resumes after the last committed chunk; the run is
+    claimed by one process at a time (see _start_run). workers=1 scores
+    in-process without a pool.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    
+    local = RealisticMentalHealthPredictor()
+    local.load_model(model_path)
+    claim = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    run, resumed = _start_run(local.model_version, chunk_size, resume, claim)
+    run_id, model_version = run.id, run.model_version
+    resumed_from = run.last_user_id if resumed else None
+    already_scored = run.users_scored if resumed else 0
+    chunks = _read_chunks(run.last_user_id, chunk_size)
+    db.session.remove()
+    alerts_raised = 0
+    
+    def handle(user_ids, result):
+        nonlocal alerts_raised
+        if result['model_version'] != model_version:
+            raise RuntimeError(
+                f"Model artifact changed during the run ({model_version} -> {result['model_version']})"
+            )
+        alerts_raised += _write_chunk(run_id, claim, user_ids, result)
+    
+    try:
+        if workers <= 1:
+            if local.model is not None:
+                local.model.n_jobs = 1
+            for user_ids, raw, engineered, trend_features in chunks:
+                result = local.predict_risk_batch(raw, engineered=engineered, trends=trend_features)
+                result['model_version'] = local.model_version
+                handle(user_ids, result)
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+                # Chunks must be written in order for the cursor, so keep a
+                # bounded FIFO of in-flight chunks
+                pending = deque()
+                for user_ids, raw, engineered, trend_features in chunks:
+                    pending.append((user_ids, pool.submit(_score_features, raw, engineered, trend_features)))
+                    if len(pending) >= workers * PREFETCH_PER_WORKER:
+                        user_ids, future = pending.popleft()
+                        handle(user_ids, future.result())
+                while pending:
+                    user_ids, future = pending.popleft()
+                    handle(user_ids, future.result())
+    except BaseException as e:
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(runs).where(runs.c.id == run_id, runs.c.claimed_by == claim).values(
+                    status='failed', error_details=repr(e)
+                )
+            )
+        raise
+    
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(runs).where(runs.c.id == run_id, runs.c.claimed_by == claim).values(
+                status='completed', finished_at=datetime.utcnow()
+            )
+        )
+        users_scored = connection.execute(select(runs.c.users_scored).where(runs.c.id == run_id)).scalar_one()
+    
+    elapsed = time.perf_counter() - start
+    scored_now = users_scored - already_scored
+    return {
+        'run_id': run_id,
+        'model_version': model_version,
+        'resumed_from_user_id': resumed_from,
+        'users_scored': users_scored,
+        'users_scored_this_invocation': scored_now,
+        'alerts_raised': alerts_raised,
+        'seconds': round(elapsed, 3),
+        'users_per_second': round(scored_now / elapsed) if elapsed else None
+    }
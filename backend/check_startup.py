@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+# Fail when importing app_backend takes longer than this (seconds)
+IMPORT_BUDGET_SECONDS = float(os.environ.get('IMPORT_BUDGET_SECONDS', '1.5'))
+
+# Modules that must not be imported just by importing the app
+DEFERRED_MODULES = ['sklearn', 'joblib', 'ldap3']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app_backend
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'model_state': app_backend.model_loader.state,
+    'loaded_modules': [name for name in %r if name in sys.modules]
+}))
+"""
+
+
+def measure_import(repeats=3):
+    """Import app_backend in fresh interpreters and return the fastest run"""
+    env = dict(os.environ, MODEL_LOADING='lazy', DATABASE_URL=os.environ.get('DATABASE_URL', 'sqlite://'))
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE % DEFERRED_MODULES],
+            capture_output=True, text=True, check=True, env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run['seconds'])
+
+
+# Import-time report (run from backend/: python check_startup.py); the
+# budget itself is enforced by tests/test_startup.py
+if __name__ == "__main__":
+    result = measure_import()
+    print(f"Importing app_backend: {result['seconds']:.3f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)")
+    print(f"Model state after import: {result['model_state']}")
+    print(f"Deferred modules loaded by the import: {', '.join(result['loaded_modules']) or 'none'}")
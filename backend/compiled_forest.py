@@ -0,0 +1,208 @@
+import numpy as np
+import time
+
+
+def _ordered_key(x):
+    """Map float64 values to int64 keys with the same ordering"""
+    bits = x.view(np.int64)
+    return bits ^ ((bits >> 63) & np.int64(0x7FFFFFFFFFFFFFFF))
+
+
+def _fold_thresholds(threshold, mean, scale):
+    """Largest float64 x per split with float32((x - mean) / scale) <= threshold.
+    
+    sklearn compares float32-cast scaled values against float64 thresholds,
+    so the naive threshold * scale + mean can disagree with it for inputs
+    sitting right on a split (integer-valued features do). The scaled value
+    is monotone in x, so bisect over the float64 ordering for the exact
+    boundary instead.
+    """
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+    
+    estimate = threshold * scale + mean
+    width = np.abs(estimate) * 1e-5 + 1e-5
+    lo, hi = estimate - width, estimate + width
+    while not (goes_left(lo).all() and not goes_left(hi).any()):
+        width *= 16
+        lo = np.where(goes_left(lo), lo, estimate - width)
+        hi = np.where(goes_left(hi), estimate + width, hi)
+    
+    lo_key, hi_key = _ordered_key(lo), _ordered_key(hi)
+    while (hi_key - lo_key > 1).any():
+        mid_key = lo_key + (hi_key - lo_key) // 2
+        left = goes_left(_ordered_key(mid_key).view(np.float64))
+        lo_key = np.where(left, mid_key, lo_key)
+        hi_key = np.where(left, hi_key, mid_key)
+    return _ordered_key(lo_key).view(np.float64)
+
+
+class CompiledForest:
+    """
+    Flattened RandomForestClassifier for fast NumPy inference
+    - All trees packed into contiguous node arrays (siblings adjacent)
+    - StandardScaler folded exactly into the split thresholds
+    - Whole batches traversed level by level
+    - Node arrays can be saved and served memory-mapped (see model_artifact)
+    
+    Per-call overhead is tiny, which makes single rows and small batches
+    much faster than sklearn; for very large batches sklearn's compiled
+    traversal is still ahead (see the benchmark below).
+    """
+    
+    # Node arrays that fully describe the compiled forest
+    ARRAY_NAMES = ('feature', 'threshold', 'child', 'missing_left', 'value', 'roots')
+    
+    def __init__(self, forest, scaler=None, chunk_size=512):
+        if forest.n_outputs_ != 1:
+            raise ValueError("CompiledForest only supports single-output forests")
+        
+        self.classes_ = forest.classes_
+        self.n_trees = len(forest.estimators_)
+        self.n_features = forest.n_features_in_
+        self.chunk_size = chunk_size
+        
+        features, thresholds, children, missing_left, values, roots = [], [], [], [], [], []
+        offset = 0
+        self.max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            left, right = tree.children_left, tree.children_right
+            
+            # Renumber breadth-first so a right child always follows its sibling
+            order = [0]
+            for node in order:
+                if left[node] != -1:
+                    order.extend((left[node], right[node]))
+            order = np.array(order)
+            new_id = np.empty(tree.node_count, dtype=np.intp)
+            new_id[order] = np.arange(tree.node_count)
+            
+            is_leaf = left[order] == -1
+            node_ids = np.arange(tree.node_count) + offset
+            feature = np.where(is_leaf, 0, tree.feature[order])
+            threshold = tree.threshold[order].astype(np.float64)
+            if scaler is not None:
+                split = ~is_leaf
+                threshold[split] = _fold_thresholds(
+                    threshold[split], scaler.mean_[feature[split]], scaler.scale_[feature[split]]
+                )
+            
+            # Leaves point at themselves (x <= inf, NaN goes "left") so extra
+            # traversal steps are no-ops
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, threshold))
+            children.append(np.where(is_leaf, node_ids, new_id[np.maximum(left[order], 0)] + offset))
+            missing_left.append(np.where(is_leaf, True, tree.missing_go_to_left[order].astype(bool)))
+            
+            # Leaf class fractions, exactly what DecisionTreeClassifier.predict_proba returns
+            values.append(tree.value[order, 0, :])
+            
+            roots.append(offset)
+            offset += tree.node_count
+            self.max_depth = max(self.max_depth, tree.max_depth)
+        
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.child = np.concatenate(children).astype(np.intp)
+        self.missing_left = np.concatenate(missing_left)
+        self.value = np.concatenate(values)
+        self.roots = np.array(roots, dtype=np.intp)
+    
+    @classmethod
+    def from_arrays(cls, arrays, classes, n_features, max_depth, chunk_size=512):
+        """Rebuild from saved node arrays (which may be read-only memory maps)"""
+        engine = cls.__new__(cls)
+        for name in cls.ARRAY_NAMES:
+            setattr(engine, name, arrays[name])
+        engine.classes_ = np.array(classes, dtype=object)
+        engine.n_trees = len(engine.roots)
+        engine.n_features = n_features
+        engine.max_depth = max_depth
+        engine.chunk_size = chunk_size
+        
+        n_nodes = len(engine.feature)
+        if any(len(arrays[name]) != n_nodes for name in ('threshold', 'child', 'missing_left', 'value')):
+            raise ValueError("Node arrays have different lengths")
+        if n_nodes and (engine.child.min() < 0 or engine.child.max() >= n_nodes
+                        or engine.roots.max() >= n_nodes or engine.feature.max() >= n_features):
+            raise ValueError("Node arrays reference nodes or features out of range")
+        if engine.value.ndim != 2 or engine.value.shape[1] != len(classes):
+            raise ValueError(f"Leaf values do not have one column per class ({len(classes)})")
+        return engine
+    
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+    
+    def apply(self, X):
+        """Return the flat leaf index reached in every tree, shape (n_samples, n_trees)"""
+        n_samples = X.shape[0]
+        # Feature-major copy so a node's feature maps to one contiguous column
+        columns = np.ascontiguousarray(X.T, dtype=np.float64).ravel()
+        column_start = self.feature * n_samples
+        rows = np.arange(n_samples)[:, np.newaxis]
+        has_nan = np.isnan(columns).any()
+        
+        # Reuse the same buffers at every level instead of allocating new ones
+        node = np.repeat(self.roots[np.newaxis, :], n_samples, axis=0)
+        index = np.empty_like(node)
+        x = np.empty(node.shape)
+        threshold = np.empty(node.shape)
+        go_right = np.empty(node.shape, dtype=bool)
+        for _ in range(self.max_depth):
+            np.take(column_start, node, out=index)
+            index += rows
+            np.take(columns, index, out=x)
+            np.take(self.threshold, node, out=threshold)
+            np.greater(x, threshold, out=go_right)
+            if has_nan:
+                # NaNs follow the direction learned during training, like sklearn
+                nan = np.isnan(x)
+                go_right[nan] = ~self.missing_left.take(node[nan])
+            np.take(self.child, node, out=index)
+            np.add(index, go_right, out=node)
+        return node
+    
+    def predict_proba(self, X):
+        """Class probabilities for an unscaled feature matrix"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        
+        proba = np.empty((X.shape[0], len(self.classes_)))
+        for start in range(0, X.shape[0], self.chunk_size):
+            leaves = self.apply(X[start:start + self.chunk_size])
+            # Summing tree by tree matches sklearn's accumulation order bit for bit
+            proba[start:start + self.chunk_size] = self.value[leaves.T].sum(axis=0) / self.n_trees
+        return proba
+    
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def _time_per_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+# Benchmark against sklearn (parity is covered by tests/test_compiled_forest.py)
+if __name__ == "__main__":
+    from stress_predictor import RealisticMentalHealthPredictor
+    
+    predictor = RealisticMentalHealthPredictor()
+    predictor.load_model('models/realistic_mental_health_model.pkl')
+    engine = predictor.engine
+    
+    data = predictor.create_realistic_data(n_samples=10000)
+    X = predictor._feature_frame(data).to_numpy(dtype=np.float64)
+    
+    print(f"{'rows':>6} {'sklearn rows/s':>16} {'compiled rows/s':>16}")
+    for n_rows in [1, 100, 1000, len(X)]:
+        repeats = max(3, 2000 // n_rows)
+        sk_time = _time_per_call(
+            lambda: predictor.model.predict_proba(predictor.scaler.transform(X[:n_rows])), repeats
+        )
+        en_time = _time_per_call(lambda: engine.predict_proba(X[:n_rows]), repeats)
+        print(f"{n_rows:>6} {n_rows / sk_time:>16,.0f} {n_rows / en_time:>16,.0f}")
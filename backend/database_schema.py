@@ -1,9 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, and_
+from sqlalchemy.orm import aliased
 from datetime import datetime
 import enum
 
+from stress_predictor import TREND_FEATURE_COLUMNS
+
 db = SQLAlchemy()
 
+# The 13 model inputs stored on every WellnessData row
+WELLNESS_METRIC_COLUMNS = [
+    'hours_per_week', 'overtime_hours', 'meetings_per_day',
+    'manager_support_score', 'vacation_days_taken', 'after_hours_emails',
+    'deadline_pressure', 'work_life_balance_score', 'team_collaboration_score',
+    'daily_breaks', 'weekend_work_days', 'role_clarity_score', 'job_tenure_months'
+]
+
+# Rolling trend features kept per user in wellness_trends
+WELLNESS_TREND_COLUMNS = TREND_FEATURE_COLUMNS
+
 class RiskCategory(enum.Enum):
     LOW = "Low"
     MEDIUM = "Medium"
@@ -19,7 +34,7 @@ class User(db.Model):
     display_name = db.Column(db.String(120), nullable=False)
     department = db.Column(db.String(100))
     title = db.Column(db.String(100))
-    manager_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    manager_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     office = db.Column(db.String(100))
     role = db.Column(db.String(50), default='employee')
     ad_guid = db.Column(db.String(100), unique=True)
@@ -30,8 +45,11 @@ class User(db.Model):
     wellness_data = db.relationship('WellnessData', backref='user', lazy='dynamic')
     survey_responses = db.relationship('SurveyResponse', backref='user', lazy='dynamic')
     predictions = db.relationship('RiskPrediction', backref='user', lazy='dynamic')
-    alerts = db.relationship('Alert', backref='user', lazy='dynamic')
+    alerts = db.relationship('Alert', backref='user', lazy='dynamic', foreign_keys='Alert.user_id')
     subordinates = db.relationship('User', backref=db.backref('manager', remote_side=[id]))
+    
+    # Keyset pages of one department in id order
+    __table_args__ = (db.Index('ix_users_department_id', 'department', 'id'),)
 
 class WellnessData(db.Model):
     __tablename__ = 'wellness_data'
@@ -63,6 +81,70 @@ class WellnessData(db.Model):
     
     __table_args__ = (db.UniqueConstraint('user_id', 'date'),)
 
+class WellnessFeatures(db.Model):
+    """Engineered features for one WellnessData row, computed when the row is written (see feature_store)"""
+    __tablename__ = 'wellness_features'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    feature_version = db.Column(db.Integer, nullable=False, index=True)  # stress_predictor.FEATURE_VERSION
+    
+    # NULL when an input metric is missing (scoring then imputes and recomputes)
+    workload_intensity = db.Column(db.Float)
+    support_deficit = db.Column(db.Float)
+    wlb_composite = db.Column(db.Float)
+    pressure_no_support = db.Column(db.Float)
+    tenure_factor = db.Column(db.Float)
+    
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.ForeignKeyConstraint(['user_id', 'date'], ['wellness_data.user_id', 'wellness_data.date'],
+                                ondelete='CASCADE'),
+    )
+
+class WellnessTrends(db.Model):
+    """Rolling trend features as of a user's latest WellnessData row, advanced week by week (see rolling_features)"""
+    __tablename__ = 'wellness_trends'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    last_date = db.Column(db.Date, nullable=False)  # Latest week folded into the state
+    weeks_seen = db.Column(db.Integer, nullable=False)
+    trend_version = db.Column(db.Integer, nullable=False, index=True)  # stress_predictor.TREND_VERSION
+    state = db.Column(db.JSON, nullable=False)  # Running sums and the last 12 weeks' values
+    
+    # stress_predictor.TREND_FEATURE_COLUMNS; NULL when the window has no observed value
+    hours_per_week_mean_4w = db.Column(db.Float)
+    hours_per_week_slope_4w = db.Column(db.Float)
+    hours_per_week_volatility_4w = db.Column(db.Float)
+    hours_per_week_mean_12w = db.Column(db.Float)
+    hours_per_week_slope_12w = db.Column(db.Float)
+    hours_per_week_volatility_12w = db.Column(db.Float)
+    overtime_hours_mean_4w = db.Column(db.Float)
+    overtime_hours_slope_4w = db.Column(db.Float)
+    overtime_hours_volatility_4w = db.Column(db.Float)
+    overtime_hours_mean_12w = db.Column(db.Float)
+    overtime_hours_slope_12w = db.Column(db.Float)
+    overtime_hours_volatility_12w = db.Column(db.Float)
+    after_hours_emails_mean_4w = db.Column(db.Float)
+    after_hours_emails_slope_4w = db.Column(db.Float)
+    after_hours_emails_volatility_4w = db.Column(db.Float)
+    after_hours_emails_mean_12w = db.Column(db.Float)
+    after_hours_emails_slope_12w = db.Column(db.Float)
+    after_hours_emails_volatility_12w = db.Column(db.Float)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# A trend feature without a column (or a column without a feature) would make stored and served trends disagree
+_TREND_TABLE_COLUMNS = [
+    column.name for column in WellnessTrends.__table__.columns
+    if column.name not in ('user_id', 'last_date', 'weeks_seen', 'trend_version', 'state', 'updated_at')
+]
+if _TREND_TABLE_COLUMNS != WELLNESS_TREND_COLUMNS:
+    raise RuntimeError(
+        f"wellness_trends columns {_TREND_TABLE_COLUMNS} do not match stress_predictor.TREND_FEATURE_COLUMNS"
+    )
+
 class RiskPrediction(db.Model):
     __tablename__ = 'risk_predictions'
     
@@ -78,10 +160,104 @@ class RiskPrediction(db.Model):
     class_probabilities = db.Column(db.JSON)
     feature_contributions = db.Column(db.JSON)
     
-    model_version = db.Column(db.String(50))
+    model_version = db.Column(db.String(50), nullable=False)  # Model that produced this prediction
     intervention_priority = db.Column(db.String(50))
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Serves "latest prediction per user" lookups without touching the table order
+        db.Index('ix_risk_predictions_user_date', 'user_id', 'prediction_date'),
+        # Keyset pages newest first
+        db.Index('ix_risk_predictions_date_id', 'prediction_date', 'id'),
+    )
+
+class DepartmentRiskRollup(db.Model):
+    """Per (department, office, period) counts of each employee's latest prediction"""
+    __tablename__ = 'department_risk_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    department = db.Column(db.String(100), nullable=False)
+    office = db.Column(db.String(100), nullable=False)
+    period = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    
+    employee_count = db.Column(db.Integer, nullable=False, default=0)
+    healthy_count = db.Column(db.Integer, nullable=False, default=0)    # Low
+    at_risk_count = db.Column(db.Integer, nullable=False, default=0)    # Medium
+    high_risk_count = db.Column(db.Integer, nullable=False, default=0)  # High + Critical
+    risk_score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('period', 'department', 'office'),)
+    
+    @property
+    def avg_risk_score(self):
+        return self.risk_score_sum / self.employee_count if self.employee_count else 0.0
+
+class RiskRollupMember(db.Model):
+    """The prediction each employee currently contributes to a period's rollup"""
+    __tablename__ = 'risk_rollup_members'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    period = db.Column(db.String(7), primary_key=True)
+    
+    department = db.Column(db.String(100), nullable=False)
+    office = db.Column(db.String(100), nullable=False)
+    prediction_id = db.Column(db.Integer, nullable=False)
+    prediction_date = db.Column(db.DateTime, nullable=False)
+    risk_category = db.Column(db.Enum(RiskCategory), nullable=False)
+    risk_score = db.Column(db.Float, nullable=False)
+
+class RiskTrendBucket(db.Model):
+    """One user's predictions aggregated per week or month, kept current as they are written (see risk_trends)"""
+    __tablename__ = 'risk_trend_buckets'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # week or month
+    period_start = db.Column(db.Date, primary_key=True)  # Monday of the week / first of the month
+    
+    prediction_count = db.Column(db.Integer, nullable=False, default=0)
+    risk_score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    risk_score_min = db.Column(db.Float, nullable=False)
+    risk_score_max = db.Column(db.Float, nullable=False)
+    
+    # The period's most recent prediction
+    latest_prediction_id = db.Column(db.Integer, nullable=False)
+    latest_prediction_date = db.Column(db.DateTime, nullable=False)
+    latest_risk_score = db.Column(db.Float, nullable=False)
+    latest_risk_category = db.Column(db.Enum(RiskCategory), nullable=False)
+    
+    # Holds every column a trend query reads, so a user's date range is an index-only range scan
+    __table_args__ = (
+        db.Index('ix_risk_trend_buckets_covering', 'user_id', 'granularity', 'period_start', 'prediction_count',
+                 'risk_score_sum', 'risk_score_min', 'risk_score_max', 'latest_risk_score', 'latest_risk_category'),
+    )
+
+class DataVersion(db.Model):
+    """Change counter per response-cache scope (user:<id>, team:<manager id>, org, epoch), bumped by writes"""
+    __tablename__ = 'data_versions'
+    
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BatchScoringRun(db.Model):
+    """Progress of a batch scoring job; last_user_id and heartbeat_at are committed with each chunk"""
+    __tablename__ = 'batch_scoring_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20), default='running')  # running, completed, failed
+    model_version = db.Column(db.String(50), nullable=False)
+    claimed_by = db.Column(db.String(100))  # host:pid:token of the process writing the run
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)
+    users_scored = db.Column(db.Integer, nullable=False, default=0)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    error_details = db.Column(db.Text)
 
 class Survey(db.Model):
     __tablename__ = 'surveys'
@@ -119,13 +295,15 @@ class SurveyResponse(db.Model):
     
     survey = db.relationship('Survey', backref='responses')
     question = db.relationship('SurveyQuestion', backref='responses')
+    
+    __table_args__ = (db.Index('ix_survey_responses_user_date', 'user_id', 'response_date'),)
 
 class Alert(db.Model):
     __tablename__ = 'alerts'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    alert_type = db.Column(db.String(50), nullable=False)  # high_risk, overtime, survey_concern
+    alert_type = db.Column(db.String(50), nullable=False)  # high_risk, risk_increase, overtime, survey_concern
     message = db.Column(db.Text, nullable=False)
     priority = db.Column(db.String(20), nullable=False)  # urgent, high, medium, low
     status = db.Column(db.String(20), default='active')  # active, acknowledged, resolved
@@ -136,6 +314,29 @@ class Alert(db.Model):
     acknowledged_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     acknowledger = db.relationship('User', foreign_keys=[acknowledged_by], backref='acknowledged_alerts')
+    
+    __table_args__ = (
+        # Serves the alert engine's per-user dedupe lookups
+        db.Index('ix_alerts_user_type', 'user_id', 'alert_type', 'created_at'),
+        # Keyset pages newest first, overall and per status
+        db.Index('ix_alerts_created_id', 'created_at', 'id'),
+        db.Index('ix_alerts_status_created_id', 'status', 'created_at', 'id'),
+    )
+
+class AlertEvent(db.Model):
+    """Append-only log of alert creations and status changes; the id doubles as the alert stream's event id"""
+    __tablename__ = 'alert_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.Integer, db.ForeignKey('alerts.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    manager_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # The employee's manager when the event happened
+    event = db.Column(db.String(20), nullable=False)  # created, acknowledged, resolved
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Replays one manager's events after a Last-Event-ID
+    __table_args__ = (db.Index('ix_alert_events_manager', 'manager_id', 'id'),)
 
 class ADSyncLog(db.Model):
     __tablename__ = 'ad_sync_logs'
@@ -148,7 +349,7 @@ class ADSyncLog(db.Model):
     groups_synced = db.Column(db.Integer, default=0)
     errors = db.Column(db.Integer, default=0)
     error_details = db.Column(db.JSON)
-    
+
 class ModelMetrics(db.Model):
     __tablename__ = 'model_metrics'
     
@@ -162,11 +363,13 @@ class ModelMetrics(db.Model):
     f1_score = db.Column(db.Float)
     
     training_date = db.Column(db.DateTime, default=datetime.utcnow)
+    training_seconds = db.Column(db.Float)
+    phase_timings = db.Column(db.JSON)  # Seconds per training phase (preprocess, fit, cross_validation, ...)
     predictions_count = db.Column(db.Integer, default=0)
     last_prediction = db.Column(db.DateTime)
     
     status = db.Column(db.String(20), default='active')  # active, staging, archived
-    
+
 class Resource(db.Model):
     __tablename__ = 'resources'
     
@@ -181,7 +384,7 @@ class Resource(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     views = db.Column(db.Integer, default=0)
-    
+
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
     
@@ -207,12 +410,90 @@ def get_user_latest_wellness_data(user_id):
     """Get the most recent wellness data for a user"""
     return WellnessData.query.filter_by(user_id=user_id).order_by(WellnessData.date.desc()).first()
 
-def get_team_risk_summary(manager_id):
-    """Get risk summary for a manager's team"""
-    manager = User.query.get(manager_id)
-    if not manager:
+def get_team_latest_data(manager_id):
+    """Get a manager's direct reports with their latest wellness metrics, trends and prediction
+    
+    One query: each report is outer-joined to its most recent WellnessData
+    and RiskPrediction rows (picked with row_number() windows), so members
+    without data are still returned with NULLs. Trend features are only
+    joined when they are as of that latest WellnessData row.
+    """
+    team = db.session.query(User.id).filter(User.manager_id == manager_id).scalar_subquery()
+    
+    ranked_wellness = db.session.query(
+        WellnessData,
+        func.row_number().over(
+            partition_by=WellnessData.user_id,
+            order_by=(WellnessData.date.desc(), WellnessData.id.desc())
+        ).label('recency')
+    ).filter(WellnessData.user_id.in_(team)).subquery()
+    wellness = aliased(WellnessData, ranked_wellness)
+    
+    ranked_predictions = db.session.query(
+        RiskPrediction,
+        func.row_number().over(
+            partition_by=RiskPrediction.user_id,
+            order_by=(RiskPrediction.prediction_date.desc(), RiskPrediction.id.desc())
+        ).label('recency')
+    ).filter(RiskPrediction.user_id.in_(team)).subquery()
+    prediction = aliased(RiskPrediction, ranked_predictions)
+    
+    return db.session.query(
+        User.id.label('user_id'),
+        User.employee_id,
+        User.display_name,
+        User.title,
+        User.department,
+        wellness.date.label('wellness_date'),
+        *[getattr(wellness, col).label(col) for col in WELLNESS_METRIC_COLUMNS],
+        WellnessTrends.trend_version,
+        *[getattr(WellnessTrends, col) for col in WELLNESS_TREND_COLUMNS],
+        prediction.prediction_date,
+        prediction.risk_category,
+        prediction.risk_score,
+        prediction.confidence_score
+    ).outerjoin(
+        wellness, and_(wellness.user_id == User.id, ranked_wellness.c.recency == 1)
+    ).outerjoin(
+        WellnessTrends, and_(WellnessTrends.user_id == User.id, WellnessTrends.last_date == wellness.date)
+    ).outerjoin(
+        prediction, and_(prediction.user_id == User.id, ranked_predictions.c.recency == 1)
+    ).filter(User.manager_id == manager_id).order_by(User.display_name, User.id).all()
+
+def get_team_risk_summary(manager_id, include_indirect=False):
+    """Get risk summary for a manager's team
+    
+    Counts each report's latest prediction in one grouped query. With
+    include_indirect=True the whole reporting chain below the manager is
+    included via a recursive CTE.
+    """
+    if db.session.get(User, manager_id) is None:
         return None
     
+    team = db.session.query(User.id).filter(User.manager_id == manager_id)
+    if include_indirect:
+        team = team.cte('team', recursive=True)
+        team = team.union_all(db.session.query(User.id).join(team, User.manager_id == team.c.id))
+        team = db.session.query(team.c.id)
+    
+    ranked = db.session.query(
+        RiskPrediction.risk_category.label('risk_category'),
+        func.row_number().over(
+            partition_by=RiskPrediction.user_id,
+            order_by=(RiskPrediction.prediction_date.desc(), RiskPrediction.id.desc())
+        ).label('recency')
+    ).filter(RiskPrediction.user_id.in_(team.scalar_subquery())).subquery()
+    
+    counts = db.session.query(
+        ranked.c.risk_category, func.count()
+    ).filter(ranked.c.recency == 1).group_by(ranked.c.risk_category).all()
+    
+    summary_keys = {
+        RiskCategory.LOW: 'low_risk',
+        RiskCategory.MEDIUM: 'medium_risk',
+        RiskCategory.HIGH: 'high_risk',
+        RiskCategory.CRITICAL: 'critical_risk'
+    }
     team_summary = {
         'total': 0,
         'low_risk': 0,
@@ -220,25 +501,29 @@ def get_team_risk_summary(manager_id):
         'high_risk': 0,
         'critical_risk': 0
     }
-    
-    for subordinate in manager.subordinates:
-        latest_prediction = RiskPrediction.query.filter_by(
-            user_id=subordinate.id
-        ).order_by(RiskPrediction.prediction_date.desc()).first()
-        
-        if latest_prediction:
-            team_summary['total'] += 1
-            if latest_prediction.risk_category == RiskCategory.LOW:
-                team_summary['low_risk'] += 1
-            elif latest_prediction.risk_category == RiskCategory.MEDIUM:
-                team_summary['medium_risk'] += 1
-            elif latest_prediction.risk_category == RiskCategory.HIGH:
-                team_summary['high_risk'] += 1
-            elif latest_prediction.risk_category == RiskCategory.CRITICAL:
-                team_summary['critical_risk'] += 1
+    for category, count in counts:
+        team_summary['total'] += count
+        team_summary[summary_keys[category]] += count
     
     return team_summary
 
+def get_team_recent_alerts(manager_id, limit=10):
+    """Most recent active alerts for a manager's direct reports, newest first"""
+    return db.session.query(
+        Alert.id, Alert.alert_type, Alert.message, Alert.priority, Alert.created_at, User.display_name
+    ).join(User, User.id == Alert.user_id).filter(
+        User.manager_id == manager_id, Alert.status == 'active'
+    ).order_by(Alert.created_at.desc(), Alert.id.desc()).limit(limit).all()
+
+def get_latest_prediction(user_id):
+    """A user's most recent stored RiskPrediction, or None"""
+    return db.session.query(
+        RiskPrediction.prediction_date, RiskPrediction.risk_category, RiskPrediction.risk_score,
+        RiskPrediction.confidence_score
+    ).filter(RiskPrediction.user_id == user_id).order_by(
+        RiskPrediction.prediction_date.desc(), RiskPrediction.id.desc()
+    ).first()
+
 def create_alert(user_id, alert_type, message, priority='medium'):
     """Create a new alert for a user"""
     alert = Alert(
@@ -250,3 +535,40 @@ def create_alert(user_id, alert_type, message, priority='medium'):
     db.session.add(alert)
     db.session.commit()
     return alert
+
+def _model_metrics_row(model_name, model_version, training_metrics):
+    """Get or create the ModelMetrics row for model_version, filled from the training run's metrics"""
+    metrics = ModelMetrics.query.filter_by(model_name=model_name, model_version=model_version).first()
+    if metrics is None:
+        metrics = ModelMetrics(model_name=model_name, model_version=model_version)
+        db.session.add(metrics)
+    training_metrics = training_metrics or {}
+    if 'test_accuracy' in training_metrics:
+        metrics.accuracy = training_metrics['test_accuracy']
+    for field in ('precision', 'recall', 'f1_score', 'training_seconds'):
+        if field in training_metrics:
+            setattr(metrics, field, training_metrics[field])
+    if 'phase_seconds' in training_metrics:
+        metrics.phase_timings = training_metrics['phase_seconds']
+    return metrics
+
+def record_trained_model(model_name, model_version, training_metrics=None):
+    """Record a freshly trained model as 'staging' until it is activated"""
+    metrics = _model_metrics_row(model_name, model_version, training_metrics)
+    if metrics.status != 'active':
+        metrics.status = 'staging'
+    db.session.commit()
+    return metrics
+
+def activate_model_version(model_name, model_version, training_metrics=None):
+    """Record model_version as the active model, archiving the previously active one"""
+    ModelMetrics.query.filter(
+        ModelMetrics.model_name == model_name,
+        ModelMetrics.status == 'active',
+        ModelMetrics.model_version != model_version
+    ).update({'status': 'archived'}, synchronize_session=False)
+    
+    metrics = _model_metrics_row(model_name, model_version, training_metrics)
+    metrics.status = 'active'
+    db.session.commit()
+    return metrics
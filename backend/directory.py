@@ -0,0 +1,299 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# memberOf groups granting each WorkWell role, most privileged first
+ROLE_GROUPS = [
+    ('WorkWell-Admins', 'admin'),
+    ('WorkWell-HR', 'hr'),
+    ('WorkWell-Managers', 'manager'),
+    ('WorkWell-Users', 'employee')
+]
+USER_ATTRIBUTES = [
+    'displayName', 'userPrincipalName', 'sAMAccountName', 'department', 'title', 'manager',
+    'physicalDeliveryOfficeName', 'memberOf', 'employeeID'
+]
+MOCK_URL = 'mock'  # LDAP_URL for the in-process stand-in directory
+MOCK_SERVICE_DN = 'CN=workwell-svc,OU=Service Accounts,{base_dn}'
+MOCK_SERVICE_PASSWORD = 'workwell-svc'
+
+
+class DirectoryUnavailable(Exception):
+    """Raised when the directory server cannot be reached or no pooled connection frees up in time"""
+
+
+def _common_name(dn):
+    """'Mike Chen' from 'CN=Mike Chen,OU=Users,...'; other values are returned unchanged"""
+    if dn and dn[:3].upper() == 'CN=':
+        return dn[3:].split(',', 1)[0]
+    return dn
+
+
+def role_for_groups(member_of):
+    """The WorkWell role granted by a memberOf list, or None for users outside the app's groups"""
+    groups = {_common_name(dn).lower() for dn in member_of}
+    for group, role in ROLE_GROUPS:
+        if group.lower() in groups:
+            return role
+    return None
+
+
+class ConnectionPool:
+    """
+    At most size bound service connections, each used by one thread at a time
+    - Connections are opened on demand and reused most recently returned first
+    - One that raises while in use is unbound and replaced on a later checkout
+    - Idle connections are dropped in a forked child rather than shared with the parent
+    """
+    
+    def __init__(self, connect, size=4, timeout=5):
+        self.size = size
+        self.timeout = timeout
+        
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pid = os.getpid()
+        self.opened = 0
+        self.discarded = 0
+    
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            self._idle = queue.LifoQueue()
+            self._slots = threading.BoundedSemaphore(self.size)
+            self._pid = os.getpid()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise DirectoryUnavailable(f"No directory connection became free within {self.timeout}s")
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+                self.opened += 1
+            try:
+                yield connection
+            except BaseException:
+                self.discarded += 1
+                try:
+                    connection.unbind()
+                except Exception:
+                    pass
+                raise
+            self._idle.put(connection)
+        finally:
+            self._slots.release()
+    
+    def stats(self):
+        return {'size': self.size, 'idle': self._idle.qsize(), 'opened': self.opened, 'discarded': self.discarded}
+
+
+class Directory:
+    """
+    Active Directory users for login and per-request role checks
+    - Service-account searches go through a bounded ConnectionPool
+    - User attributes and memberOf -> role are cached for ttl_seconds, and
+      unknown users for negative_ttl_seconds, so authorized requests are
+      served from memory and only login and cache misses reach LDAP
+    - Passwords are checked with a bind as the user and never cached
+    - url 'mock' serves the seed users from ldap3's offline mock server
+    ldap3 is only imported on first use, keeping it off the app's import path.
+    """
+    
+    def __init__(self, url=MOCK_URL, base_dn='DC=corp,DC=company,DC=com', bind_dn=None, bind_password=None,
+                 pool_size=4, pool_timeout=5, ttl_seconds=300, negative_ttl_seconds=60, max_entries=10000,
+                 seed=None):
+        self.url = url
+        self.base_dn = base_dn
+        self.bind_dn = bind_dn
+        self.bind_password = bind_password
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.seed = seed or {}
+        self.pool = ConnectionPool(self._service_connection, size=pool_size, timeout=pool_timeout)
+        
+        self._server = None
+        self._server_lock = threading.Lock()
+        self._entries = OrderedDict()  # lowercased email -> (expires_at, user or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.searches = 0
+        self.binds = 0
+    
+    @property
+    def mock(self):
+        return self.url == MOCK_URL
+    
+    def get_user(self, email):
+        """The cached directory record for email (None if there is no such user), searching LDAP on a miss"""
+        email = email.lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(email)
+                if entry[1] is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        user = self._search(email)
+        self._remember(email, user)
+        return user
+    
+    def authenticate(self, email, password):
+        """The user's freshly searched record if password binds as them, else None"""
+        email = email.lower()
+        if not password:
+            return None  # An empty simple bind is an anonymous bind and would "succeed"
+        user = self._search(email)
+        self._remember(email, user)
+        if user is None:
+            return None
+        
+        import ldap3
+        from ldap3.core.exceptions import LDAPException
+        connection = ldap3.Connection(
+            self._get_server(), user=user['dn'], password=password,
+            client_strategy=ldap3.MOCK_SYNC if self.mock else ldap3.SYNC, receive_timeout=self.pool.timeout
+        )
+        with self._lock:
+            self.binds += 1
+        try:
+            return user if connection.bind() else None
+        except LDAPException as e:
+            raise DirectoryUnavailable(f"Directory bind failed: {e}")
+        finally:
+            connection.unbind()
+    
+    def forget(self, email=None):
+        """Drop one user's cached record, or every one"""
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email.lower(), None)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'url': self.url,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+                'searches': self.searches,
+                'binds': self.binds,
+                'pool': self.pool.stats()
+            }
+    
+    def _remember(self, email, user):
+        ttl = self.ttl_seconds if user is not None else self.negative_ttl_seconds
+        with self._lock:
+            self._entries.pop(email, None)
+            self._entries[email] = (time.monotonic() + ttl, user)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _search(self, email):
+        from ldap3.core.exceptions import LDAPException
+        from ldap3.utils.conv import escape_filter_chars
+        
+        search_filter = f"(&(objectClass=user)(userPrincipalName={escape_filter_chars(email)}))"
+        try:
+            with self.pool.connection() as connection:
+                with self._lock:
+                    self.searches += 1
+                connection.search(self.base_dn, search_filter, attributes=USER_ATTRIBUTES, size_limit=2)
+                entries = list(connection.entries)
+        except LDAPException as e:
+            raise DirectoryUnavailable(f"Directory search failed: {e}")
+        if len(entries) != 1:
+            return None
+        return self._user_record(entries[0])
+    
+    def _user_record(self, entry):
+        """An entry in the shape the API returns for users (the same keys as the seed records)"""
+        attributes = entry.entry_attributes_as_dict
+        
+        def first(name):
+            values = attributes.get(name) or [None]
+            return values[0]
+        
+        member_of = [str(dn) for dn in attributes.get('memberOf', [])]
+        return {
+            'dn': entry.entry_dn,
+            'displayName': first('displayName'),
+            'userPrincipalName': first('userPrincipalName'),
+            'samAccountName': first('sAMAccountName'),
+            'department': first('department'),
+            'title': first('title'),
+            'manager': _common_name(first('manager')),
+            'office': first('physicalDeliveryOfficeName'),
+            'memberOf': member_of,
+            'role': role_for_groups(member_of),
+            'employeeId': first('employeeID')
+        }
+    
+    def _get_server(self):
+        with self._server_lock:
+            if self._server is None:
+                import ldap3
+                if self.mock:
+                    self._server = ldap3.Server('workwell-directory', get_info=ldap3.NONE)
+                    self._load_seed(self._server)
+                else:
+                    self._server = ldap3.Server(self.url, get_info=ldap3.NONE, connect_timeout=self.pool.timeout)
+            return self._server
+    
+    def _service_connection(self):
+        import ldap3
+        from ldap3.core.exceptions import LDAPException
+        server = self._get_server()
+        if self.mock:
+            user, password = MOCK_SERVICE_DN.format(base_dn=self.base_dn), MOCK_SERVICE_PASSWORD
+        else:
+            user, password = self.bind_dn, self.bind_password
+        connection = ldap3.Connection(
+            server, user=user, password=password, client_strategy=ldap3.MOCK_SYNC if self.mock else ldap3.SYNC,
+            receive_timeout=self.pool.timeout
+        )
+        try:
+            bound = connection.bind()
+        except LDAPException as e:
+            raise DirectoryUnavailable(f"Cannot connect to the directory at {self.url}: {e}")
+        if not bound:
+            raise DirectoryUnavailable(f"Service account bind to {self.url} failed: {connection.result['description']}")
+        return connection
+    
+    def _load_seed(self, server):
+        """Add the service account and the seed users to the mock server's tree"""
+        import ldap3
+        loader = ldap3.Connection(server, client_strategy=ldap3.MOCK_SYNC)
+        loader.strategy.add_entry(MOCK_SERVICE_DN.format(base_dn=self.base_dn), {
+            'objectClass': ['top', 'person'], 'userPassword': MOCK_SERVICE_PASSWORD
+        })
+        for email, user in self.seed.items():
+            loader.strategy.add_entry(f"CN={user['displayName']},OU=Users,{self.base_dn}", {
+                'objectClass': ['top', 'person', 'organizationalPerson', 'user'],
+                'userPrincipalName': email,
+                'userPassword': user['password'],
+                'displayName': user['displayName'],
+                'sAMAccountName': user['samAccountName'],
+                'department': user['department'],
+                'title': user['title'],
+                'manager': user['manager'],
+                'physicalDeliveryOfficeName': user['office'],
+                'memberOf': user['memberOf'],
+                'employeeID': user['employeeId']
+            })
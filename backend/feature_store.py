@@ -0,0 +1,218 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import event, select, delete, exists, func, tuple_, and_, or_
+
+from database_schema import db, WellnessData, WellnessFeatures
+from rolling_features import needs_trend_rebuild, rebuild_stale_trends
+from stress_predictor import (
+    RealisticMentalHealthPredictor, RAW_FEATURE_COLUMNS, ENGINEERED_FEATURE_COLUMNS, CLIP_BOUNDS, FEATURE_VERSION
+)
+
+wellness = WellnessData.__table__
+features = WellnessFeatures.__table__
+
+# (user_id, date) keys looked up per query when refreshing
+KEY_BATCH_SIZE = 2000
+
+# PostgreSQL advisory lock key held while a process backfills, so only one does
+BACKFILL_LOCK_KEY = 0x57570001
+
+_engineering = RealisticMentalHealthPredictor(use_compiled_engine=False)
+
+backfill_status = {
+    'state': 'idle', 'feature_version': FEATURE_VERSION, 'rows': 0, 'trend_users': 0, 'seconds': None, 'error': None
+}
+_start_lock = threading.Lock()
+
+
+def compute_engineered_features(raw):
+    """Engineered features (ENGINEERED_FEATURE_COLUMNS order) for raw metric rows (RAW_FEATURE_COLUMNS order)
+    
+    Outliers are clipped exactly as preprocessing does, but nothing is
+    imputed: a feature whose inputs are missing comes out NaN.
+    """
+    raw = np.asarray(raw, dtype=float).reshape(-1, len(RAW_FEATURE_COLUMNS))
+    frame = pd.DataFrame(raw, columns=RAW_FEATURE_COLUMNS)
+    for col, (lower, upper) in CLIP_BOUNDS.items():
+        frame[col] = np.clip(frame[col], lower, upper)
+    return _engineering.engineer_realistic_features(frame)[ENGINEERED_FEATURE_COLUMNS].to_numpy()
+
+
+def _upsert_statement():
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk upsert is not implemented for {dialect}")
+    
+    stmt = insert(features)
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'date'],
+        set_={col: stmt.excluded[col] for col in ['feature_version', *ENGINEERED_FEATURE_COLUMNS, 'computed_at']}
+    )
+
+
+def write_features(connection, user_ids, dates, raw):
+    """Compute and upsert the stored features for wellness rows given as parallel user_ids, dates, raw matrix"""
+    if not len(user_ids):
+        return 0
+    values = compute_engineered_features(raw).astype(object)
+    values[pd.isna(values)] = None
+    computed_at = datetime.utcnow()
+    records = [
+        {'user_id': int(user_id), 'date': day, 'feature_version': FEATURE_VERSION,
+         'computed_at': computed_at, **dict(zip(ENGINEERED_FEATURE_COLUMNS, row))}
+        for user_id, day, row in zip(user_ids, dates, values.tolist())
+    ]
+    connection.execute(_upsert_statement(), records)
+    return len(records)
+
+
+def _write_rows(connection, rows):
+    """write_features for (user_id, date, *RAW_FEATURE_COLUMNS) result rows"""
+    if not rows:
+        return 0
+    raw = np.array([row[2:] for row in rows], dtype=float)  # None -> NaN
+    return write_features(connection, [row[0] for row in rows], [row[1] for row in rows], raw)
+
+
+def refresh_features(connection, keys):
+    """Recompute the stored features for these (user_id, date) keys from their current wellness_data rows"""
+    keys = list(keys)
+    written = 0
+    for start in range(0, len(keys), KEY_BATCH_SIZE):
+        rows = connection.execute(
+            select(wellness.c.user_id, wellness.c.date, *[wellness.c[col] for col in RAW_FEATURE_COLUMNS])
+            .where(tuple_(wellness.c.user_id, wellness.c.date).in_(keys[start:start + KEY_BATCH_SIZE]))
+        ).all()
+        written += _write_rows(connection, rows)
+    return written
+
+
+def stored_features_join():
+    """Outer-join condition for reading current-version features next to wellness_data"""
+    return and_(
+        features.c.user_id == wellness.c.user_id,
+        features.c.date == wellness.c.date,
+        features.c.feature_version == FEATURE_VERSION
+    )
+
+
+def needs_backfill(connection):
+    """True when some wellness rows have no stored features at FEATURE_VERSION"""
+    stale = connection.execute(
+        select(features.c.user_id).where(features.c.feature_version != FEATURE_VERSION).limit(1)
+    ).first()
+    if stale is not None:
+        return True
+    stored = connection.execute(select(func.count()).select_from(features)).scalar()
+    return stored != connection.execute(select(func.count()).select_from(wellness)).scalar()
+
+
+def backfill_features(chunk_users=2000):
+    """Compute features for every wellness row that is missing them or has another feature_version
+    
+    Walks users in id order, chunk_users at a time, one transaction per
+    chunk; safe to interrupt and re-run.
+    """
+    start = time.perf_counter()
+    rows_written, after_user_id = 0, 0
+    while True:
+        with db.engine.begin() as connection:
+            user_ids = connection.execute(
+                select(wellness.c.user_id).where(wellness.c.user_id > after_user_id)
+                .group_by(wellness.c.user_id).order_by(wellness.c.user_id).limit(chunk_users)
+            ).scalars().all()
+            if not user_ids:
+                break
+            rows = connection.execute(
+                select(wellness.c.user_id, wellness.c.date, *[wellness.c[col] for col in RAW_FEATURE_COLUMNS])
+                .outerjoin(features, and_(
+                    features.c.user_id == wellness.c.user_id, features.c.date == wellness.c.date
+                ))
+                .where(wellness.c.user_id > after_user_id, wellness.c.user_id <= user_ids[-1])
+                .where(or_(features.c.feature_version.is_(None), features.c.feature_version != FEATURE_VERSION))
+            ).all()
+            rows_written += _write_rows(connection, rows)
+        after_user_id = user_ids[-1]
+        backfill_status['rows'] = rows_written
+    
+    # Rows whose wellness_data was deleted where the FK cascade is not enforced (SQLite)
+    with db.engine.begin() as connection:
+        connection.execute(delete(features).where(~exists().where(
+            wellness.c.user_id == features.c.user_id, wellness.c.date == features.c.date
+        )))
+    return {'rows': rows_written, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+@contextmanager
+def _backfill_lock():
+    """Yield whether this process may backfill: a session advisory lock on PostgreSQL, always True elsewhere"""
+    if db.engine.dialect.name != 'postgresql':
+        yield True
+        return
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        acquired = connection.execute(select(func.pg_try_advisory_lock(BACKFILL_LOCK_KEY))).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(select(func.pg_advisory_unlock(BACKFILL_LOCK_KEY)))
+
+
+def _run_backfill(app):
+    with app.app_context():
+        try:
+            with _backfill_lock() as acquired:
+                if not acquired:
+                    backfill_status['state'] = 'locked'  # Another process is backfilling
+                    return
+                with db.engine.connect() as connection:
+                    features_stale = needs_backfill(connection)
+                    trends_stale = needs_trend_rebuild(connection)
+                if not (features_stale or trends_stale):
+                    backfill_status['state'] = 'current'
+                    return
+                backfill_status['state'] = 'running'
+                start = time.perf_counter()
+                if features_stale:
+                    result = backfill_features()
+                    print(f"Feature store backfilled to version {FEATURE_VERSION}: {result['rows']} rows in {result['seconds']}s")
+                if trends_stale:
+                    result = rebuild_stale_trends()
+                    backfill_status['trend_users'] = result['users']
+                    print(f"Rebuilt rolling trends for {result['users']} users in {result['seconds']}s")
+                backfill_status.update(state='current', seconds=round(time.perf_counter() - start, 3))
+        except Exception as e:
+            backfill_status.update(state='failed', error=f"{type(e).__name__}: {e}")
+
+
+def start_backfill(app):
+    """Check the feature store in a background thread and backfill features or trends that are stale
+    
+    Runs once per process; later calls return at once.
+    """
+    if backfill_status['state'] != 'idle':
+        return
+    with _start_lock:
+        if backfill_status['state'] != 'idle':
+            return
+        backfill_status['state'] = 'checking'
+    threading.Thread(target=_run_backfill, args=(app,), name='feature-backfill', daemon=True).start()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_written_wellness(session, flush_context):
+    """Keep stored features current for wellness rows written through the ORM"""
+    keys = {
+        (obj.user_id, obj.date) for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, WellnessData)
+    }
+    if keys:
+        refresh_features(session.connection(), keys)
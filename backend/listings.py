@@ -0,0 +1,163 @@
+import base64
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select, tuple_, literal, DateTime
+
+from database_schema import db, User, Alert, RiskPrediction, RiskCategory
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000  # Rows fetched from the cursor and written per chunk
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+users = User.__table__
+alerts = Alert.__table__
+predictions = RiskPrediction.__table__
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+class Listing:
+    """
+    A table read in keyset order
+    - columns: the fields of each row; names must be unique and include the sort columns
+    - sort: columns that together identify a row, in the order of an index that serves them
+    - filters: query argument -> (column, parser) for equality filters
+    Pages continue strictly after the previous page's last sort key, so
+    each costs an index seek however deep it is and rows written in
+    between never shift or repeat the rest of the listing.
+    """
+    
+    def __init__(self, columns, sort, from_obj, descending=False, filters=None):
+        self.columns = columns
+        self.sort = sort
+        self.from_obj = from_obj
+        self.descending = descending
+        self.filters = filters or {}
+        self.names = [column.name for column in columns]
+    
+    def query(self, filters=None, cursor=None):
+        """The ordered select for these filters, after cursor if given (raises ValueError on bad input)"""
+        stmt = select(*self.columns).select_from(self.from_obj)
+        for name, value in (filters or {}).items():
+            if name not in self.filters:
+                raise ValueError(f"Unknown filter '{name}' (expected one of: {', '.join(self.filters)})")
+            column, parse = self.filters[name]
+            try:
+                stmt = stmt.where(column == parse(value))
+            except ValueError:
+                raise ValueError(f"Invalid value for {name}: '{value}'")
+        if cursor:
+            after = tuple_(*[literal(value, column.type) for column, value in zip(self.sort, self.decode_cursor(cursor))])
+            stmt = stmt.where(tuple_(*self.sort) < after if self.descending else tuple_(*self.sort) > after)
+        return stmt.order_by(*[column.desc() if self.descending else column for column in self.sort])
+    
+    def encode_cursor(self, row):
+        key = [_jsonable(row._mapping[column.name]) for column in self.sort]
+        return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+    
+    def decode_cursor(self, cursor):
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if not isinstance(key, list) or len(key) != len(self.sort):
+                raise ValueError
+            return [
+                datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+                for column, value in zip(self.sort, key)
+            ]
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+    
+    def page(self, filters=None, cursor=None, limit=PAGE_SIZE):
+        """Up to limit rows after cursor, with the cursor of the next page (None on the last one)"""
+        rows = db.session.execute(self.query(filters, cursor).limit(limit + 1)).all()
+        next_cursor = self.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return {
+            'items': [{name: _jsonable(value) for name, value in zip(self.names, row)} for row in rows[:limit]],
+            'limit': limit,
+            'next_cursor': next_cursor
+        }
+    
+    def export(self, engine, stmt, fmt):
+        """Yield the rows of stmt as NDJSON or CSV text, EXPORT_BATCH_SIZE rows at a time
+        
+        Rows come straight off a streaming cursor on a connection of its
+        own, so the export never holds more than one batch and outlives
+        the request's session. Closing the generator (a client
+        disconnect) releases the connection.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}' (expected one of: {', '.join(EXPORT_FORMATS)})")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(self.names)
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+            for rows in result.partitions():
+                for row in rows:
+                    if fmt == 'csv':
+                        writer.writerow([_jsonable(value) for value in row])
+                    else:
+                        buffer.write(json.dumps({name: _jsonable(value) for name, value in zip(self.names, row)}))
+                        buffer.write('\n')
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+LISTINGS = {
+    # Employees in id order (ix_users_department_id when filtered by department)
+    'users': Listing(
+        [users.c.id, users.c.employee_id, users.c.email, users.c.display_name, users.c.department, users.c.title,
+         users.c.office, users.c.role, users.c.manager_id],
+        [users.c.id],
+        users,
+        filters={
+            'department': (users.c.department, str),
+            'office': (users.c.office, str),
+            'role': (users.c.role, str),
+            'manager_id': (users.c.manager_id, int)
+        }
+    ),
+    # Alerts newest first (ix_alerts_created_id, or ix_alerts_status_created_id by status)
+    'alerts': Listing(
+        [alerts.c.id, alerts.c.user_id, users.c.employee_id, users.c.display_name, alerts.c.alert_type,
+         alerts.c.message, alerts.c.priority, alerts.c.status, alerts.c.created_at, alerts.c.acknowledged_at,
+         alerts.c.resolved_at],
+        [alerts.c.created_at, alerts.c.id],
+        alerts.join(users, users.c.id == alerts.c.user_id),
+        descending=True,
+        filters={
+            'status': (alerts.c.status, str),
+            'priority': (alerts.c.priority, str),
+            'alert_type': (alerts.c.alert_type, str),
+            'user_id': (alerts.c.user_id, int)
+        }
+    ),
+    # Predictions newest first (ix_risk_predictions_date_id)
+    'predictions': Listing(
+        [predictions.c.id, predictions.c.user_id, users.c.employee_id, predictions.c.prediction_date,
+         predictions.c.risk_category, predictions.c.risk_score, predictions.c.confidence_score,
+         predictions.c.model_version, predictions.c.intervention_priority],
+        [predictions.c.prediction_date, predictions.c.id],
+        predictions.join(users, users.c.id == predictions.c.user_id),
+        descending=True,
+        filters={
+            'risk_category': (predictions.c.risk_category, RiskCategory),
+            'model_version': (predictions.c.model_version, str),
+            'user_id': (predictions.c.user_id, int)
+        }
+    )
+}
@@ -0,0 +1,195 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+
+# Bump when the directory layout or manifest fields change incompatibly
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+class ArtifactError(ValueError):
+    """The artifact directory is missing, corrupt or incompatible"""
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _manifest_checksum(manifest):
+    """Checksum over every manifest field, which includes each array file's sha256"""
+    body = {key: value for key, value in manifest.items() if key != 'checksum'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def _swap_link(directory, version):
+    """Point the directory symlink at version and return the version it pointed at before
+    
+    Replacing a symlink is atomic, so readers see either the old or the
+    new artifact. A directory left by the older layout is moved aside into
+    a version of its own first, and moved back if the link cannot replace it.
+    """
+    link = f"{directory}.lnk-{uuid.uuid4().hex[:8]}"
+    os.symlink(os.path.basename(version), link)
+    legacy = None
+    try:
+        if os.path.islink(directory):
+            previous = os.path.realpath(directory)
+        elif os.path.exists(directory):
+            legacy = previous = f"{directory}.v-legacy-{uuid.uuid4().hex[:8]}"
+            os.rename(directory, legacy)
+        else:
+            previous = None
+        try:
+            os.replace(link, directory)
+        except BaseException:
+            if legacy:
+                os.rename(legacy, directory)
+            raise
+    except BaseException:
+        if os.path.lexists(link):
+            os.unlink(link)
+        raise
+    return previous
+
+
+def _prune_versions(directory, keep):
+    """Remove version directories of this artifact other than those in keep"""
+    keep = {os.path.realpath(path) for path in keep if path}
+    for path in glob.glob(f"{glob.escape(directory)}.v-*"):
+        if os.path.realpath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_artifact(directory, arrays, manifest, files=None):
+    """Write arrays as uncompressed .npy files plus manifest.json under directory
+    
+    directory is a symlink to a sibling version directory. Each write
+    assembles a new version and then atomically repoints the link, so
+    readers never see a half-written or missing model, and a failed write
+    leaves the previous version in place. files maps extra filenames to
+    callables that write them given a path; they are checksummed in the
+    manifest but not needed for serving.
+    """
+    directory = os.path.normpath(directory)
+    version = f"{directory}.v-{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(version)
+    try:
+        entries = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            filename = f"{name}.npy"
+            path = os.path.join(version, filename)
+            np.save(path, array, allow_pickle=False)
+            entries[name] = {
+                'file': filename,
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'sha256': _sha256_file(path)
+            }
+        
+        extra = {}
+        for filename, write in (files or {}).items():
+            path = os.path.join(version, filename)
+            write(path)
+            extra[filename] = {'sha256': _sha256_file(path)}
+        
+        manifest = dict(manifest, format_version=FORMAT_VERSION, arrays=entries, files=extra,
+                        created_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        manifest['checksum'] = _manifest_checksum(manifest)
+        with open(os.path.join(version, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        
+        previous = _swap_link(directory, version)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    # The replaced version stays for readers that resolved the link just
+    # before the swap; processes that mapped older files keep their pages
+    _prune_versions(directory, [version, previous])
+    return manifest
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        raise ArtifactError(f"{directory} has no {MANIFEST_NAME}")
+    with open(path) as f:
+        manifest = json.load(f)
+    
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(
+            f"Unsupported artifact format {manifest.get('format_version')} (expected {FORMAT_VERSION})"
+        )
+    if manifest.get('checksum') != _manifest_checksum(manifest):
+        raise ArtifactError(f"Manifest checksum mismatch in {directory}")
+    return manifest
+
+
+def read_artifact(directory, mmap_mode='r', verify=True):
+    """Return (manifest, arrays) with the arrays memory-mapped read-only by default
+    
+    Mapped arrays live in the page cache, so every process serving the same
+    artifact shares one copy. verify=True re-hashes each array file against
+    the manifest before mapping it. The link is resolved once, so every
+    file comes from the same version even if it is replaced meanwhile.
+    """
+    directory = os.path.realpath(directory)
+    manifest = read_manifest(directory)
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        path = os.path.join(directory, entry['file'])
+        if not os.path.isfile(path):
+            raise ArtifactError(f"Missing array file {entry['file']}")
+        if verify and _sha256_file(path) != entry['sha256']:
+            raise ArtifactError(f"Checksum mismatch for {entry['file']}")
+        array = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+        if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+            raise ArtifactError(
+                f"{entry['file']} is {array.dtype.str}{list(array.shape)}, "
+                f"manifest says {entry['dtype']}{entry['shape']}"
+            )
+        arrays[name] = array
+    return manifest, arrays
+
+
+def verified_file(directory, filename):
+    """Path of an extra file written with the artifact, after checking its checksum"""
+    directory = os.path.realpath(directory)
+    entry = read_manifest(directory).get('files', {}).get(filename)
+    if entry is None:
+        raise ArtifactError(f"{directory} has no {filename}")
+    path = os.path.join(directory, filename)
+    if not os.path.isfile(path) or _sha256_file(path) != entry['sha256']:
+        raise ArtifactError(f"{filename} in {directory} is missing or corrupt")
+    return path
+
+
+# Convert a joblib .pkl model into the directory format:
+#   python model_artifact.py models/realistic_mental_health_model.pkl models/realistic_mental_health_model
+if __name__ == "__main__":
+    import sys
+    from stress_predictor import RealisticMentalHealthPredictor
+    
+    source, destination = sys.argv[1], sys.argv[2]
+    predictor = RealisticMentalHealthPredictor()
+    predictor.load_model(source)
+    manifest = predictor.save_artifact(destination)
+    print(f"Wrote {destination} (model_version {manifest['model_version']}, checksum {manifest['checksum'][:12]})")
+    
+    served = RealisticMentalHealthPredictor()
+    served.load_model(destination)
+    sample = predictor.create_realistic_data(n_samples=2000)
+    X = predictor._feature_frame(sample).to_numpy(dtype=np.float64)
+    identical = np.array_equal(predictor.model.predict_proba(predictor.scaler.transform(X)),
+                               served._predict_proba(X))
+    print(f"Identical probabilities from the mapped artifact: {identical}")
+    assert identical, "Artifact predictions diverged from the source model"
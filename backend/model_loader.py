@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+from stress_predictor import RealisticMentalHealthPredictor, RAW_FEATURE_COLUMNS, RISK_SCORES
+from model_artifact import MANIFEST_NAME
+
+CANARY_ROWS = 64
+
+
+class ModelNotReady(Exception):
+    """Raised when a request needs the model before it has finished loading"""
+
+
+def _canary_batch(predictor, n_rows=CANARY_ROWS):
+    """Deterministic rows around the training medians, with some missing values"""
+    medians = predictor.imputation_medians or {}
+    center = np.array([medians.get(col, 5.0) for col in RAW_FEATURE_COLUMNS])
+    rng = np.random.default_rng(0)
+    rows = center * rng.uniform(0.5, 1.5, (n_rows, len(RAW_FEATURE_COLUMNS)))
+    rows[rng.random(rows.shape) < 0.05] = np.nan
+    return rows
+
+
+def warm_up(predictor):
+    """Run a canary batch through both inference paths; raises ValueError if the output looks wrong"""
+    batch = predictor.predict_risk_batch(_canary_batch(predictor))
+    probabilities = batch['class_probabilities']
+    if not np.isfinite(probabilities).all() or not np.allclose(probabilities.sum(axis=1), 1.0):
+        raise ValueError("Canary batch produced invalid class probabilities")
+    unknown = set(batch['classes']) - set(RISK_SCORES)
+    if unknown:
+        raise ValueError(f"Model predicts unknown categories: {', '.join(sorted(map(str, unknown)))}")
+    
+    single = predictor.predict_risk(dict(zip(RAW_FEATURE_COLUMNS, _canary_batch(predictor, 1)[0].tolist())))
+    if single['predicted_risk_category'] not in RISK_SCORES:
+        raise ValueError("Canary record produced an unknown category")
+
+
+def artifact_fingerprint(path):
+    """Changes whenever the artifact at path is replaced (None if it does not exist)"""
+    try:
+        if os.path.isdir(path):
+            with open(os.path.join(path, MANIFEST_NAME)) as f:
+                return json.load(f).get('checksum')
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except (OSError, ValueError):
+        return None
+
+
+class ModelLoader:
+    """
+    Loads the predictor artifact off the request path
+    - 'background': a daemon thread starts loading as soon as start() is called
+    - 'lazy': the first get() loads the model
+    - Never trains: a missing artifact is reported as a load failure
+    - reload() / watch() load a new artifact, warm it up and swap it in;
+      requests already holding the old predictor finish on it
+    """
+    
+    def __init__(self, model_path, mode='background', on_load=None, logger=None):
+        if mode not in ('background', 'lazy'):
+            raise ValueError(f"Unknown model loading mode '{mode}' (expected 'background' or 'lazy')")
+        self.model_path = model_path
+        self.mode = mode
+        self.on_load = on_load  # Called with each predictor that goes live
+        self.logger = logger or logging.getLogger(__name__)
+        self.predictor = None
+        self.error = None
+        self.load_seconds = None
+        self.swaps = 0
+        self.last_reload = None
+        self.watch_interval = None
+        self._live_fingerprint = None      # Artifact currently serving
+        self._rejected_fingerprint = None  # Last artifact that failed to load
+        self._reset_threads()
+    
+    def _reset_threads(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._thread = None
+        self._watcher = None
+    
+    @property
+    def state(self):
+        """not_loaded, loading, ready or failed"""
+        self._check_fork()
+        if self.predictor is not None:
+            return 'ready'
+        if self.error is not None:
+            return 'failed'
+        if self._thread is not None or self._lock.locked():
+            return 'loading'
+        return 'not_loaded'
+    
+    @property
+    def ready(self):
+        return self.state == 'ready'
+    
+    def start(self):
+        """Begin loading in a background thread (no-op once started or loaded)"""
+        self._check_fork()
+        with self._lock:
+            if self._thread is not None or self.predictor is not None:
+                return
+            self._thread = threading.Thread(target=self._load, name='model-loader', daemon=True)
+            self._thread.start()
+    
+    def get(self, timeout=None):
+        """Return the loaded predictor, waiting up to timeout seconds for a load in progress"""
+        self._check_fork()
+        predictor = self.predictor
+        if predictor is not None:
+            return predictor
+        if self.mode == 'lazy' and self._thread is None:
+            self._load()
+        elif self._thread is None:
+            self.start()
+        
+        self._loaded.wait(timeout)
+        predictor = self.predictor
+        if predictor is None:
+            if self.error is not None:
+                raise ModelNotReady(f"Model failed to load: {self.error}")
+            raise ModelNotReady("Model is still loading")
+        return predictor
+    
+    def reload(self, path=None, wait=False):
+        """Load path (default: the current model path), warm it up and swap it in
+        
+        Runs in a background thread unless wait=True. Returns False if a
+        reload is already in progress. A failed load or canary leaves the
+        current model serving.
+        """
+        self._check_fork()
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        path = path or self.model_path
+        self.last_reload = {'path': path, 'state': 'loading', 'started_at': time.time()}
+        if wait:
+            self._reload(path)
+        else:
+            threading.Thread(target=self._reload, args=(path,), name='model-reload', daemon=True).start()
+        return True
+    
+    def watch(self, interval=30):
+        """Poll the model path and reload whenever the artifact there is replaced"""
+        self._check_fork()
+        self.watch_interval = interval
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='model-watch', daemon=True)
+            self._watcher.start()
+    
+    def status(self):
+        predictor = self.predictor
+        return {
+            'state': self.state,
+            'mode': self.mode,
+            'model_path': self.model_path,
+            'model_version': predictor.model_version if predictor is not None else None,
+            'load_seconds': self.load_seconds,
+            'error': self.error,
+            'swaps': self.swaps,
+            'watch_interval': self.watch_interval,
+            'last_reload': self.last_reload
+        }
+    
+    def _read(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found - create it with 'flask --app app_backend train-model'")
+        predictor = RealisticMentalHealthPredictor()
+        predictor.load_model(path)
+        warm_up(predictor)
+        return predictor
+    
+    def _activate(self, predictor, path, fingerprint):
+        # A single reference assignment: requests that already fetched the
+        # old predictor keep using it, new requests get this one
+        self.predictor = predictor
+        self.model_path = path
+        self._live_fingerprint = fingerprint
+        if self.on_load is not None:
+            try:
+                self.on_load(predictor)
+            except Exception:
+                self.logger.exception("Model %s is live, but on_load failed", predictor.model_version)
+    
+    def _load(self):
+        with self._lock:
+            if self.predictor is not None:
+                return
+            start = time.perf_counter()
+            try:
+                fingerprint = artifact_fingerprint(self.model_path)
+                self._activate(self._read(self.model_path), self.model_path, fingerprint)
+                self.error = None
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+            finally:
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self._loaded.set()
+    
+    def _reload(self, path):
+        start = time.perf_counter()
+        fingerprint = artifact_fingerprint(path)
+        try:
+            predictor = self._read(path)
+            previous = self.predictor
+            self._activate(predictor, path, fingerprint)
+            self.error = None
+            self._loaded.set()
+            self.swaps += 1
+            self.last_reload.update(
+                state='swapped', model_version=predictor.model_version,
+                previous_version=previous.model_version if previous is not None else None
+            )
+        except Exception as e:
+            self._rejected_fingerprint = fingerprint
+            self.last_reload.update(state='failed', error=f"{type(e).__name__}: {e}")
+        finally:
+            self.last_reload['seconds'] = round(time.perf_counter() - start, 3)
+            self._reload_lock.release()
+    
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            current = artifact_fingerprint(self.model_path)
+            # A busy reload is simply retried on the next poll; an artifact
+            # that already failed is not retried until it changes again
+            if current is not None and current not in (self._live_fingerprint, self._rejected_fingerprint):
+                self.reload(wait=True)
+    
+    def _check_fork(self):
+        """A forked child (e.g. gunicorn --preload) inherits no threads, so restart them"""
+        if self._pid == os.getpid():
+            return
+        self._reset_threads()
+        if self.predictor is None:
+            self.error = None
+            if self.mode == 'background':
+                self.start()
+        if self.watch_interval:
+            self.watch(self.watch_interval)
@@ -0,0 +1,117 @@
+import hashlib
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from stress_predictor import RAW_FEATURE_COLUMNS, TREND_FEATURE_COLUMNS
+
+# Every record field the predictor reads
+KEY_COLUMNS = RAW_FEATURE_COLUMNS + TREND_FEATURE_COLUMNS
+
+
+class PredictionCache:
+    """
+    In-process LRU/TTL cache for predictor results
+    - Keyed by the quantized input features plus the model version
+    - Bounded by entry count and approximate memory footprint
+    - Cleared automatically when a different model version shows up
+    """
+    
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl_seconds=3600, decimals=6):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self._model_version = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def make_key(self, employee_data, model_version):
+        """Hash the normalized model inputs together with the model version"""
+        parts = [str(model_version)]
+        for col in KEY_COLUMNS:
+            if col not in employee_data:
+                parts.append('-')
+                continue
+            value = employee_data[col]
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                parts.append('nan')
+            else:
+                # Quantize so 42 / 42.0 / 42.0000000001 share an entry
+                parts.append(repr(round(float(value), self.decimals) + 0.0))
+        return hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+    
+    def get_or_compute(self, employee_data, model_version, compute):
+        """Return the cached result for employee_data, computing it on a miss"""
+        key = self.make_key(employee_data, model_version)
+        now = time.monotonic()
+        
+        with self._lock:
+            if model_version != self._model_version:
+                # A new or retrained model makes every cached result stale
+                self._clear_locked()
+                self._model_version = model_version
+            
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._remove_locked(key)
+            self.misses += 1
+        
+        value = compute(employee_data)
+        size = self._estimate_size(value)
+        
+        with self._lock:
+            if model_version == self._model_version and size <= self.max_bytes:
+                if key in self._entries:
+                    self._remove_locked(key)
+                self._entries[key] = (now + self.ttl_seconds, size, value)
+                self.current_bytes += size
+                while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                    self._remove_locked(next(iter(self._entries)))
+                    self.evictions += 1
+        return value
+    
+    def invalidate(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._clear_locked()
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'model_version': self._model_version
+            }
+    
+    def _remove_locked(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+    
+    def _clear_locked(self):
+        self._entries.clear()
+        self.current_bytes = 0
+    
+    def _estimate_size(self, value):
+        """Approximate memory held by a (possibly nested) result dict"""
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(
+                sys.getsizeof(k) + self._estimate_size(v) for k, v in value.items()
+            )
+        return sys.getsizeof(value)
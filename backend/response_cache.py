@@ -0,0 +1,189 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import event, select
+
+from database_schema import db, User, WellnessData, RiskPrediction, Alert, DataVersion
+
+EPOCH = 'epoch'  # Part of every key; bumped when whole tables are reloaded
+ORG = 'org'
+CHUNK_SIZE = 500  # Keeps IN (...) lists well under database parameter limits
+
+data_versions = DataVersion.__table__
+users = User.__table__
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def team_scope(manager_id):
+    return f'team:{manager_id}'
+
+
+def _upsert_statement(increment=True):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk upsert is not implemented for {dialect}")
+    
+    stmt = insert(data_versions)
+    return stmt.on_conflict_do_update(
+        index_elements=['scope'],
+        set_={
+            'version': data_versions.c.version + 1 if increment else stmt.excluded.version,
+            'updated_at': stmt.excluded.updated_at
+        }
+    )
+
+
+def _affected_scopes(connection, user_ids, user=True, team=True, org=False):
+    user_ids = list({int(user_id) for user_id in user_ids})
+    scopes = {user_scope(user_id) for user_id in user_ids} if user else set()
+    if team:
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            scopes.update(team_scope(manager_id) for manager_id in connection.execute(
+                select(users.c.manager_id).distinct()
+                .where(users.c.id.in_(user_ids[start:start + CHUNK_SIZE]), users.c.manager_id.isnot(None))
+            ).scalars())
+    if org and user_ids:
+        scopes.add(ORG)
+    return scopes
+
+
+def _bump_scopes(connection, scopes):
+    if not scopes:
+        return
+    now = datetime.utcnow()
+    # Sorted so concurrent writers take the row locks in the same order
+    connection.execute(_upsert_statement(), [
+        {'scope': scope, 'version': 1, 'updated_at': now} for scope in sorted(scopes)
+    ])
+
+
+def bump_data_versions(connection, user_ids, user=True, team=True, org=False):
+    """Invalidate cached responses built from these users' data
+    
+    user covers their own dashboards, team their managers' dashboards and
+    org the organization-wide ones. Runs in the writer's transaction.
+    """
+    _bump_scopes(connection, _affected_scopes(connection, user_ids, user=user, team=team, org=org))
+
+
+def bump_epoch(connection):
+    """Invalidate every cached response, e.g. after tables were dropped and reloaded"""
+    # Time-based, so it never repeats a value seen before a reset
+    connection.execute(_upsert_statement(increment=False), [
+        {'scope': EPOCH, 'version': time.time_ns() // 1000000, 'updated_at': datetime.utcnow()}
+    ])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_written_versions(session, flush_context):
+    """Invalidate cached responses for wellness data, predictions and alerts written through the ORM"""
+    written = {WellnessData: set(), RiskPrediction: set(), Alert: set()}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) in written:
+            written[type(obj)].add(obj.user_id)
+    if not any(written.values()):
+        return
+    connection = session.connection()
+    scopes = _affected_scopes(connection, written[WellnessData])
+    scopes |= _affected_scopes(connection, written[RiskPrediction], org=True)
+    scopes |= _affected_scopes(connection, written[Alert], user=False)
+    _bump_scopes(connection, scopes)
+
+
+def read_data_versions(scopes):
+    """Current versions of EPOCH and scopes (in that order) and the newest time any of them changed"""
+    names = [EPOCH, *scopes]
+    rows = {
+        row.scope: row for row in db.session.execute(
+            select(data_versions.c.scope, data_versions.c.version, data_versions.c.updated_at)
+            .where(data_versions.c.scope.in_(names))
+        )
+    }
+    versions = tuple(rows[name].version if name in rows else 0 for name in names)
+    return versions, max((row.updated_at for row in rows.values()), default=None)
+
+
+class ResponseCache:
+    """
+    In-process cache of rendered GET responses
+    - Keyed by the request (endpoint, arguments, caller scope) plus the data versions it was built from
+    - A lookup with newer versions drops the stale entry, so writes evict exactly what they touched
+    - Bounded by entry count and total body size, least recently used first
+    """
+    
+    def __init__(self, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        
+        self._entries = OrderedDict()  # request key -> (versions, etag, last_modified, body, mimetype)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.evictions = 0
+    
+    def get(self, key, versions):
+        """The (etag, last_modified, body, mimetype) cached for key at these versions, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1:]
+            if entry is not None:
+                self._remove_locked(key)
+                self.invalidations += 1
+            self.misses += 1
+            return None
+    
+    def put(self, key, versions, body, mimetype, last_modified):
+        """Cache a rendered body and return its (etag, last_modified, body, mimetype)"""
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = (versions, etag, last_modified, body, mimetype)
+        with self._lock:
+            if len(body) <= self.max_bytes:
+                if key in self._entries:
+                    self._remove_locked(key)
+                self._entries[key] = entry
+                self.current_bytes += len(body)
+                while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                    self._remove_locked(next(iter(self._entries)))
+                    self.evictions += 1
+        return entry[1:]
+    
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def _remove_locked(self, key):
+        self.current_bytes -= len(self._entries.pop(key)[3])
@@ -0,0 +1,314 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from datetime import datetime
+from sqlalchemy import event, select, insert, update, delete, bindparam, and_, func, case
+
+from database_schema import (
+    db, User, RiskPrediction, RiskCategory, DepartmentRiskRollup, RiskRollupMember
+)
+
+# Which rollup counter each predicted category lands in
+ROLLUP_BUCKETS = {
+    RiskCategory.LOW: 'healthy_count',
+    RiskCategory.MEDIUM: 'at_risk_count',
+    RiskCategory.HIGH: 'high_risk_count',
+    RiskCategory.CRITICAL: 'high_risk_count'
+}
+ROLLUP_COUNTERS = ['employee_count', 'healthy_count', 'at_risk_count', 'high_risk_count', 'risk_score_sum']
+MEMBER_FIELDS = ['department', 'office', 'prediction_id', 'prediction_date', 'risk_category', 'risk_score']
+UNASSIGNED = 'Unassigned'  # Department/office for users without one
+CHUNK_SIZE = 500  # Keeps IN (...) lists well under database parameter limits
+
+rollups = DepartmentRiskRollup.__table__
+members = RiskRollupMember.__table__
+predictions = RiskPrediction.__table__
+users = User.__table__
+
+
+def risk_rollup_period(moment):
+    """Rollup period (calendar month) a prediction timestamp belongs to"""
+    return moment.strftime('%Y-%m')
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, Mapping) else getattr(row, name)
+
+
+def _add_contribution(deltas, member, sign):
+    counters = deltas[(member['period'], member['department'], member['office'])]
+    counters['employee_count'] += sign
+    counters[ROLLUP_BUCKETS[member['risk_category']]] += sign
+    counters['risk_score_sum'] += sign * member['risk_score']
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT (period, department, office) DO UPDATE adding the inserted counters"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk upsert is not implemented for {dialect}")
+    
+    stmt = insert(rollups)
+    return stmt.on_conflict_do_update(
+        index_elements=['period', 'department', 'office'],
+        set_={
+            'updated_at': func.current_timestamp(),
+            **{counter: getattr(rollups.c, counter) + stmt.excluded[counter] for counter in ROLLUP_COUNTERS}
+        }
+    )
+
+
+def _apply_rollup_deltas(connection, deltas):
+    """Add per-(period, department, office) counter deltas to the rollup table
+    
+    One upsert, so concurrent first writers to a new (period, department,
+    office) both land their deltas instead of one hitting the unique key.
+    """
+    deltas = {key: counters for key, counters in deltas.items() if any(counters.values())}
+    if not deltas:
+        return
+    
+    # Sorted so concurrent writers take the row locks in the same order
+    connection.execute(_upsert_statement(), [
+        dict(period=period, department=department, office=office,
+             **{counter: counters.get(counter, 0) if counter == 'risk_score_sum'
+                else int(counters.get(counter, 0)) for counter in ROLLUP_COUNTERS})
+        for (period, department, office), counters in sorted(deltas.items())
+    ])
+
+
+def apply_predictions_to_rollups(connection, new_predictions):
+    """Fold newly written predictions into the department rollups
+    
+    Each employee contributes their latest prediction per period. A newer
+    prediction replaces the old contribution (old bucket -1, new bucket +1)
+    instead of recomputing the period; older, backfilled predictions are
+    ignored. new_predictions may be RiskPrediction objects or mappings with
+    id, user_id, prediction_date, risk_category and risk_score.
+    """
+    rows = sorted(
+        (
+            {
+                'id': _field(p, 'id'),
+                'user_id': _field(p, 'user_id'),
+                'prediction_date': _field(p, 'prediction_date'),
+                'risk_category': RiskCategory(_field(p, 'risk_category')),
+                'risk_score': float(_field(p, 'risk_score'))
+            }
+            for p in new_predictions
+        ),
+        key=lambda p: (p['prediction_date'], p['id'])
+    )
+    if not rows:
+        return
+    
+    user_ids = {p['user_id'] for p in rows}
+    org = {}
+    for chunk in _chunks(user_ids):
+        for user_id, department, office in connection.execute(
+            select(users.c.id, users.c.department, users.c.office).where(users.c.id.in_(chunk))
+        ):
+            org[user_id] = (department or UNASSIGNED, office or UNASSIGNED)
+    
+    current = {}
+    by_period = defaultdict(set)
+    for p in rows:
+        by_period[risk_rollup_period(p['prediction_date'])].add(p['user_id'])
+    for period, period_users in by_period.items():
+        for chunk in _chunks(period_users):
+            for member in connection.execute(
+                select(members).where(members.c.period == period, members.c.user_id.in_(chunk))
+            ).mappings():
+                current[(member['user_id'], period)] = dict(member)
+    existing_members = set(current)
+    
+    deltas = defaultdict(lambda: defaultdict(float))
+    changed = {}
+    for p in rows:
+        period = risk_rollup_period(p['prediction_date'])
+        key = (p['user_id'], period)
+        previous = current.get(key)
+        if previous and (previous['prediction_date'], previous['prediction_id']) >= (p['prediction_date'], p['id']):
+            continue
+        
+        department, office = org.get(p['user_id'], (UNASSIGNED, UNASSIGNED))
+        member = {
+            'user_id': p['user_id'],
+            'period': period,
+            'department': department,
+            'office': office,
+            'prediction_id': p['id'],
+            'prediction_date': p['prediction_date'],
+            'risk_category': p['risk_category'],
+            'risk_score': p['risk_score']
+        }
+        if previous:
+            _add_contribution(deltas, previous, -1)
+        _add_contribution(deltas, member, +1)
+        current[key] = changed[key] = member
+    
+    inserts = [member for key, member in changed.items() if key not in existing_members]
+    updates = [member for key, member in changed.items() if key in existing_members]
+    if inserts:
+        connection.execute(insert(members), inserts)
+    if updates:
+        connection.execute(
+            update(members).where(and_(
+                members.c.user_id == bindparam('b_user_id'),
+                members.c.period == bindparam('b_period')
+            )).values({col: bindparam(f'v_{col}') for col in MEMBER_FIELDS}),
+            [
+                dict(b_user_id=member['user_id'], b_period=member['period'],
+                     **{f'v_{col}': member[col] for col in MEMBER_FIELDS})
+                for member in updates
+            ]
+        )
+    _apply_rollup_deltas(connection, deltas)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _rollup_new_predictions(session, flush_context):
+    """Keep the rollups current for predictions written through the ORM"""
+    new_predictions = [obj for obj in session.new if isinstance(obj, RiskPrediction)]
+    if new_predictions:
+        apply_predictions_to_rollups(session.connection(), new_predictions)
+
+
+def _latest_per_period(connection):
+    """Stream each user's latest prediction per period (uses ix_risk_predictions_user_date)"""
+    result = connection.execution_options(stream_results=True, yield_per=5000).execute(
+        select(
+            predictions.c.id, predictions.c.user_id, predictions.c.prediction_date,
+            predictions.c.risk_category, predictions.c.risk_score
+        ).order_by(predictions.c.user_id, predictions.c.prediction_date, predictions.c.id)
+    )
+    latest, current_user = {}, None
+    for row in result:
+        if row.user_id != current_user:
+            yield from latest.values()
+            latest, current_user = {}, row.user_id
+        latest[risk_rollup_period(row.prediction_date)] = row
+    yield from latest.values()
+
+
+def rebuild_risk_rollups():
+    """Recompute all rollups from risk_predictions, using each user's current department/office"""
+    with db.engine.begin() as connection:
+        connection.execute(delete(members))
+        connection.execute(delete(rollups))
+        
+        org = {
+            user_id: (department or UNASSIGNED, office or UNASSIGNED)
+            for user_id, department, office in connection.execute(
+                select(users.c.id, users.c.department, users.c.office)
+            )
+        }
+        
+        deltas = defaultdict(lambda: defaultdict(float))
+        batch = []
+        member_count = 0
+        for row in _latest_per_period(connection):
+            department, office = org.get(row.user_id, (UNASSIGNED, UNASSIGNED))
+            member = {
+                'user_id': row.user_id,
+                'period': risk_rollup_period(row.prediction_date),
+                'department': department,
+                'office': office,
+                'prediction_id': row.id,
+                'prediction_date': row.prediction_date,
+                'risk_category': row.risk_category,
+                'risk_score': row.risk_score
+            }
+            _add_contribution(deltas, member, +1)
+            batch.append(member)
+            if len(batch) >= 5000:
+                connection.execute(insert(members), batch)
+                member_count += len(batch)
+                batch = []
+        if batch:
+            connection.execute(insert(members), batch)
+            member_count += len(batch)
+        
+        _apply_rollup_deltas(connection, deltas)
+    return {'members': member_count, 'rollups': len(deltas)}
+
+
+def check_risk_rollups(tolerance=1e-6):
+    """Compare the rollups against risk_predictions; returns a list of problems (empty when consistent)"""
+    problems = []
+    with db.engine.connect() as connection:
+        stored = {
+            (user_id, period): prediction_id
+            for user_id, period, prediction_id in connection.execute(
+                select(members.c.user_id, members.c.period, members.c.prediction_id)
+            )
+        }
+        for row in _latest_per_period(connection):
+            key = (row.user_id, risk_rollup_period(row.prediction_date))
+            found = stored.pop(key, None)
+            if found != row.id:
+                problems.append(f"member {key}: latest prediction is {row.id}, rollup uses {found}")
+        for key, prediction_id in stored.items():
+            problems.append(f"member {key}: prediction {prediction_id} no longer exists")
+        
+        bucket_sums = {
+            counter: func.sum(case(
+                (members.c.risk_category.in_([c for c, b in ROLLUP_BUCKETS.items() if b == counter]), 1),
+                else_=0
+            ))
+            for counter in ['healthy_count', 'at_risk_count', 'high_risk_count']
+        }
+        expected = {
+            (row.period, row.department, row.office): row
+            for row in connection.execute(
+                select(
+                    members.c.period, members.c.department, members.c.office,
+                    func.count().label('employee_count'),
+                    func.sum(members.c.risk_score).label('risk_score_sum'),
+                    *[total.label(counter) for counter, total in bucket_sums.items()]
+                ).group_by(members.c.period, members.c.department, members.c.office)
+            )
+        }
+        for row in connection.execute(select(rollups)):
+            key = (row.period, row.department, row.office)
+            want = expected.pop(key, None)
+            for counter in ROLLUP_COUNTERS:
+                have = getattr(row, counter)
+                should = getattr(want, counter) if want is not None else 0
+                if abs(have - should) > tolerance:
+                    problems.append(f"rollup {key}: {counter} is {have}, expected {should}")
+        for key in expected:
+            problems.append(f"rollup {key}: missing")
+    return problems
+
+
+def parse_rollup_period(period):
+    """First day of a YYYY-MM period; raises ValueError for anything else"""
+    if len(period) != 7 or period[4] != '-':
+        raise ValueError(f"Invalid period '{period}' (expected YYYY-MM)")
+    try:
+        return datetime.strptime(period, '%Y-%m')
+    except ValueError:
+        raise ValueError(f"Invalid period '{period}' (expected YYYY-MM)")
+
+
+def has_risk_rollups():
+    """Whether any rollups exist yet (False for a database without predictions)"""
+    return db.session.query(DepartmentRiskRollup.query.exists()).scalar()
+
+
+def get_department_rollups(period, office=None):
+    """Rollup rows for one period, optionally limited to an office"""
+    query = DepartmentRiskRollup.query.filter_by(period=period)
+    if office:
+        query = query.filter_by(office=office)
+    return query.filter(DepartmentRiskRollup.employee_count > 0).all()
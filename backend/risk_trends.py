@@ -0,0 +1,198 @@
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from sqlalchemy import event, select, insert, update, delete, bindparam, and_, tuple_
+
+from database_schema import db, RiskPrediction, RiskCategory, RiskTrendBucket
+
+TREND_GRANULARITIES = ('week', 'month')
+BUCKET_FIELDS = [
+    'prediction_count', 'risk_score_sum', 'risk_score_min', 'risk_score_max',
+    'latest_prediction_id', 'latest_prediction_date', 'latest_risk_score', 'latest_risk_category'
+]
+CHUNK_SIZE = 500  # Keeps IN (...) lists well under database parameter limits
+INSERT_BATCH_SIZE = 5000
+
+buckets = RiskTrendBucket.__table__
+predictions = RiskPrediction.__table__
+
+
+def bucket_start(moment, granularity):
+    """First day of the week (Monday) or month containing moment"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity '{granularity}' (expected {' or '.join(TREND_GRANULARITIES)})")
+
+
+def periods_back(end, granularity, periods):
+    """Start of the bucket periods - 1 periods before the one containing end"""
+    start = bucket_start(end, granularity)
+    if granularity == 'week':
+        return start - timedelta(weeks=periods - 1)
+    months = start.year * 12 + start.month - periods
+    return start.replace(year=months // 12, month=months % 12 + 1)
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, Mapping) else getattr(row, name)
+
+
+def _add_prediction(bucket, p):
+    """Fold one prediction (id, prediction_date, risk_category, risk_score) into a bucket dict"""
+    if not bucket['prediction_count']:
+        bucket.update(risk_score_min=p['risk_score'], risk_score_max=p['risk_score'])
+    bucket['prediction_count'] += 1
+    bucket['risk_score_sum'] += p['risk_score']
+    bucket['risk_score_min'] = min(bucket['risk_score_min'], p['risk_score'])
+    bucket['risk_score_max'] = max(bucket['risk_score_max'], p['risk_score'])
+    if bucket['latest_prediction_id'] is None or (
+            (p['prediction_date'], p['id']) > (bucket['latest_prediction_date'], bucket['latest_prediction_id'])):
+        bucket.update(
+            latest_prediction_id=p['id'], latest_prediction_date=p['prediction_date'],
+            latest_risk_score=p['risk_score'], latest_risk_category=p['risk_category']
+        )
+
+
+def _empty_bucket(user_id, granularity, period_start):
+    return {
+        'user_id': user_id, 'granularity': granularity, 'period_start': period_start,
+        'prediction_count': 0, 'risk_score_sum': 0.0, 'risk_score_min': None, 'risk_score_max': None,
+        'latest_prediction_id': None, 'latest_prediction_date': None,
+        'latest_risk_score': None, 'latest_risk_category': None
+    }
+
+
+def apply_predictions_to_trends(connection, new_predictions):
+    """Fold newly written predictions into their users' week and month buckets
+    
+    new_predictions may be RiskPrediction objects or mappings with id,
+    user_id, prediction_date, risk_category and risk_score. Only the
+    touched buckets are read and written.
+    """
+    rows = [
+        {
+            'id': _field(p, 'id'),
+            'user_id': _field(p, 'user_id'),
+            'prediction_date': _field(p, 'prediction_date'),
+            'risk_category': RiskCategory(_field(p, 'risk_category')),
+            'risk_score': float(_field(p, 'risk_score'))
+        }
+        for p in new_predictions
+    ]
+    if not rows:
+        return
+    
+    touched = {}
+    for p in rows:
+        for granularity in TREND_GRANULARITIES:
+            key = (p['user_id'], granularity, bucket_start(p['prediction_date'], granularity))
+            touched.setdefault(key, []).append(p)
+    
+    current = {}
+    keys = list(touched)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        for bucket in connection.execute(
+            select(buckets).where(
+                tuple_(buckets.c.user_id, buckets.c.granularity, buckets.c.period_start).in_(keys[start:start + CHUNK_SIZE])
+            )
+        ).mappings():
+            current[(bucket['user_id'], bucket['granularity'], bucket['period_start'])] = dict(bucket)
+    existing = set(current)
+    
+    for key, period_predictions in touched.items():
+        bucket = current.setdefault(key, _empty_bucket(*key))
+        for p in period_predictions:
+            _add_prediction(bucket, p)
+    
+    inserts = [current[key] for key in touched if key not in existing]
+    updates = [current[key] for key in touched if key in existing]
+    if inserts:
+        connection.execute(insert(buckets), inserts)
+    if updates:
+        connection.execute(
+            update(buckets).where(and_(
+                buckets.c.user_id == bindparam('b_user_id'),
+                buckets.c.granularity == bindparam('b_granularity'),
+                buckets.c.period_start == bindparam('b_period_start')
+            )).values({col: bindparam(f'v_{col}') for col in BUCKET_FIELDS}),
+            [
+                dict(b_user_id=bucket['user_id'], b_granularity=bucket['granularity'],
+                     b_period_start=bucket['period_start'], **{f'v_{col}': bucket[col] for col in BUCKET_FIELDS})
+                for bucket in updates
+            ]
+        )
+
+
+@event.listens_for(db.session, 'after_flush')
+def _trend_new_predictions(session, flush_context):
+    """Keep the trend buckets current for predictions written through the ORM"""
+    new_predictions = [obj for obj in session.new if isinstance(obj, RiskPrediction)]
+    if new_predictions:
+        apply_predictions_to_trends(session.connection(), new_predictions)
+
+
+def rebuild_risk_trends():
+    """Recompute every trend bucket from risk_predictions in one ordered pass"""
+    with db.engine.begin() as connection:
+        connection.execute(delete(buckets))
+        
+        result = connection.execution_options(stream_results=True, yield_per=5000).execute(
+            select(
+                predictions.c.id, predictions.c.user_id, predictions.c.prediction_date,
+                predictions.c.risk_category, predictions.c.risk_score
+            ).order_by(predictions.c.user_id, predictions.c.prediction_date, predictions.c.id)
+        )
+        open_buckets, batch, bucket_count = {}, [], 0
+        for row in result:
+            p = row._asdict()
+            for granularity in TREND_GRANULARITIES:
+                key = (p['user_id'], granularity, bucket_start(p['prediction_date'], granularity))
+                bucket = open_buckets.get(granularity)
+                if bucket is None or key != (bucket['user_id'], granularity, bucket['period_start']):
+                    # Rows are in (user, date) order, so the previous bucket is complete
+                    if bucket is not None:
+                        batch.append(bucket)
+                    bucket = open_buckets[granularity] = _empty_bucket(*key)
+                _add_prediction(bucket, p)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                connection.execute(insert(buckets), batch)
+                bucket_count += len(batch)
+                batch = []
+        batch.extend(open_buckets.values())
+        if batch:
+            connection.execute(insert(buckets), batch)
+            bucket_count += len(batch)
+    return {'buckets': bucket_count}
+
+
+def get_risk_trend(user_id, start, end, granularity='month'):
+    """A user's risk buckets from the one containing start through end, oldest first
+    
+    Only periods with predictions are returned. Reads nothing but the
+    covering index on risk_trend_buckets.
+    """
+    columns = [
+        buckets.c.period_start, buckets.c.prediction_count, buckets.c.risk_score_sum, buckets.c.risk_score_min,
+        buckets.c.risk_score_max, buckets.c.latest_risk_score, buckets.c.latest_risk_category
+    ]
+    rows = db.session.execute(
+        select(*columns).where(
+            buckets.c.user_id == user_id,
+            buckets.c.granularity == granularity,
+            buckets.c.period_start.between(bucket_start(start, granularity), end)
+        ).order_by(buckets.c.period_start)
+    ).all()
+    return [
+        {
+            'period_start': row.period_start.isoformat(),
+            'predictions': row.prediction_count,
+            'avg_risk_score': round(row.risk_score_sum / row.prediction_count, 1),
+            'min_risk_score': row.risk_score_min,
+            'max_risk_score': row.risk_score_max,
+            'latest_risk_score': row.latest_risk_score,
+            'latest_risk_category': row.latest_risk_category.value
+        }
+        for row in rows
+    ]
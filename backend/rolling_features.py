@@ -0,0 +1,352 @@
+import time
+import warnings
+from collections import defaultdict
+from datetime import datetime
+from itertools import groupby
+import numpy as np
+from sqlalchemy import event, select, delete, func, tuple_, and_, or_
+
+from database_schema import db, WellnessData, WellnessTrends
+from stress_predictor import TREND_METRICS, TREND_WINDOWS, TREND_FEATURE_COLUMNS, TREND_VERSION
+
+wellness = WellnessData.__table__
+trends = WellnessTrends.__table__
+
+# Weekly values the state remembers: the longest window
+HISTORY_WEEKS = max(TREND_WINDOWS)
+
+# Running sums are re-derived from the remembered values once per this many
+# weeks, so rounding error from adding and removing values cannot build up
+RESYNC_WEEKS = HISTORY_WEEKS
+
+WINDOW_WEEKS = np.array(TREND_WINDOWS)
+
+# Users whose state is loaded or rebuilt per query
+USER_BATCH_SIZE = 2000
+
+# Per (window, metric): count, sum x, sum y, sum x^2, sum xy, sum y^2 over the observed weeks
+N_SUMS = 6
+
+
+def _terms(x, y):
+    """Running-sum terms (..., metrics, N_SUMS) of values y (..., metrics) at positions x (...)
+    
+    Missing values contribute nothing.
+    """
+    observed = ~np.isnan(y)
+    y = np.where(observed, y, 0.0)
+    x = np.where(observed, np.asarray(x, dtype=float)[..., np.newaxis], 0.0)
+    return np.stack([observed, x, y, x * x, x * y, y * y], axis=-1)
+
+
+class TrendState:
+    """
+    Rolling trend statistics of one user's weekly TREND_METRICS values
+    - Each window keeps running sums over its weeks, so push() is O(1):
+      the new week is added and the week that left the window subtracted
+    - The last HISTORY_WEEKS values are kept in a ring buffer for that
+    - Positions count weeks from origin and values are offsets from shift;
+      both move at every resync to keep the sums small
+    """
+    
+    def __init__(self):
+        self.weeks = 0  # Weekly rows pushed so far
+        self.origin = 0
+        self.shift = np.zeros(len(TREND_METRICS))
+        self.recent = np.full((HISTORY_WEEKS, len(TREND_METRICS)), np.nan)  # Week k in slot k % HISTORY_WEEKS
+        self.sums = np.zeros((len(TREND_WINDOWS), len(TREND_METRICS), N_SUMS))
+    
+    @classmethod
+    def from_history(cls, history):
+        """State after pushing every row of history (weeks x TREND_METRICS, oldest first), built from its tail"""
+        history = np.asarray(history, dtype=float).reshape(-1, len(TREND_METRICS))
+        state = cls()
+        state.weeks = len(history)
+        for k in range(max(1, state.weeks - HISTORY_WEEKS + 1), state.weeks + 1):
+            state.recent[k % HISTORY_WEEKS] = history[k - 1]
+        state._resync()
+        return state
+    
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.weeks = data['weeks']
+        state.origin = data['origin']
+        state.shift = np.array(data['shift'], dtype=float)
+        state.recent = np.array(data['recent'], dtype=float)  # None -> NaN
+        state.sums = np.array(data['sums'], dtype=float)
+        return state
+    
+    def to_dict(self):
+        recent = self.recent.astype(object)
+        recent[np.isnan(self.recent)] = None
+        return {
+            'weeks': self.weeks,
+            'origin': self.origin,
+            'shift': self.shift.tolist(),
+            'recent': recent.tolist(),
+            'sums': self.sums.tolist()
+        }
+    
+    def push(self, values):
+        """Fold in the next week's TREND_METRICS values (NaN or None where missing)"""
+        y = np.array([np.nan if value is None else value for value in values], dtype=float)
+        self.weeks += 1
+        week = self.weeks
+        if week - self.origin >= RESYNC_WEEKS:
+            self.recent[week % HISTORY_WEEKS] = y
+            self._resync()
+            return
+        
+        # The week leaving each window is still in the buffer: its slot is only overwritten below
+        leaving = week - WINDOW_WEEKS
+        left = self.recent[leaving % HISTORY_WEEKS] - self.shift
+        left[leaving < 1] = np.nan
+        self.sums += _terms(week - self.origin, y - self.shift) - _terms(leaving - self.origin, left)
+        self.recent[week % HISTORY_WEEKS] = y
+    
+    def _resync(self):
+        """Recompute the sums from the remembered weeks, around a new origin and shift"""
+        week = self.weeks
+        self.origin = week
+        last = self.recent[np.arange(week, max(0, week - HISTORY_WEEKS), -1) % HISTORY_WEEKS]
+        # Latest observed value of each metric (0 if none is remembered)
+        observed = ~np.isnan(last)
+        latest = np.argmax(observed, axis=0)
+        self.shift = np.where(observed.any(axis=0), last[latest, np.arange(last.shape[1])], 0.0)
+        for w, window in enumerate(TREND_WINDOWS):
+            ks = np.arange(max(1, week - window + 1), week + 1)
+            self.sums[w] = _terms(ks - self.origin, self.recent[ks % HISTORY_WEEKS] - self.shift).sum(axis=0)
+    
+    def features(self):
+        """Trend features in TREND_FEATURE_COLUMNS order
+        
+        Per window: mean of the observed values, least-squares slope per
+        week and sample standard deviation (volatility). With one observed
+        week the slope and volatility are 0; with none all three are NaN.
+        """
+        n, sx, sy, sxx, sxy, syy = np.moveaxis(self.sums, -1, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.shift + sy / n
+            slope = np.where(n >= 2, (n * sxy - sx * sy) / (n * sxx - sx * sx), 0.0)
+            variance = np.where(n >= 2, (syy - sy * sy / n) / (n - 1), 0.0)
+        volatility = np.sqrt(np.maximum(variance, 0.0))
+        stats = np.stack([mean, slope, volatility], axis=-1)  # window x metric x statistic
+        stats[n == 0] = np.nan
+        return stats.transpose(1, 0, 2).reshape(-1)
+
+
+def rolling_trend_matrix(user_ids, values):
+    """Trend features (TREND_FEATURE_COLUMNS order) for every row, computed from scratch
+    
+    Rows must be sorted by user and then date, with values holding the
+    TREND_METRICS columns. Each row gets the statistics of its user's
+    windows ending at that row, exactly as TrendState.features() would
+    after pushing the user's weeks up to it.
+    """
+    user_ids = np.asarray(user_ids)
+    values = np.asarray(values, dtype=float).reshape(len(user_ids), len(TREND_METRICS))
+    n = len(values)
+    result = np.empty((n, len(TREND_METRICS), len(TREND_WINDOWS), 3))
+    if n == 0:
+        return result.reshape(0, len(TREND_FEATURE_COLUMNS))
+    first = np.r_[True, user_ids[1:] != user_ids[:-1]]
+    position = np.arange(n) - np.maximum.accumulate(np.where(first, np.arange(n), 0))
+    
+    for w, window in enumerate(TREND_WINDOWS):
+        lags = np.arange(window - 1, -1, -1)  # Oldest week first
+        in_window = lags[np.newaxis, :] <= position[:, np.newaxis]
+        rows = np.where(in_window, np.arange(n)[:, np.newaxis] - lags, 0)
+        y = np.where(in_window[:, :, np.newaxis], values[rows], np.nan)  # rows x weeks x metrics
+        observed = ~np.isnan(y)
+        count = observed.sum(axis=1)
+        x = np.where(observed, -lags[np.newaxis, :, np.newaxis].astype(float), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Windows without observed weeks
+            mean = np.nanmean(y, axis=1)
+            dx = x - np.nanmean(x, axis=1)[:, np.newaxis, :]
+            dy = y - mean[:, np.newaxis, :]
+            slope = np.where(count >= 2, np.nansum(dx * dy, axis=1) / np.nansum(dx * dx, axis=1), 0.0)
+            variance = np.where(count >= 2, np.nansum(dy * dy, axis=1) / (count - 1), 0.0)
+        stats = np.stack([mean, slope, np.sqrt(variance)], axis=-1)
+        stats[count == 0] = np.nan
+        result[:, :, w, :] = stats
+    return result.reshape(n, -1)
+
+
+def _upsert_statement():
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk upsert is not implemented for {dialect}")
+    
+    stmt = insert(trends)
+    columns = ['last_date', 'weeks_seen', 'trend_version', 'state', *TREND_FEATURE_COLUMNS, 'updated_at']
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={col: stmt.excluded[col] for col in columns}
+    )
+
+
+def _state_record(user_id, last_date, state, updated_at):
+    features = state.features()
+    values = features.astype(object)
+    values[np.isnan(features)] = None
+    return {
+        'user_id': int(user_id), 'last_date': last_date, 'weeks_seen': state.weeks,
+        'trend_version': TREND_VERSION, 'state': state.to_dict(), 'updated_at': updated_at,
+        **dict(zip(TREND_FEATURE_COLUMNS, values.tolist()))
+    }
+
+
+def _write_states(connection, records):
+    if records:
+        connection.execute(_upsert_statement(), records)
+    return len(records)
+
+
+def write_trend_histories(connection, user_ids, last_dates, histories):
+    """Store the trend state of users whose complete weekly history is given (users x weeks x TREND_METRICS)"""
+    updated_at = datetime.utcnow()
+    return _write_states(connection, [
+        _state_record(user_id, last_date, TrendState.from_history(history), updated_at)
+        for user_id, last_date, history in zip(user_ids, last_dates, histories)
+    ])
+
+
+def _metric_columns():
+    return [wellness.c[metric] for metric in TREND_METRICS]
+
+
+def rebuild_trends(connection, user_ids):
+    """Recompute these users' trend state from their full wellness_data history"""
+    user_ids = list(user_ids)
+    updated_at = datetime.utcnow()
+    written = 0
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch = user_ids[start:start + USER_BATCH_SIZE]
+        rows = connection.execute(
+            select(wellness.c.user_id, wellness.c.date, *_metric_columns())
+            .where(wellness.c.user_id.in_(batch))
+            .order_by(wellness.c.user_id, wellness.c.date)
+        ).all()
+        records = []
+        for user_id, weeks in groupby(rows, key=lambda row: row[0]):
+            weeks = list(weeks)
+            history = np.array([week[2:] for week in weeks], dtype=float)
+            records.append(_state_record(user_id, weeks[-1][1], TrendState.from_history(history), updated_at))
+        written += _write_states(connection, records)
+        
+        # Users left without any wellness history
+        emptied = set(batch) - {record['user_id'] for record in records}
+        if emptied:
+            connection.execute(delete(trends).where(trends.c.user_id.in_(emptied)))
+    return written
+
+
+def update_trends(connection, keys):
+    """Advance the stored trend state for wellness rows just written, given as (user_id, date) keys
+    
+    Weeks after a user's stored last_date are pushed onto the state, O(1)
+    each. A week on or before it (a correction, or history arriving out of
+    order), a missing state or another TREND_VERSION rebuilds the user
+    from wellness_data instead.
+    """
+    dates_by_user = defaultdict(set)
+    for user_id, day in keys:
+        dates_by_user[int(user_id)].add(day)
+    users = list(dates_by_user)
+    updated_at = datetime.utcnow()
+    written = 0
+    
+    for start in range(0, len(users), USER_BATCH_SIZE):
+        batch = users[start:start + USER_BATCH_SIZE]
+        stored = {
+            row.user_id: row for row in connection.execute(
+                select(trends.c.user_id, trends.c.last_date, trends.c.trend_version, trends.c.state)
+                .where(trends.c.user_id.in_(batch))
+            )
+        }
+        appends, rebuilds = [], []
+        for user_id in batch:
+            row = stored.get(user_id)
+            if (row is not None and row.trend_version == TREND_VERSION
+                    and min(dates_by_user[user_id]) > row.last_date):
+                appends.extend((user_id, day) for day in dates_by_user[user_id])
+            else:
+                rebuilds.append(user_id)
+        
+        records = []
+        if appends:
+            weeks = connection.execute(
+                select(wellness.c.user_id, wellness.c.date, *_metric_columns())
+                .where(tuple_(wellness.c.user_id, wellness.c.date).in_(appends))
+                .order_by(wellness.c.user_id, wellness.c.date)
+            ).all()
+            for user_id, user_weeks in groupby(weeks, key=lambda row: row[0]):
+                state = TrendState.from_dict(stored[user_id].state)
+                for week in user_weeks:
+                    state.push(week[2:])
+                records.append(_state_record(user_id, week[1], state, updated_at))
+        written += _write_states(connection, records)
+        written += rebuild_trends(connection, rebuilds)
+    return written
+
+
+def stored_trends_join():
+    """Outer-join condition for reading current-version trend features next to a user's latest wellness_data row"""
+    return and_(
+        trends.c.user_id == wellness.c.user_id,
+        trends.c.last_date == wellness.c.date,
+        trends.c.trend_version == TREND_VERSION
+    )
+
+
+def _stale_users():
+    """Users whose stored trend state is missing, at another TREND_VERSION or behind their latest week"""
+    latest = (
+        select(wellness.c.user_id, func.max(wellness.c.date).label('date'))
+        .group_by(wellness.c.user_id)
+        .subquery()
+    )
+    return (
+        select(latest.c.user_id)
+        .outerjoin(trends, trends.c.user_id == latest.c.user_id)
+        .where(or_(
+            trends.c.user_id.is_(None),
+            trends.c.trend_version != TREND_VERSION,
+            trends.c.last_date != latest.c.date
+        ))
+    )
+
+
+def needs_trend_rebuild(connection):
+    """True when some user's stored trend state is stale"""
+    return connection.execute(_stale_users().limit(1)).first() is not None
+
+
+def rebuild_stale_trends(chunk_users=2000):
+    """Rebuild the trend state of every user whose stored state is stale, chunk_users per transaction"""
+    start = time.perf_counter()
+    users_rebuilt = 0
+    with db.engine.connect() as connection:
+        stale = connection.execute(_stale_users()).scalars().all()
+    for i in range(0, len(stale), chunk_users):
+        with db.engine.begin() as connection:
+            users_rebuilt += rebuild_trends(connection, stale[i:i + chunk_users])
+    return {'users': users_rebuilt, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _advance_written_trends(session, flush_context):
+    """Keep trend state current for wellness rows written through the ORM"""
+    keys = {
+        (obj.user_id, obj.date) for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, WellnessData)
+    }
+    if keys:
+        update_trends(session.connection(), keys)
+
@@ -0,0 +1,19 @@
+from gevent import monkey
+monkey.patch_all()  # Before anything imports socket, threading or time
+
+import os
+from gevent.pywsgi import WSGIServer
+
+from app_backend import app
+
+# Production entry point (run from backend/: python serve.py).
+# Every request runs in a greenlet, so an open alert stream waiting on its
+# queue costs a few KB rather than a thread: thousands of idle streams fit
+# in one process, given a file descriptor limit (ulimit -n) above that.
+# python app_backend.py (the development server) or a sync/threaded WSGI
+# worker holds one thread per open stream instead.
+if __name__ == "__main__":
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', '5000'))
+    print(f"Serving on {host}:{port} (gevent)")
+    WSGIServer((host, port), app).serve_forever()
@@ -0,0 +1,325 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, and_
+
+from database_schema import db, WellnessData, WellnessFeatures, RiskPrediction
+from feature_store import stored_features_join
+from rolling_features import rolling_trend_matrix
+from stress_predictor import (
+    RAW_FEATURE_COLUMNS, ENGINEERED_FEATURE_COLUMNS, MODEL_FEATURE_COLUMNS, RISK_SCORES, CLIP_BOUNDS,
+    TREND_METRICS, TREND_WINDOWS, TREND_STATISTICS, TREND_FEATURE_COLUMNS, PhaseTimer, training_jobs,
+    evaluation_metrics
+)
+from wellness_ingest import INTEGER_COLUMNS, METRIC_RANGES, peak_rss_mb
+
+wellness = WellnessData.__table__
+features = WellnessFeatures.__table__
+predictions = RiskPrediction.__table__
+
+# Label codes in the order scikit-learn sorts the category names
+CLASSES = sorted(RISK_SCORES)
+
+# One in TEST_BUCKETS users (by hashed id) is held out, so a user's weeks never straddle the split
+TEST_BUCKETS = 4
+
+# Histogram bins per float metric for the single-pass medians (integer metrics get one bin per value)
+MEDIAN_BINS = 20000
+
+# Rows per block when scaling and scoring the mapped matrices
+BLOCK_ROWS = 100000
+
+# A week is labelled with the user's risk prediction nearest to it, if one is this close
+LABEL_TOLERANCE_DAYS = 14
+
+
+def _is_test(user_ids):
+    # Knuth multiplicative hash, so contiguous id ranges are spread over both sides
+    return (user_ids.astype(np.uint64) * np.uint64(2654435761) % np.uint64(2 ** 32)) % TEST_BUCKETS == 0
+
+
+def trend_ranges():
+    """Value range of each trend feature, for its streaming median"""
+    ranges = {}
+    for metric in TREND_METRICS:
+        low, high = METRIC_RANGES[metric]
+        for window in TREND_WINDOWS:
+            bounds = {'mean': (low, high), 'slope': (low - high, high - low), 'volatility': (0, high - low)}
+            for statistic in TREND_STATISTICS:
+                ranges[f"{metric}_{statistic}_{window}w"] = bounds[statistic]
+    return ranges
+
+
+def _labelled_chunks(chunk_users, trend_features=False):
+    """Yield (weeks read, labelled weeks) per chunk_users users
+    
+    Labelled weeks carry user_id, the raw metrics, the stored engineered
+    features (NaN when not stored at FEATURE_VERSION) and risk_category.
+    With trend_features, also the TREND_FEATURE_COLUMNS as of each week,
+    computed over all of the user's weeks (labelled or not).
+    """
+    after_user_id = 0
+    while True:
+        with db.engine.connect() as connection:
+            user_ids = connection.execute(
+                select(wellness.c.user_id).where(wellness.c.user_id > after_user_id)
+                .group_by(wellness.c.user_id).order_by(wellness.c.user_id).limit(chunk_users)
+            ).scalars().all()
+            if not user_ids:
+                return
+            in_chunk = and_(wellness.c.user_id > after_user_id, wellness.c.user_id <= user_ids[-1])
+            weeks = pd.DataFrame(
+                connection.execute(
+                    select(
+                        wellness.c.user_id, wellness.c.date,
+                        *[wellness.c[col] for col in RAW_FEATURE_COLUMNS],
+                        *[features.c[col] for col in ENGINEERED_FEATURE_COLUMNS]
+                    )
+                    .outerjoin(features, stored_features_join())
+                    .where(in_chunk)
+                ).all(),
+                columns=['user_id', 'date', *RAW_FEATURE_COLUMNS, *ENGINEERED_FEATURE_COLUMNS]
+            )
+            labels = pd.DataFrame(
+                connection.execute(
+                    select(predictions.c.user_id, predictions.c.prediction_date, predictions.c.risk_category)
+                    .where(predictions.c.user_id > after_user_id, predictions.c.user_id <= user_ids[-1])
+                ).all(),
+                columns=['user_id', 'date', 'risk_category']
+            )
+        after_user_id = user_ids[-1]
+        if labels.empty:
+            continue
+        
+        weeks['date'] = pd.to_datetime(weeks['date'])
+        stored = RAW_FEATURE_COLUMNS + ENGINEERED_FEATURE_COLUMNS
+        weeks[stored] = weeks[stored].astype(float)  # None -> NaN
+        if trend_features:
+            weeks = weeks.sort_values(['user_id', 'date'], ignore_index=True)
+            weeks[TREND_FEATURE_COLUMNS] = rolling_trend_matrix(weeks['user_id'].to_numpy(), weeks[TREND_METRICS])
+        labels['date'] = pd.to_datetime(labels['date'])
+        labels['risk_category'] = [category.value for category in labels['risk_category']]
+        labelled = pd.merge_asof(
+            weeks.sort_values('date'), labels.sort_values('date'), on='date', by='user_id',
+            direction='nearest', tolerance=pd.Timedelta(days=LABEL_TOLERANCE_DAYS)
+        )
+        yield len(weeks), labelled.dropna(subset=['risk_category']).sort_values(['user_id', 'date'])
+
+
+class StreamingMedians:
+    """Approximate medians from fixed-bin histograms, accurate to one bin width"""
+    
+    def __init__(self, columns, ranges=None):
+        ranges = {**METRIC_RANGES, **(ranges or {})}
+        self.edges = {}
+        for col in columns:
+            low, high = ranges[col]
+            if col in INTEGER_COLUMNS:
+                self.edges[col] = np.arange(low - 0.5, high + 1.5)
+            else:
+                self.edges[col] = np.linspace(low, high, MEDIAN_BINS + 1)
+        self.counts = {col: np.zeros(len(edges) - 1, dtype=np.int64) for col, edges in self.edges.items()}
+    
+    def update(self, frame):
+        for col, edges in self.edges.items():
+            values = frame[col].to_numpy(dtype=float)
+            values = np.clip(values[~np.isnan(values)], edges[0], edges[-1])
+            self.counts[col] += np.histogram(values, edges)[0]
+    
+    def medians(self):
+        result = {}
+        for col, counts in self.counts.items():
+            total = counts.sum()
+            if total == 0:
+                continue  # Entirely missing: left unimputed, like an absent column
+            edges = self.edges[col]
+            cumulative = np.cumsum(counts)
+            i = int(np.searchsorted(cumulative, total / 2))
+            if col in INTEGER_COLUMNS:
+                result[col] = float(edges[i] + 0.5)
+            else:
+                before = cumulative[i] - counts[i]
+                result[col] = float(edges[i] + (total / 2 - before) / counts[i] * (edges[i + 1] - edges[i]))
+        return result
+
+
+class StreamingMoments:
+    """NaN-aware per-column mean and variance, merged chunk by chunk (Chan et al.)"""
+    
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+    
+    def update(self, X):
+        present = ~np.isnan(X)
+        count = present.sum(axis=0)
+        nonzero = count > 0
+        mean = np.zeros_like(self.mean)
+        mean[nonzero] = np.nansum(X[:, nonzero], axis=0) / count[nonzero]
+        m2 = np.nansum((X - mean) ** 2, axis=0)
+        
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+    
+    def scaler(self):
+        """A fitted StandardScaler carrying these statistics"""
+        from sklearn.preprocessing import StandardScaler
+        
+        scaler = StandardScaler()
+        var = np.where(self.count > 0, self.m2 / np.maximum(self.count, 1), 0.0)
+        scaler.mean_ = self.mean
+        scaler.var_ = var
+        scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+        scaler.n_samples_seen_ = self.count.astype(np.int64)
+        scaler.n_features_in_ = len(self.mean)
+        return scaler
+
+
+def train_from_wellness(predictor, chunk_users=2000, n_jobs=None, max_samples=None, work_dir=None, verbose=True,
+                        trend_features=False):
+    """Train predictor on wellness_data history without loading it into memory
+    
+    Each week is labelled with the user's nearest risk_prediction (within
+    LABEL_TOLERANCE_DAYS); unlabelled weeks are skipped. Two passes read the
+    table chunk_users users at a time: the first builds the imputation
+    medians and the split sizes, the second writes the model features
+    (stored engineered features where available) into float32
+    memory-mapped train/test matrices while accumulating the scaler
+    statistics. The forest is then fit on the mapped matrix (max_samples
+    caps the rows each tree draws). Peak RSS is reported per phase in
+    training_metrics['peak_rss_mb']. trend_features=True adds the rolling
+    TREND_FEATURE_COLUMNS, recomputed from each user's full history.
+    """
+    start_time = time.time()
+    timer = PhaseTimer()
+    n_jobs = training_jobs(n_jobs)
+    peak_rss = {}
+    trend_cols = TREND_FEATURE_COLUMNS if trend_features else []
+    feature_names = MODEL_FEATURE_COLUMNS + trend_cols
+    n_features = len(feature_names)
+    
+    # Pass 1: imputation medians and split sizes
+    with timer.phase('scan'):
+        medians = StreamingMedians(RAW_FEATURE_COLUMNS + trend_cols, trend_ranges())
+        rows_read = n_train = n_test = 0
+        for week_count, frame in _labelled_chunks(chunk_users, trend_features):
+            rows_read += week_count
+            medians.update(frame)
+            test = _is_test(frame['user_id'].to_numpy()).sum()
+            n_test += int(test)
+            n_train += len(frame) - int(test)
+    peak_rss['scan'] = peak_rss_mb()
+    if n_train == 0 or n_test == 0:
+        raise ValueError("Not enough labelled wellness data to train on (weeks need a nearby risk prediction)")
+    
+    predictor.imputation_medians = medians.medians()
+    predictor.clip_bounds = dict(CLIP_BOUNDS)
+    predictor.feature_names = feature_names
+    predictor._build_feature_lookups()
+    
+    work_dir = tempfile.mkdtemp(prefix='workwell-train-', dir=work_dir)
+    try:
+        X_train = np.lib.format.open_memmap(os.path.join(work_dir, 'X_train.npy'), 'w+', np.float32, (n_train, n_features))
+        X_test = np.lib.format.open_memmap(os.path.join(work_dir, 'X_test.npy'), 'w+', np.float32, (n_test, n_features))
+        y_train = np.empty(n_train, dtype=np.uint8)
+        y_test = np.empty(n_test, dtype=np.uint8)
+        
+        # Pass 2: engineered features into the mapped matrices, scaler statistics on the train rows.
+        # Rows written after the first pass (or removed) are ignored, so both passes agree on sizes.
+        with timer.phase('features'):
+            moments = StreamingMoments(n_features)
+            train_pos = test_pos = 0
+            for _, frame in _labelled_chunks(chunk_users, trend_features):
+                X = predictor.model_matrix(frame[RAW_FEATURE_COLUMNS], frame[ENGINEERED_FEATURE_COLUMNS],
+                                           frame[TREND_FEATURE_COLUMNS] if trend_features else None)
+                y = pd.Categorical(frame['risk_category'], categories=CLASSES).codes.astype(np.uint8)
+                test = _is_test(frame['user_id'].to_numpy())
+                X_chunk, y_chunk = X[~test][:n_train - train_pos], y[~test][:n_train - train_pos]
+                moments.update(X_chunk)
+                X_train[train_pos:train_pos + len(X_chunk)] = X_chunk
+                y_train[train_pos:train_pos + len(y_chunk)] = y_chunk
+                train_pos += len(X_chunk)
+                
+                X_chunk, y_chunk = X[test][:n_test - test_pos], y[test][:n_test - test_pos]
+                X_test[test_pos:test_pos + len(X_chunk)] = X_chunk
+                y_test[test_pos:test_pos + len(y_chunk)] = y_chunk
+                test_pos += len(X_chunk)
+            X_train, y_train = X_train[:train_pos], y_train[:train_pos]
+            X_test, y_test = X_test[:test_pos], y_test[:test_pos]
+        peak_rss['features'] = peak_rss_mb()
+        
+        # Standardize in place, a block at a time
+        with timer.phase('scale'):
+            scaler = moments.scaler()
+            for matrix in (X_train, X_test):
+                for i in range(0, len(matrix), BLOCK_ROWS):
+                    block = matrix[i:i + BLOCK_ROWS].astype(np.float64)
+                    matrix[i:i + BLOCK_ROWS] = (block - scaler.mean_) / scaler.scale_
+        peak_rss['scale'] = peak_rss_mb()
+        
+        with timer.phase('fit'):
+            model = predictor.new_forest(n_jobs, max_samples=max_samples)
+            model.fit(X_train, y_train)
+            # Trained on label codes; report the category names like an in-memory fit would
+            model.classes_ = np.array(CLASSES, dtype=object)[model.classes_]
+        peak_rss['fit'] = peak_rss_mb()
+        
+        with timer.phase('evaluate'):
+            code_of = {name: code for code, name in enumerate(CLASSES)}
+            class_codes = np.array([code_of[name] for name in model.classes_])
+            y_pred = np.concatenate([
+                class_codes[np.argmax(model.predict_proba(X_test[i:i + BLOCK_ROWS]), axis=1)]
+                for i in range(0, len(X_test), BLOCK_ROWS)
+            ])
+            evaluation = evaluation_metrics(y_test, y_pred)
+        peak_rss['evaluate'] = peak_rss_mb()
+        matrix_mb = round((X_train.nbytes + X_test.nbytes) / 2 ** 20, 1)
+        train_rows, test_rows = len(X_train), len(X_test)
+        del X_train, X_test
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    predictor.model = model
+    predictor.scaler = scaler
+    predictor.model_version = f"rf-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    with timer.phase('compile'):
+        predictor._build_inference_state()
+    predictor.feature_importance = pd.DataFrame({
+        'feature': predictor.feature_names,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+    
+    training_time = time.time() - start_time
+    predictor.training_metrics = {
+        **evaluation,
+        'cv_accuracy_mean': None,
+        'cv_accuracy_std': None,
+        'rows_read': rows_read,
+        'train_rows': train_rows,
+        'test_rows': test_rows,
+        'n_estimators': int(model.n_estimators),
+        'n_jobs': n_jobs,
+        'incremental': False,
+        'source': 'wellness_data',
+        'trend_features': trend_features,
+        'matrix_mb': matrix_mb,
+        'peak_rss_mb': peak_rss,
+        'phase_seconds': timer.seconds,
+        'training_seconds': round(training_time, 3)
+    }
+    print(f"Trained {predictor.model_version} on {train_rows} of {rows_read} wellness weeks in {training_time:.2f}s "
+          f"(test accuracy {evaluation['test_accuracy']:.3f}, peak RSS {peak_rss['evaluate']} MB, "
+          f"{matrix_mb} MB mapped) - {timer.summary()}")
+    if verbose:
+        print(f"Peak RSS by phase (MB): {peak_rss}")
+        print(predictor.feature_importance.head(8))
+    return predictor.training_metrics
@@ -1,15 +1,136 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
-from sklearn.impute import SimpleImputer
-import joblib
+import hashlib
+import os
 import time
+import uuid
 import warnings
+from contextlib import contextmanager
+from compiled_forest import CompiledForest
+from model_artifact import ArtifactError, write_artifact, read_artifact, verified_file
 warnings.filterwarnings('ignore')
 
+# scikit-learn and joblib are imported where they are used: serving only
+# unpickles a fitted model, and keeping them out of this module's import
+# keeps API startup fast.
+
+# Raw employee metrics accepted by predict_risk / predict_risk_batch.
+# 2-D arrays passed to predict_risk_batch must use this column order.
+RAW_FEATURE_COLUMNS = [
+    'hours_per_week', 'overtime_hours', 'meetings_per_day',
+    'manager_support_score', 'vacation_days_taken', 'after_hours_emails',
+    'deadline_pressure', 'work_life_balance_score', 'team_collaboration_score',
+    'daily_breaks', 'weekend_work_days', 'role_clarity_score', 'job_tenure_months'
+]
+
+# Score (0-100) reported for each predicted category
+RISK_SCORES = {'Low': 25, 'Medium': 50, 'High': 75, 'Critical': 95}
+
+# Outlier caps applied during preprocessing (persisted with the model)
+CLIP_BOUNDS = {
+    'hours_per_week': (15, 90),
+    'overtime_hours': (0, 50),
+    'vacation_days_taken': (0, 30)
+}
+
+# Model inputs after feature engineering (not too many to avoid overfitting)
+MODEL_FEATURE_COLUMNS = [
+    'hours_per_week', 'overtime_hours', 'manager_support_score',
+    'vacation_days_taken', 'after_hours_emails', 'deadline_pressure',
+    'work_life_balance_score', 'daily_breaks', 'job_tenure_months',
+    'workload_intensity', 'support_deficit', 'wlb_composite',
+    'pressure_no_support', 'tenure_factor'
+]
+
+# Features derived from the raw metrics by engineer_realistic_features, and
+# the raw metrics they read. tenure_factor is defined even when its input is
+# missing, so a stored row is never all-NaN.
+ENGINEERED_FEATURE_COLUMNS = [
+    'workload_intensity', 'support_deficit', 'wlb_composite', 'pressure_no_support', 'tenure_factor'
+]
+ENGINEERED_INPUT_COLUMNS = [
+    'hours_per_week', 'overtime_hours', 'meetings_per_day', 'manager_support_score',
+    'work_life_balance_score', 'vacation_days_taken', 'daily_breaks', 'weekend_work_days',
+    'deadline_pressure', 'job_tenure_months'
+]
+
+# Bump whenever engineer_realistic_features or CLIP_BOUNDS change: stored
+# features from another version are ignored and backfilled (feature_store)
+FEATURE_VERSION = 1
+
+# Rolling aggregates over each user's last N weekly WellnessData rows,
+# maintained incrementally by rolling_features. They are optional model
+# inputs: a model uses them when trained with trend_features=True.
+TREND_METRICS = ['hours_per_week', 'overtime_hours', 'after_hours_emails']
+TREND_WINDOWS = [4, 12]
+TREND_STATISTICS = ['mean', 'slope', 'volatility']
+TREND_FEATURE_COLUMNS = [
+    f"{metric}_{statistic}_{window}w"
+    for metric in TREND_METRICS for window in TREND_WINDOWS for statistic in TREND_STATISTICS
+]
+
+# Bump whenever the trend definitions change: stored trend state from
+# another version is rebuilt from history (rolling_features)
+TREND_VERSION = 1
+
+# Fitted forest + scaler stored next to the node arrays, for incremental training
+ESTIMATOR_FILE = 'estimator.joblib'
+
+
+def snapshot_trends(raw):
+    """Trend features (TREND_FEATURE_COLUMNS order) treating each raw metric row as a one-week history
+    
+    The mean is the week's value and the slope and volatility are 0, or
+    all NaN when the metric is missing. Used where no stored history is
+    available for a row.
+    """
+    raw = np.asarray(raw, dtype=float).reshape(-1, len(RAW_FEATURE_COLUMNS))
+    values = raw[:, [RAW_FEATURE_COLUMNS.index(metric) for metric in TREND_METRICS]]
+    flat = np.where(np.isnan(values), np.nan, 0.0)
+    per_window = np.stack([values, flat, flat], axis=2)  # statistics in TREND_STATISTICS order
+    return np.repeat(per_window[:, :, np.newaxis, :], len(TREND_WINDOWS), axis=2).reshape(len(raw), -1)
+
+
+def training_jobs(n_jobs=None):
+    """Cores to train with: n_jobs, else TRAINING_JOBS, else all (negative counts back from all, like joblib)"""
+    if n_jobs is None:
+        n_jobs = int(os.environ.get('TRAINING_JOBS', '-1'))
+    cpus = os.cpu_count() or 1
+    if n_jobs < 0:
+        n_jobs = cpus + 1 + n_jobs
+    return max(1, min(n_jobs, cpus))
+
+
+class PhaseTimer:
+    """Wall-clock seconds per named training phase"""
+    
+    def __init__(self):
+        self.seconds = {}
+    
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = round(self.seconds.get(name, 0.0) + time.perf_counter() - start, 3)
+    
+    def summary(self):
+        return ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.seconds.items())
+
+
+def evaluation_metrics(y_true, y_pred):
+    """Hold-out accuracy plus macro-averaged precision, recall and F1"""
+    from sklearn.metrics import accuracy_score, precision_recall_fscore_support
+    precision, recall, f1, _ = precision_recall_fscore_support(y_true, y_pred, average='macro', zero_division=0)
+    return {
+        'test_accuracy': float(accuracy_score(y_true, y_pred)),
+        'precision': float(precision),
+        'recall': float(recall),
+        'f1_score': float(f1)
+    }
+
+
 class RealisticMentalHealthPredictor:
     """
     Realistic Mental Health Risk Prediction Model
@@ -18,205 +139,243 @@ class RealisticMentalHealthPredictor:
     - Includes noise and uncertainty like real workplaces
     """
     
-    def __init__(self):
+    def __init__(self, use_compiled_engine=True):
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None  # Fitted StandardScaler
         self.feature_names = None
         self.feature_importance = None
+        self.training_metrics = None  # Hold-out and CV scores from the last training run
+        self.imputation_medians = None  # Training-time medians, used at scoring time
+        self.clip_bounds = dict(CLIP_BOUNDS)
+        self.model_version = None  # Changes on every training run / artifact
+        self.use_compiled_engine = use_compiled_engine
+        self.engine = None  # CompiledForest built from the fitted model
+        self.engine_max_rows = 1024  # Larger batches go through sklearn
+    
+    def create_realistic_data(self, n_samples=2000, seed=42, chunk_size=100000):
+        """Generate realistic workplace data with noise and complexity
         
-    def create_realistic_data(self, n_samples=2000):
-        """Generate realistic workplace data with noise and complexity"""
-        np.random.seed(42)
+        Deterministic for a given (seed, chunk_size) and never touches the
+        global np.random state.
+        """
+        return pd.concat(
+            list(self.iter_realistic_data(n_samples, seed=seed, chunk_size=chunk_size)),
+            ignore_index=True
+        )
+    
+    def iter_realistic_data(self, n_samples, seed=42, chunk_size=100000):
+        """Yield the synthetic dataset in shuffled chunks of up to chunk_size rows
         
+        Each chunk draws from its own np.random.Generator spawned from seed,
+        so chunks are independent and reproducible and memory stays bounded.
+        """
+        n_chunks = max(1, -(-n_samples // chunk_size))
+        for i, chunk_seed in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+            count = min(chunk_size, n_samples - i * chunk_size)
+            yield self._generate_realistic_chunk(count, np.random.default_rng(chunk_seed))
+    
+    def write_realistic_data(self, path, n_samples, seed=42, chunk_size=100000):
+        """Stream the synthetic dataset to a CSV file chunk by chunk; returns the row count"""
+        written = 0
+        for i, chunk in enumerate(self.iter_realistic_data(n_samples, seed=seed, chunk_size=chunk_size)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            written += len(chunk)
+        return written
+    
+    def _generate_realistic_chunk(self, n_samples, rng):
+        """One shuffled chunk with the category mix, noise, missing values and edge cases"""
         # More realistic distribution (what you'd actually see in companies)
         n_low = int(n_samples * 0.40)      # 40% low risk
         n_medium = int(n_samples * 0.35)   # 35% medium risk  
         n_high = int(n_samples * 0.20)     # 20% high risk
         n_critical = n_samples - n_low - n_medium - n_high  # 5% critical
         
-        all_data = []
-        
         # Generate data with realistic overlap between categories
-        for risk_level, count in [('Low', n_low), ('Medium', n_medium), ('High', n_high), ('Critical', n_critical)]:
-            batch_data = self._generate_realistic_batch(risk_level, count)
-            all_data.extend(batch_data)
-        
-        df = pd.DataFrame(all_data)
+        df = pd.concat([
+            self._generate_realistic_batch(risk_level, count, rng)
+            for risk_level, count in [('Low', n_low), ('Medium', n_medium), ('High', n_high), ('Critical', n_critical)]
+        ], ignore_index=True)
         
         # Add realistic data issues
-        df = self._add_realistic_noise(df)
-        df = self._add_missing_values(df)
-        df = self._add_edge_cases(df)
+        df = self._add_realistic_noise(df, rng)
+        df = self._add_missing_values(df, rng)
+        df = self._add_edge_cases(df, rng)
         
-        return df.sample(frac=1).reset_index(drop=True)
+        return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    
+    # Realistic parameter ranges with significant overlap
+    RISK_LEVEL_PARAMS = {
+        'Low': {
+            'hours_range': (35, 50),     # Some overlap with medium
+            'overtime_max': 8,
+            'support_range': (6, 10),
+            'vacation_range': (12, 25),
+            'emails_max': 10,
+            'pressure_range': (1, 6),    # Overlap with medium
+            'breaks_range': (2, 4)
+        },
+        'Medium': {
+            'hours_range': (40, 55),     # Overlap with both low and high
+            'overtime_max': 15,
+            'support_range': (4, 8),     # Overlap with low and high
+            'vacation_range': (8, 20),
+            'emails_max': 18,
+            'pressure_range': (4, 8),    # Significant overlap
+            'breaks_range': (1, 3)
+        },
+        'High': {
+            'hours_range': (45, 65),     # Overlap with medium
+            'overtime_max': 25,
+            'support_range': (2, 6),     # Overlap with medium
+            'vacation_range': (2, 15),
+            'emails_max': 30,
+            'pressure_range': (6, 9),    # Overlap with medium
+            'breaks_range': (0.5, 2.5)
+        },
+        'Critical': {
+            'hours_range': (55, 80),     # Some overlap with high
+            'overtime_max': 40,
+            'support_range': (1, 4),     # Overlap with high
+            'vacation_range': (0, 10),
+            'emails_max': 50,
+            'pressure_range': (7, 10),   # Overlap with high
+            'breaks_range': (0, 1.5)
+        }
+    }
     
-    def _generate_realistic_batch(self, risk_level, count):
+    def _generate_realistic_batch(self, risk_level, count, rng):
         """Generate data with realistic overlap and variance"""
+        params = self.RISK_LEVEL_PARAMS[risk_level]
         
-        # Realistic parameter ranges with significant overlap
-        if risk_level == 'Low':
-            params = {
-                'hours_range': (35, 50),     # Some overlap with medium
-                'overtime_max': 8,
-                'support_range': (6, 10),
-                'vacation_range': (12, 25),
-                'emails_max': 10,
-                'pressure_range': (1, 6),    # Overlap with medium
-                'breaks_range': (2, 4)
-            }
-        elif risk_level == 'Medium':
-            params = {
-                'hours_range': (40, 55),     # Overlap with both low and high
-                'overtime_max': 15,
-                'support_range': (4, 8),     # Overlap with low and high
-                'vacation_range': (8, 20),
-                'emails_max': 18,
-                'pressure_range': (4, 8),    # Significant overlap
-                'breaks_range': (1, 3)
-            }
-        elif risk_level == 'High':
-            params = {
-                'hours_range': (45, 65),     # Overlap with medium
-                'overtime_max': 25,
-                'support_range': (2, 6),     # Overlap with medium
-                'vacation_range': (2, 15),
-                'emails_max': 30,
-                'pressure_range': (6, 9),    # Overlap with medium
-                'breaks_range': (0.5, 2.5)
-            }
-        else:  # Critical
-            params = {
-                'hours_range': (55, 80),     # Some overlap with high
-                'overtime_max': 40,
-                'support_range': (1, 4),     # Overlap with high
-                'vacation_range': (0, 10),
-                'emails_max': 50,
-                'pressure_range': (7, 10),   # Overlap with high
-                'breaks_range': (0, 1.5)
-            }
+        # Add significant randomness and individual variation
+        base_support = rng.uniform(*params['support_range'], count)
+        base_hours = rng.uniform(*params['hours_range'], count)
         
-        batch = []
-        for i in range(count):
-            # Add significant randomness and individual variation
-            base_support = np.random.uniform(*params['support_range'])
-            base_hours = np.random.uniform(*params['hours_range'])
-            
-            # Create individual with correlated but noisy features
-            individual = {
-                'hours_per_week': base_hours + np.random.normal(0, 3),
-                'overtime_hours': max(0, np.random.exponential(params['overtime_max']/3)),
-                'meetings_per_day': np.random.poisson(max(1, base_hours/10)) + np.random.randint(0, 4),
-                'manager_support_score': max(1, min(10, base_support + np.random.normal(0, 1.5))),
-                'vacation_days_taken': max(0, np.random.uniform(*params['vacation_range']) + np.random.normal(0, 2)),
-                'after_hours_emails': max(0, np.random.poisson(params['emails_max']/2) + np.random.randint(0, 10)),
-                'deadline_pressure': max(1, min(10, np.random.uniform(*params['pressure_range']) + np.random.normal(0, 1))),
-                'work_life_balance_score': max(1, min(10, base_support * 0.7 + np.random.normal(2, 1.5))),
-                'team_collaboration_score': max(1, min(10, base_support * 0.8 + np.random.normal(1, 1.2))),
-                'daily_breaks': max(0, np.random.uniform(*params['breaks_range']) + np.random.normal(0, 0.5)),
-                'weekend_work_days': max(0, (base_hours - 40) * 0.1 + np.random.exponential(1)),
-                'role_clarity_score': max(1, min(10, base_support * 0.9 + np.random.normal(0, 1.3))),
-                'job_tenure_months': max(1, np.random.exponential(24) + np.random.randint(-6, 12)),
-                'risk_category': risk_level,
-                'risk_score': 0  # Will be calculated
-            }
-            
-            # Add some completely random cases (people are unpredictable!)
-            if np.random.random() < 0.15:  # 15% of cases have unexpected patterns
-                individual['manager_support_score'] = np.random.uniform(1, 10)
-                individual['work_life_balance_score'] = np.random.uniform(1, 10)
-            
-            batch.append(individual)
+        # Create individuals with correlated but noisy features
+        batch = pd.DataFrame({
+            'hours_per_week': base_hours + rng.normal(0, 3, count),
+            'overtime_hours': np.maximum(0, rng.exponential(params['overtime_max'] / 3, count)),
+            'meetings_per_day': rng.poisson(np.maximum(1, base_hours / 10)) + rng.integers(0, 4, count),
+            'manager_support_score': np.clip(base_support + rng.normal(0, 1.5, count), 1, 10),
+            'vacation_days_taken': np.maximum(0, rng.uniform(*params['vacation_range'], count) + rng.normal(0, 2, count)),
+            'after_hours_emails': np.maximum(0, rng.poisson(params['emails_max'] / 2, count) + rng.integers(0, 10, count)),
+            'deadline_pressure': np.clip(rng.uniform(*params['pressure_range'], count) + rng.normal(0, 1, count), 1, 10),
+            'work_life_balance_score': np.clip(base_support * 0.7 + rng.normal(2, 1.5, count), 1, 10),
+            'team_collaboration_score': np.clip(base_support * 0.8 + rng.normal(1, 1.2, count), 1, 10),
+            'daily_breaks': np.maximum(0, rng.uniform(*params['breaks_range'], count) + rng.normal(0, 0.5, count)),
+            'weekend_work_days': np.maximum(0, (base_hours - 40) * 0.1 + rng.exponential(1, count)),
+            'role_clarity_score': np.clip(base_support * 0.9 + rng.normal(0, 1.3, count), 1, 10),
+            'job_tenure_months': np.maximum(1, rng.exponential(24, count) + rng.integers(-6, 12, count)),
+            'risk_category': risk_level,
+            'risk_score': 0  # Will be calculated
+        })
+        
+        # Add some completely random cases (people are unpredictable!)
+        unexpected = rng.random(count) < 0.15  # 15% of cases have unexpected patterns
+        batch.loc[unexpected, 'manager_support_score'] = rng.uniform(1, 10, unexpected.sum())
+        batch.loc[unexpected, 'work_life_balance_score'] = rng.uniform(1, 10, unexpected.sum())
         
         return batch
     
-    def _add_realistic_noise(self, df):
+    def _add_realistic_noise(self, df, rng):
         """Add realistic workplace data noise"""
         df = df.copy()
         
         # Add measurement noise (surveys aren't perfect)
         for col in ['manager_support_score', 'work_life_balance_score', 'team_collaboration_score', 'role_clarity_score']:
             if col in df.columns:
-                df[col] += np.random.normal(0, 0.3, len(df))
+                df[col] += rng.normal(0, 0.3, len(df))
                 df[col] = np.clip(df[col], 1, 10)
         
         # Add reporting bias (people don't always report accurately)
         # Some people underreport hours
-        underreport_mask = np.random.random(len(df)) < 0.2
+        underreport_mask = rng.random(len(df)) < 0.2
         df.loc[underreport_mask, 'hours_per_week'] *= 0.9
         
         # Some people over-report support scores (social desirability bias)
-        overreport_mask = np.random.random(len(df)) < 0.15
-        df.loc[overreport_mask, 'manager_support_score'] += np.random.uniform(0.5, 1.5, sum(overreport_mask))
+        overreport_mask = rng.random(len(df)) < 0.15
+        df.loc[overreport_mask, 'manager_support_score'] += rng.uniform(0.5, 1.5, overreport_mask.sum())
         df.loc[overreport_mask, 'manager_support_score'] = np.clip(df.loc[overreport_mask, 'manager_support_score'], 1, 10)
         
         return df
     
-    def _add_missing_values(self, df):
+    def _add_missing_values(self, df, rng):
         """Add realistic missing data patterns"""
         df = df.copy()
         
         # Some people don't answer all survey questions
         for col in ['work_life_balance_score', 'team_collaboration_score', 'role_clarity_score']:
-            missing_mask = np.random.random(len(df)) < 0.08  # 8% missing
+            missing_mask = rng.random(len(df)) < 0.08  # 8% missing
             df.loc[missing_mask, col] = np.nan
         
         # Some vacation data might be incomplete
-        vacation_missing = np.random.random(len(df)) < 0.05  # 5% missing
+        vacation_missing = rng.random(len(df)) < 0.05  # 5% missing
         df.loc[vacation_missing, 'vacation_days_taken'] = np.nan
         
         return df
     
-    def _add_edge_cases(self, df):
+    def _add_edge_cases(self, df, rng):
         """Add realistic edge cases and outliers"""
         df = df.copy()
         
         # Add some extreme cases (workaholics, burnout cases, etc.)
         n_outliers = int(len(df) * 0.03)  # 3% outliers
-        outlier_indices = np.random.choice(len(df), n_outliers, replace=False)
+        outlier_indices = df.index[rng.choice(len(df), n_outliers, replace=False)]
+        case_types = rng.choice(['workaholic', 'burnout', 'new_employee', 'part_timer'], n_outliers)
+        
+        idx = outlier_indices[case_types == 'workaholic']
+        df.loc[idx, 'hours_per_week'] = rng.uniform(70, 90, len(idx))
+        df.loc[idx, 'vacation_days_taken'] = rng.uniform(0, 5, len(idx))
+        # But they might still report high satisfaction
+        df.loc[idx, 'work_life_balance_score'] = rng.uniform(4, 8, len(idx))
+        
+        idx = outlier_indices[case_types == 'burnout']
+        df.loc[idx, 'hours_per_week'] = rng.uniform(55, 75, len(idx))
+        df.loc[idx, 'manager_support_score'] = rng.uniform(1, 3, len(idx))
+        df.loc[idx, 'work_life_balance_score'] = rng.uniform(1, 3, len(idx))
+        df.loc[idx, 'risk_category'] = 'Critical'
+        
+        idx = outlier_indices[case_types == 'new_employee']
+        df.loc[idx, 'job_tenure_months'] = rng.uniform(1, 6, len(idx))
+        df.loc[idx, 'role_clarity_score'] = rng.uniform(2, 5, len(idx))
+        # Might work extra hours while learning
+        df.loc[idx, 'hours_per_week'] += rng.uniform(5, 15, len(idx))
+        
+        idx = outlier_indices[case_types == 'part_timer']
+        df.loc[idx, 'hours_per_week'] = rng.uniform(20, 35, len(idx))
+        df.loc[idx, 'overtime_hours'] = 0
         
-        for idx in outlier_indices:
-            case_type = np.random.choice(['workaholic', 'burnout', 'new_employee', 'part_timer'])
-            
-            if case_type == 'workaholic':
-                df.loc[idx, 'hours_per_week'] = np.random.uniform(70, 90)
-                df.loc[idx, 'vacation_days_taken'] = np.random.uniform(0, 5)
-                # But they might still report high satisfaction
-                df.loc[idx, 'work_life_balance_score'] = np.random.uniform(4, 8)
-                
-            elif case_type == 'burnout':
-                df.loc[idx, 'hours_per_week'] = np.random.uniform(55, 75)
-                df.loc[idx, 'manager_support_score'] = np.random.uniform(1, 3)
-                df.loc[idx, 'work_life_balance_score'] = np.random.uniform(1, 3)
-                df.loc[idx, 'risk_category'] = 'Critical'
-                
-            elif case_type == 'new_employee':
-                df.loc[idx, 'job_tenure_months'] = np.random.uniform(1, 6)
-                df.loc[idx, 'role_clarity_score'] = np.random.uniform(2, 5)
-                # Might work extra hours while learning
-                df.loc[idx, 'hours_per_week'] += np.random.uniform(5, 15)
-                
-            elif case_type == 'part_timer':
-                df.loc[idx, 'hours_per_week'] = np.random.uniform(20, 35)
-                df.loc[idx, 'overtime_hours'] = 0
-                
         return df
     
-    def preprocess_realistic_data(self, data):
-        """Handle realistic data preprocessing"""
-        data = data.copy()
+    def preprocess_realistic_data(self, data, fit=False):
+        """Handle realistic data preprocessing
         
-        # Handle missing values realistically
-        numeric_cols = data.select_dtypes(include=[np.number]).columns
-        numeric_cols = [col for col in numeric_cols if col != 'risk_category']
+        With fit=True (training) the imputation medians are learned and kept
+        on the predictor; afterwards scoring reuses them instead of fitting a
+        new imputer on the rows being scored.
+        """
+        data = data.copy()
         
-        # Use median imputation (more robust for skewed workplace data)
-        imputer = SimpleImputer(strategy='median')
-        data[numeric_cols] = imputer.fit_transform(data[numeric_cols])
+        if fit or self.imputation_medians is None:
+            # Handle missing values realistically
+            numeric_cols = data.select_dtypes(include=[np.number]).columns
+            numeric_cols = [col for col in numeric_cols if col != 'risk_category']
+            
+            # Use median imputation (more robust for skewed workplace data)
+            from sklearn.impute import SimpleImputer
+            imputer = SimpleImputer(strategy='median')
+            data[numeric_cols] = imputer.fit_transform(data[numeric_cols])
+            if fit:
+                self.imputation_medians = {
+                    col: float(median) for col, median in zip(numeric_cols, imputer.statistics_)
+                }
+        else:
+            median_cols = [col for col in self.imputation_medians if col in data.columns]
+            data[median_cols] = data[median_cols].astype(float).fillna(self.imputation_medians)
         
         # Cap extreme outliers (data cleaning step)
-        data['hours_per_week'] = np.clip(data['hours_per_week'], 15, 90)
-        data['overtime_hours'] = np.clip(data['overtime_hours'], 0, 50)
-        data['vacation_days_taken'] = np.clip(data['vacation_days_taken'], 0, 30)
+        for col, (lower, upper) in self.clip_bounds.items():
+            data[col] = np.clip(data[col], lower, upper)
         
         return data
     
@@ -250,54 +409,67 @@ class RealisticMentalHealthPredictor:
         
         return data
     
-    def train_realistic_model(self, data):
-        """Train model with realistic performance expectations"""
+    def train_realistic_model(self, data, n_jobs=None, cv_folds=5, verbose=True, trend_features=False):
+        """Train model with realistic performance expectations
+        
+        n_jobs is the core budget (default: TRAINING_JOBS or every core).
+        The forest grows its trees in parallel, and the CV folds are spread
+        over the same budget. verbose=False skips the detailed report.
+        trend_features=True also trains on TREND_FEATURE_COLUMNS, which
+        data must then contain (see rolling_features.rolling_trend_matrix).
+        """
+        from sklearn.base import clone
+        from sklearn.model_selection import train_test_split, cross_val_score
+        from sklearn.preprocessing import StandardScaler
+        
+        if trend_features:
+            missing = [col for col in TREND_FEATURE_COLUMNS if col not in data.columns]
+            if missing:
+                raise ValueError(
+                    f"Training with trend features needs weekly history, but data lacks {len(missing)} "
+                    f"trend columns (e.g. {missing[0]})"
+                )
+        
         start_time = time.time()
-        print("Training realistic model...")
+        timer = PhaseTimer()
+        n_jobs = training_jobs(n_jobs)
+        print(f"Training realistic model on {len(data)} rows ({n_jobs} cores)...")
         
         # Realistic preprocessing
-        data = self.preprocess_realistic_data(data)
-        data = self.engineer_realistic_features(data)
-        
-        # Select features (not too many to avoid overfitting)
-        feature_cols = [
-            'hours_per_week', 'overtime_hours', 'manager_support_score',
-            'vacation_days_taken', 'after_hours_emails', 'deadline_pressure',
-            'work_life_balance_score', 'daily_breaks', 'job_tenure_months',
-            'workload_intensity', 'support_deficit', 'wlb_composite', 
-            'pressure_no_support', 'tenure_factor'
-        ]
+        with timer.phase('preprocess'):
+            data = self.preprocess_realistic_data(data, fit=True)
+            data = self.engineer_realistic_features(data)
         
+        feature_cols = MODEL_FEATURE_COLUMNS + (TREND_FEATURE_COLUMNS if trend_features else [])
         X = data[feature_cols]
         y = data['risk_category']
         self.feature_names = feature_cols
         
-        # Realistic train/test split
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.25, random_state=42, stratify=y  # Larger test set
-        )
-        
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        with timer.phase('split_scale'):
+            # Realistic train/test split
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.25, random_state=42, stratify=y  # Larger test set
+            )
+            
+            # Scale features
+            self.scaler = StandardScaler()
+            X_train_scaled = self.scaler.fit_transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
         
-        # Realistic model parameters (prevent overfitting)
-        self.model = RandomForestClassifier(
-            n_estimators=100,        # Moderate number
-            max_depth=6,            # Prevent overfitting
-            min_samples_split=20,   # Require more samples to split
-            min_samples_leaf=10,    # Require more samples in leaves
-            max_features=0.7,       # Don't use all features
-            random_state=42,
-            class_weight='balanced'
-        )
+        self.model = self.new_forest(n_jobs)
         
         # Train model
-        self.model.fit(X_train_scaled, y_train)
+        with timer.phase('fit'):
+            self.model.fit(X_train_scaled, y_train)
+        self.model_version = f"rf-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        with timer.phase('compile'):
+            self._build_inference_state()
         
         # Realistic evaluation
-        y_pred = self.model.predict(X_test_scaled)
-        y_pred_proba = self.model.predict_proba(X_test_scaled)
+        with timer.phase('evaluate'):
+            y_pred = self.model.predict(X_test_scaled)
+            y_pred_proba = self.model.predict_proba(X_test_scaled)
+            evaluation = evaluation_metrics(y_test, y_pred)
         
         # Get feature importance
         self.feature_importance = pd.DataFrame({
@@ -305,18 +477,147 @@ class RealisticMentalHealthPredictor:
             'importance': self.model.feature_importances_
         }).sort_values('importance', ascending=False)
         
-        # Cross-validation for realistic performance estimate
-        cv_scores = cross_val_score(self.model, X_train_scaled, y_train, cv=5, scoring='accuracy')
+        # Cross-validation for realistic performance estimate: folds run in
+        # parallel, each fold's forest gets what is left of the budget
+        with timer.phase('cross_validation'):
+            cv_scores = np.array([])
+            if cv_folds > 1:
+                fold_jobs = min(cv_folds, n_jobs)
+                cv_model = clone(self.model).set_params(n_jobs=max(1, n_jobs // fold_jobs))
+                cv_scores = cross_val_score(cv_model, X_train_scaled, y_train, cv=cv_folds,
+                                            scoring='accuracy', n_jobs=fold_jobs)
         
         training_time = time.time() - start_time
+        self.training_metrics = {
+            **evaluation,
+            'cv_accuracy_mean': float(cv_scores.mean()) if len(cv_scores) else None,
+            'cv_accuracy_std': float(cv_scores.std()) if len(cv_scores) else None,
+            'train_rows': int(len(X_train)),
+            'test_rows': int(len(X_test)),
+            'n_estimators': int(self.model.n_estimators),
+            'n_jobs': n_jobs,
+            'incremental': False,
+            'trend_features': trend_features,
+            'phase_seconds': timer.seconds,
+            'training_seconds': round(training_time, 3)
+        }
+        print(f"Trained {self.model_version} in {training_time:.2f}s "
+              f"(test accuracy {evaluation['test_accuracy']:.3f}) - {timer.summary()}")
+        
+        if verbose:
+            self._print_training_report(y_test, y_pred, y_pred_proba, cv_scores)
+        
+        return X_test, y_test, y_pred, y_pred_proba
+    
+    def new_forest(self, n_jobs=1, **params):
+        """Unfitted forest with the production hyperparameters (params override them)"""
+        from sklearn.ensemble import RandomForestClassifier
+        
+        # Realistic model parameters (prevent overfitting)
+        return RandomForestClassifier(**{
+            'n_estimators': 100,        # Moderate number
+            'max_depth': 6,             # Prevent overfitting
+            'min_samples_split': 20,    # Require more samples to split
+            'min_samples_leaf': 10,     # Require more samples in leaves
+            'max_features': 0.7,        # Don't use all features
+            'random_state': 42,
+            'class_weight': 'balanced',
+            'n_jobs': n_jobs,
+            **params
+        })
+    
+    def update_model(self, data, extra_trees=20, n_jobs=None, verbose=True):
+        """Warm-start extra_trees new trees on newly arrived data
+        
+        The existing trees, scaler and imputation medians are kept as they
+        are; only the added trees see the new rows, so this is much cheaper
+        than a full retrain. Needs the fitted scikit-learn forest (a .pkl,
+        or an artifact loaded with load_estimator). A quarter of the new
+        rows is held out to compare the old and updated model.
+        """
+        from sklearn.model_selection import train_test_split
+        
+        if self.model is None or self.scaler is None:
+            raise ValueError("Incremental training needs the fitted forest - load it with load_estimator()")
+        
+        start_time = time.time()
+        timer = PhaseTimer()
+        n_jobs = training_jobs(n_jobs)
+        base_version = self.model_version
+        print(f"Adding {extra_trees} trees to {base_version} from {len(data)} new rows ({n_jobs} cores)...")
+        
+        with timer.phase('preprocess'):
+            X = self.scaler.transform(self._feature_frame(data))
+            y = data['risk_category']
+        
+        # New trees vote alongside the old ones, so their class columns must line up
+        unknown = set(y) - set(self.model.classes_)
+        missing = set(self.model.classes_) - set(y)
+        if unknown or missing:
+            raise ValueError(
+                f"New data must contain exactly the model's classes ({', '.join(map(str, self.model.classes_))})"
+            )
+        
+        with timer.phase('split_scale'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.25, random_state=42, stratify=y
+            )
+        
+        with timer.phase('evaluate_base'):
+            base_accuracy = float(np.mean(self.model.predict(X_test) == np.asarray(y_test)))
+        
+        previous_trees = len(self.model.estimators_)
+        with timer.phase('fit'):
+            self.model.set_params(warm_start=True, n_estimators=previous_trees + extra_trees, n_jobs=n_jobs)
+            self.model.fit(X_train, y_train)
+            self.model.set_params(warm_start=False)
+        self.model_version = f"rf-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        with timer.phase('compile'):
+            self._build_inference_state()
+        
+        with timer.phase('evaluate'):
+            y_pred = self.model.predict(X_test)
+            y_pred_proba = self.model.predict_proba(X_test)
+            evaluation = evaluation_metrics(y_test, y_pred)
+        
+        self.feature_importance = pd.DataFrame({
+            'feature': self.feature_names,
+            'importance': self.model.feature_importances_
+        }).sort_values('importance', ascending=False)
+        
+        training_time = time.time() - start_time
+        self.training_metrics = {
+            **evaluation,
+            'base_model_version': base_version,
+            'base_test_accuracy': base_accuracy,
+            'train_rows': int(len(X_train)),
+            'test_rows': int(len(X_test)),
+            'n_estimators': int(self.model.n_estimators),
+            'trees_added': int(extra_trees),
+            'n_jobs': n_jobs,
+            'incremental': True,
+            'phase_seconds': timer.seconds,
+            'training_seconds': round(training_time, 3)
+        }
+        print(f"Updated {base_version} -> {self.model_version} in {training_time:.2f}s "
+              f"(accuracy on new data {base_accuracy:.3f} -> {evaluation['test_accuracy']:.3f}) - {timer.summary()}")
+        
+        if verbose:
+            self._print_training_report(y_test, y_pred, y_pred_proba)
+        
+        return X_test, y_test, y_pred, y_pred_proba
+    
+    def _print_training_report(self, y_test, y_pred, y_pred_proba, cv_scores=None):
+        from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
         
         print(f"\n{'='*60}")
         print("REALISTIC MODEL PERFORMANCE")
         print(f"{'='*60}")
-        print(f"Training Time: {training_time:.2f} seconds")
+        print(f"Training Time: {self.training_metrics['training_seconds']:.2f} seconds")
         print(f"Test Set Accuracy: {accuracy_score(y_test, y_pred):.3f}")
-        print(f"Cross-Validation Accuracy: {cv_scores.mean():.3f} (±{cv_scores.std()*2:.3f})")
-        print(f"Model Complexity: {len(feature_cols)} features, max_depth=6")
+        if cv_scores is not None and len(cv_scores):
+            print(f"Cross-Validation Accuracy: {cv_scores.mean():.3f} (±{cv_scores.std()*2:.3f})")
+        print(f"Model Complexity: {len(self.feature_names)} features, max_depth=6, {self.model.n_estimators} trees")
         
         print(f"\nDetailed Performance:")
         print(classification_report(y_test, y_pred))
@@ -337,16 +638,26 @@ class RealisticMentalHealthPredictor:
         print(f"  High confidence (>0.7): {(max_probas > 0.7).mean():.1%}")
         print(f"  Medium confidence (0.5-0.7): {((max_probas > 0.5) & (max_probas <= 0.7)).mean():.1%}")
         print(f"  Low confidence (<0.5): {(max_probas <= 0.5).mean():.1%}")
-        
-        return X_test, y_test, y_pred, y_pred_proba
     
-    def predict_risk(self, employee_data):
-        """Realistic prediction with uncertainty handling"""
+    def _to_frame(self, employee_data):
+        """Normalize a dict, list of dicts, DataFrame or 2-D array into a DataFrame"""
+        if isinstance(employee_data, pd.DataFrame):
+            return employee_data
         if isinstance(employee_data, dict):
-            employee_data = pd.DataFrame([employee_data])
-        
-        # Preprocess
-        data = self.preprocess_realistic_data(employee_data)
+            return pd.DataFrame([employee_data])
+        if isinstance(employee_data, np.ndarray):
+            if employee_data.ndim != 2 or employee_data.shape[1] != len(RAW_FEATURE_COLUMNS):
+                raise ValueError(
+                    f"Expected a 2-D array with {len(RAW_FEATURE_COLUMNS)} columns "
+                    f"({', '.join(RAW_FEATURE_COLUMNS)})"
+                )
+            return pd.DataFrame(employee_data.astype(float), columns=RAW_FEATURE_COLUMNS)
+        return pd.DataFrame(list(employee_data))
+    
+    def _feature_frame(self, data):
+        """Preprocess and engineer a DataFrame into the (unscaled) model features"""
+        data = self._with_trends(data)
+        data = self.preprocess_realistic_data(data)
         data = self.engineer_realistic_features(data)
         
         # Handle missing features gracefully
@@ -360,23 +671,260 @@ class RealisticMentalHealthPredictor:
                 else:
                     data[feature] = 0.0
         
-        X = data[self.feature_names]
-        X_scaled = self.scaler.transform(X)
+        return data[self.feature_names]
+    
+    def _with_trends(self, data):
+        """data with the model's trend features, from the one-week snapshot for rows that have none
+        
+        A row with every trend feature absent or NaN has no stored history;
+        other NaN trend values are imputed like any metric.
+        """
+        trend_cols = [name for name in self.feature_names if name in TREND_FEATURE_COLUMNS]
+        if not trend_cols:
+            return data
+        trends = data.reindex(columns=trend_cols).astype(float)
+        unstored = trends.isna().all(axis=1).to_numpy()
+        if unstored.any():
+            raw = data.reindex(columns=RAW_FEATURE_COLUMNS).to_numpy(dtype=float)[unstored]
+            snapshot = pd.DataFrame(snapshot_trends(raw), columns=TREND_FEATURE_COLUMNS)
+            trends.loc[unstored, trend_cols] = snapshot[trend_cols].to_numpy()
+        return data.assign(**{col: trends[col].to_numpy() for col in trend_cols})
+    
+    def _predict_proba(self, X):
+        """Class probabilities for an unscaled feature matrix"""
+        # The compiled engine wins on per-call overhead; sklearn's own
+        # traversal is still faster for very large batches. Models served
+        # from a mapped artifact only have the engine.
+        if self.engine is not None and (self.model is None or len(X) <= self.engine_max_rows):
+            return self.engine.predict_proba(X)
+        return self.model.predict_proba(self.scaler.transform(X))
+    
+    def _raw_frame(self, raw, trends=None):
+        frame = pd.DataFrame(raw, columns=RAW_FEATURE_COLUMNS)
+        if trends is not None:
+            frame[TREND_FEATURE_COLUMNS] = trends
+        return frame
+    
+    def model_matrix(self, raw, engineered, trends=None):
+        """Unscaled model features for a raw metric array, reusing stored engineered features
+        
+        engineered holds feature-store values (ENGINEERED_FEATURE_COLUMNS
+        order) computed at FEATURE_VERSION, with all-NaN rows where nothing
+        is stored. They are taken as-is unless a metric the model depends on
+        is missing: then the features depend on this model's imputation
+        medians and the row goes through _feature_frame. trends optionally
+        holds stored trend features (TREND_FEATURE_COLUMNS order, all-NaN
+        where there is no history), for models trained with them.
+        """
+        raw = np.asarray(raw, dtype=float)
+        if trends is not None:
+            trends = np.asarray(trends, dtype=float)
+        if self.clip_bounds != CLIP_BOUNDS or self.imputation_medians is None:
+            return self._feature_frame(self._raw_frame(raw, trends)).to_numpy()
+        
+        blocks = [raw, np.asarray(engineered, dtype=float)]
+        if self._trend_feature_medians:
+            if trends is None:
+                trends = snapshot_trends(raw)
+            else:
+                unstored = np.isnan(trends[:, self._trend_columns]).all(axis=1)
+                trends = np.where(unstored[:, np.newaxis], snapshot_trends(raw), trends)
+            blocks.append(trends)
+        X = np.concatenate(blocks, axis=1).take(self._stored_feature_index, axis=1)
+        for j, lower, upper in self._stored_clip_bounds:
+            np.clip(X[:, j], lower, upper, out=X[:, j])
+        for j, median in self._trend_feature_medians:
+            X[np.isnan(X[:, j]), j] = median
+        recompute = np.isnan(blocks[1]).all(axis=1) | np.isnan(raw[:, self._imputed_columns]).any(axis=1)
+        if recompute.any():
+            X[recompute] = self._feature_frame(
+                self._raw_frame(raw[recompute], trends[recompute] if trends is not None else None)
+            ).to_numpy()
+        return X
+    
+    def predict_risk_batch(self, employee_data, engineered=None, trends=None):
+        """Score many employees with a single predict_proba pass.
+        
+        Accepts a DataFrame, a list of dicts or a 2-D array (columns in
+        RAW_FEATURE_COLUMNS order) and returns columnar results. With a 2-D
+        array, engineered and trends may pass stored features (see
+        model_matrix); a DataFrame or dicts can carry trend columns directly.
+        """
+        if engineered is not None:
+            X = self.model_matrix(employee_data, engineered, trends)
+        elif trends is not None:
+            X = self._feature_frame(self._raw_frame(np.asarray(employee_data, dtype=float), trends))
+        else:
+            X = self._feature_frame(self._to_frame(employee_data))
+        
+        # RandomForestClassifier.predict is argmax(predict_proba), so derive
+        # the category from the probabilities instead of a second pass
+        risk_proba = self._predict_proba(X)
+        best = np.argmax(risk_proba, axis=1)
+        risk_category = self.classes.take(best)
+        confidence = risk_proba[np.arange(len(best)), best]
+        
+        return {
+            'predicted_risk_category': risk_category,
+            'confidence_score': confidence,
+            'classes': list(self.classes),
+            'class_probabilities': risk_proba,
+            'prediction_reliability': self._assess_reliability_batch(confidence),
+            'intervention_priority': self._get_intervention_priority_batch(risk_category, confidence)
+        }
+    
+    @property
+    def classes(self):
+        return self.model.classes_ if self.model is not None else self.engine.classes_
+    
+    def _build_inference_state(self, engine=None):
+        """Precompute lookups used by the fast inference paths"""
+        self.engine = engine
+        if self.engine is None and self.use_compiled_engine:
+            self.engine = CompiledForest(self.model, self.scaler)
+        self._build_feature_lookups()
+    
+    def _build_feature_lookups(self):
+        """Index arrays for the vectorized preprocessing (needs feature_names, medians and clip bounds)"""
+        self._raw_index = {col: i for i, col in enumerate(RAW_FEATURE_COLUMNS)}
+        self._raw_medians = None
+        if self.imputation_medians is not None:
+            self._raw_medians = np.array([
+                self.imputation_medians.get(col, np.nan) for col in RAW_FEATURE_COLUMNS
+            ])
+        # Column of each model feature in [raw metrics | stored engineered features | trend features]
+        stored_columns = RAW_FEATURE_COLUMNS + ENGINEERED_FEATURE_COLUMNS + TREND_FEATURE_COLUMNS
+        self._stored_feature_index = [stored_columns.index(name) for name in self.feature_names]
+        self._trend_columns = [
+            TREND_FEATURE_COLUMNS.index(name) for name in self.feature_names if name in TREND_FEATURE_COLUMNS
+        ]
+        medians = self.imputation_medians or {}
+        self._trend_feature_medians = [
+            (j, medians.get(name, np.nan)) for j, name in enumerate(self.feature_names) if name in TREND_FEATURE_COLUMNS
+        ]
+        self._stored_clip_bounds = [
+            (self.feature_names.index(col), lower, upper)
+            for col, (lower, upper) in self.clip_bounds.items() if col in self.feature_names
+        ]
+        # Raw metrics whose imputed value reaches the model
+        self._imputed_columns = [
+            i for i, col in enumerate(RAW_FEATURE_COLUMNS)
+            if col in self.feature_names or col in ENGINEERED_INPUT_COLUMNS
+        ]
+        self._clip_lower = np.full(len(RAW_FEATURE_COLUMNS), -np.inf)
+        self._clip_upper = np.full(len(RAW_FEATURE_COLUMNS), np.inf)
+        for col, (lower, upper) in self.clip_bounds.items():
+            self._clip_lower[self._raw_index[col]] = lower
+            self._clip_upper[self._raw_index[col]] = upper
+    
+    def _feature_row(self, record):
+        """Build the (unscaled) model row for one dict without touching pandas.
+        
+        Mirrors preprocess_realistic_data and engineer_realistic_features
+        operation for operation, so results match the DataFrame path
+        exactly. Returns None for records it cannot handle identically
+        (absent keys, or missing values without persisted medians).
+        """
+        raw = np.empty(len(RAW_FEATURE_COLUMNS))
+        for i, col in enumerate(RAW_FEATURE_COLUMNS):
+            if col not in record:
+                return None
+            value = record[col]
+            raw[i] = np.nan if value is None else float(value)
+        
+        trends = {}
+        if self._trend_columns:
+            # Same rules as _with_trends: no trend values means a one-week history
+            names = [TREND_FEATURE_COLUMNS[k] for k in self._trend_columns]
+            stored = np.array([np.nan if record.get(name) is None else float(record[name]) for name in names])
+            if np.isnan(stored).all():
+                stored = snapshot_trends(raw)[0, self._trend_columns]
+            if np.isnan(stored).any() and self.imputation_medians is None:
+                return None
+            trends = {
+                name: self.imputation_medians.get(name, np.nan) if np.isnan(value) else value
+                for name, value in zip(names, stored.tolist())
+            }
+        
+        missing = np.isnan(raw)
+        if missing.any():
+            if self._raw_medians is None:
+                return None
+            raw[missing] = self._raw_medians[missing]
+        raw = np.clip(raw, self._clip_lower, self._clip_upper)
         
-        # Prediction with uncertainty
-        risk_proba = self.model.predict_proba(X_scaled)
-        risk_category = self.model.predict(X_scaled)
-        confidence = np.max(risk_proba, axis=1)
+        (hours, overtime, meetings, manager_support, vacation, emails, pressure,
+         wlb_score, collaboration, breaks, weekend_days, clarity, tenure) = raw
+        
+        support_deficit = (11 - manager_support) / 10
+        values = {
+            'hours_per_week': hours,
+            'overtime_hours': overtime,
+            'meetings_per_day': meetings,
+            'manager_support_score': manager_support,
+            'vacation_days_taken': vacation,
+            'after_hours_emails': emails,
+            'deadline_pressure': pressure,
+            'work_life_balance_score': wlb_score,
+            'team_collaboration_score': collaboration,
+            'daily_breaks': breaks,
+            'weekend_work_days': weekend_days,
+            'role_clarity_score': clarity,
+            'job_tenure_months': tenure,
+            'workload_intensity': (
+                np.log1p(hours - 35) * 0.4 +
+                np.log1p(overtime) * 0.4 +
+                (meetings / 10) * 0.2
+            ),
+            'support_deficit': support_deficit,
+            'wlb_composite': (
+                wlb_score * 0.5 +
+                (25 - vacation) * 0.1 +
+                (5 - breaks) * 0.2 +
+                weekend_days * -0.2
+            ) / 10,
+            'pressure_no_support': pressure * support_deficit,
+            'tenure_factor': 1.2 if tenure < 12 else 1.0,
+            **trends
+        }
+        
+        row = np.empty(len(self.feature_names))
+        for i, feature in enumerate(self.feature_names):
+            if feature in values:
+                row[i] = values[feature]
+            elif 'score' in feature:
+                row[i] = 5.0
+            elif 'hours' in feature:
+                row[i] = 40.0
+            else:
+                row[i] = 0.0
+        
+        return row
+    
+    def predict_risk(self, employee_data):
+        """Realistic prediction with uncertainty handling"""
+        row = self._feature_row(employee_data) if isinstance(employee_data, dict) else None
+        if row is not None:
+            risk_proba = self._predict_proba(row[np.newaxis, :])[0]
+            classes = self.classes
+        else:
+            batch = self.predict_risk_batch(employee_data)
+            risk_proba = batch['class_probabilities'][0]
+            classes = batch['classes']
+        
+        best = np.argmax(risk_proba)
+        risk_category = classes[best]
+        confidence = risk_proba[best]
         
         result = {
-            'predicted_risk_category': risk_category[0],
-            'confidence_score': confidence[0],
+            'predicted_risk_category': risk_category,
+            'confidence_score': confidence,
             'class_probabilities': {
                 class_name: prob for class_name, prob in 
-                zip(self.model.classes_, risk_proba[0])
+                zip(classes, risk_proba)
             },
-            'prediction_reliability': self._assess_reliability(confidence[0]),
-            'intervention_priority': self._get_intervention_priority(risk_category[0], confidence[0])
+            'prediction_reliability': self._assess_reliability(confidence),
+            'intervention_priority': self._get_intervention_priority(risk_category, confidence)
         }
         
         return result
@@ -401,16 +949,157 @@ class RealisticMentalHealthPredictor:
         else:
             return "Monitor"
     
+    def _assess_reliability_batch(self, confidence):
+        """Vectorized _assess_reliability over an array of confidences"""
+        return np.select(
+            [confidence > 0.75, confidence > 0.55],
+            ["High - Act on this prediction", "Medium - Monitor closely"],
+            default="Low - Gather more data"
+        )
+    
+    def _get_intervention_priority_batch(self, categories, confidence):
+        """Vectorized _get_intervention_priority over arrays of predictions"""
+        return np.select(
+            [
+                (categories == 'Critical') & (confidence > 0.6),
+                (categories == 'High') & (confidence > 0.55),
+                categories == 'Medium'
+            ],
+            ["Immediate", "Within 1 week", "Within 1 month"],
+            default="Monitor"
+        )
+    
     def save_model(self, filepath):
         """Save the realistic model"""
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
             'feature_names': self.feature_names,
-            'feature_importance': self.feature_importance
+            'feature_importance': self.feature_importance,
+            'imputation_medians': self.imputation_medians,
+            'clip_bounds': self.clip_bounds,
+            'model_version': self.model_version,
+            'training_metrics': self.training_metrics
         }
+        import joblib
         joblib.dump(model_data, filepath)
         print(f"Realistic model saved to {filepath}")
+    
+    def load_model(self, filepath):
+        """Load a model saved with save_model, or an artifact directory saved with save_artifact"""
+        if os.path.isdir(filepath):
+            return self.load_artifact(filepath)
+        
+        import joblib
+        model_data = joblib.load(filepath)
+        self.model = model_data['model']
+        self.scaler = model_data['scaler']
+        self.feature_names = model_data['feature_names']
+        self.feature_importance = model_data['feature_importance']
+        # Older artifacts predate persisted preprocessing statistics
+        self.imputation_medians = model_data.get('imputation_medians')
+        self.clip_bounds = model_data.get('clip_bounds', dict(CLIP_BOUNDS))
+        self.model_version = model_data.get('model_version') or self._artifact_digest(filepath)
+        self.training_metrics = model_data.get('training_metrics')
+        self._build_inference_state()
+    
+    def save_artifact(self, directory):
+        """Save as a memory-mappable artifact: compiled node arrays + manifest.json
+        
+        Serving from the artifact needs neither scikit-learn nor a private
+        unpickled forest per process; see model_artifact.read_artifact.
+        The fitted forest is kept alongside (estimator.joblib) so that
+        update_model can warm-start from it.
+        """
+        engine = self.engine if self.engine is not None else CompiledForest(self.model, self.scaler)
+        importance = None
+        if self.feature_importance is not None:
+            importance = [
+                [row.feature, float(row.importance)] for row in self.feature_importance.itertuples()
+            ]
+        
+        files = {}
+        if self.model is not None:
+            import joblib
+            files[ESTIMATOR_FILE] = lambda path: joblib.dump({'model': self.model, 'scaler': self.scaler}, path)
+        
+        return write_artifact(directory, engine.to_arrays(), {
+            'model_version': self.model_version,
+            'model_type': 'random_forest',
+            'feature_schema': {
+                'raw_columns': RAW_FEATURE_COLUMNS,
+                'feature_names': list(self.feature_names),
+                'imputation_medians': self.imputation_medians,
+                'clip_bounds': {col: list(bounds) for col, bounds in self.clip_bounds.items()}
+            },
+            'classes': [str(c) for c in engine.classes_],
+            'n_features': int(engine.n_features),
+            'max_depth': int(engine.max_depth),
+            'feature_importance': importance,
+            'training_metrics': self.training_metrics
+        }, files=files)
+    
+    def load_artifact(self, directory, verify=True):
+        """Load an artifact directory with memory-mapped node arrays, validating its schema first"""
+        manifest, arrays = read_artifact(directory, verify=verify)
+        schema = manifest['feature_schema']
+        self._validate_schema(schema, manifest['n_features'])
+        try:
+            engine = CompiledForest.from_arrays(
+                arrays, manifest['classes'], manifest['n_features'], manifest['max_depth']
+            )
+        except (KeyError, ValueError) as e:
+            raise ArtifactError(f"Invalid node arrays: {e}") from e
+        
+        self.model = None
+        self.scaler = None  # Folded into the engine's thresholds
+        self.feature_names = schema['feature_names']
+        self.imputation_medians = schema['imputation_medians']
+        self.clip_bounds = {col: tuple(bounds) for col, bounds in schema['clip_bounds'].items()}
+        self.feature_importance = None
+        if manifest.get('feature_importance'):
+            self.feature_importance = pd.DataFrame(manifest['feature_importance'], columns=['feature', 'importance'])
+        self.training_metrics = manifest.get('training_metrics')
+        self.model_version = manifest['model_version']
+        self._build_inference_state(engine)
+    
+    def load_estimator(self, filepath):
+        """Load the model plus its fitted scikit-learn forest, for update_model"""
+        self.load_model(filepath)
+        if self.model is not None:
+            return
+        
+        import joblib
+        estimator = joblib.load(verified_file(filepath, ESTIMATOR_FILE))
+        if [str(c) for c in estimator['model'].classes_] != [str(c) for c in self.engine.classes_]:
+            raise ArtifactError(f"{ESTIMATOR_FILE} does not match the artifact's classes")
+        self.model = estimator['model']
+        self.scaler = estimator['scaler']
+    
+    def _validate_schema(self, schema, n_features):
+        """Reject artifacts whose inputs do not match this code's feature pipeline"""
+        if schema.get('raw_columns') != RAW_FEATURE_COLUMNS:
+            raise ArtifactError("Artifact was trained on different raw input columns")
+        feature_names = schema.get('feature_names') or []
+        if len(feature_names) != n_features:
+            raise ArtifactError(f"Artifact lists {len(feature_names)} features but its trees use {n_features}")
+        
+        probe = pd.DataFrame([{col: 1.0 for col in RAW_FEATURE_COLUMNS}])
+        available = set(self.engineer_realistic_features(probe).columns) | set(TREND_FEATURE_COLUMNS)
+        unknown = [name for name in feature_names if name not in available]
+        if unknown:
+            raise ArtifactError(f"Artifact uses features this code cannot compute: {', '.join(unknown)}")
+        extra = set(schema.get('clip_bounds') or {}) - set(RAW_FEATURE_COLUMNS)
+        if extra:
+            raise ArtifactError(f"clip_bounds refers to unknown columns: {', '.join(sorted(extra))}")
+    
+    def _artifact_digest(self, filepath):
+        """Content-derived version for artifacts saved without one"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return f"sha-{digest.hexdigest()[:12]}"
 
 # Test the realistic model
 if __name__ == "__main__":
@@ -0,0 +1,392 @@
+import time
+import uuid
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import insert, select, func, text
+
+from database_schema import (
+    db, User, WellnessData, RiskPrediction, RiskCategory, Alert, Survey, SurveyQuestion,
+    SurveyResponse, ChatMessage, Resource, ADSyncLog, activate_model_version
+)
+from feature_store import write_features
+from rolling_features import write_trend_histories
+from risk_rollups import rebuild_risk_rollups
+from risk_trends import rebuild_risk_trends
+from response_cache import bump_epoch
+from stress_predictor import RAW_FEATURE_COLUMNS, RISK_SCORES, TREND_METRICS
+from wellness_ingest import INTEGER_COLUMNS, METRIC_RANGES
+
+DEPARTMENTS = [
+    'Engineering', 'Sales', 'Marketing', 'Finance', 'Human Resources',
+    'Operations', 'Customer Success', 'Product', 'Legal', 'IT'
+]
+OFFICES = ['Seattle', 'New York', 'Chicago', 'Austin', 'London', 'Remote']
+FIRST_NAMES = [
+    'Alex', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn', 'Parker',
+    'Maria', 'Wei', 'Aisha', 'Carlos', 'Priya', 'Olga', 'Kenji', 'Fatima', 'Liam', 'Noah',
+    'Emma', 'Sofia', 'Mateo', 'Chloe', 'Ethan', 'Amara', 'Yusuf', 'Hana', 'Diego', 'Lena'
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Chen', 'Garcia', 'Patel', 'Kim', 'Nguyen', 'Rodriguez', 'Okafor', 'Müller',
+    'Rossi', 'Tanaka', 'Silva', 'Cohen', 'Ivanova', 'Brown', 'Williams', 'Haddad', 'Larsen', 'Singh',
+    'Lopez', 'Novak', 'Anderson', 'Dubois', 'Kowalski', 'Ahmed', 'Murphy', 'Sato', 'Costa', 'Berg'
+]
+IC_TITLES = ['Associate', 'Analyst', 'Specialist', 'Senior Specialist', 'Lead']
+
+# Week-to-week noise per metric (RAW_FEATURE_COLUMNS order)
+WEEKLY_NOISE = np.array([3.0, 2.0, 1.0, 0.5, 0.5, 3.0, 0.7, 0.5, 0.5, 0.3, 0.5, 0.5, 0.0])
+# Change over the year for employees who are burning out (improving ones get -0.5x)
+DETERIORATION = np.array([8.0, 6.0, 1.0, -2.0, -3.0, 8.0, 2.0, -2.5, -1.0, -0.8, 1.0, -1.0, 0.0])
+SURVEY_SCORE_COLUMNS = ['manager_support_score', 'work_life_balance_score', 'team_collaboration_score', 'role_clarity_score']
+
+SURVEY_QUESTIONS = [
+    ('How would you rate your work-life balance?', 'scale', 'work_life_balance_score'),
+    ('How supported do you feel by your manager?', 'scale', 'manager_support_score'),
+    ('How manageable is your current workload?', 'scale', 'deadline_pressure'),
+    ('How well does your team collaborate?', 'scale', 'team_collaboration_score'),
+    ('Is there anything else you would like to share?', 'text', None)
+]
+SURVEY_COMMENTS = [
+    'Too many meetings this quarter.', 'Deadlines have been very tight.', 'Team is great, workload is high.',
+    'I would like more clarity on priorities.', 'Things have improved recently.', 'Feeling a bit burned out.'
+]
+CHAT_EXCHANGES = [
+    ('How can I reduce stress?', 'stress_management',
+     'Try scheduling short breaks every 90 minutes and blocking focus time in your calendar.'),
+    ('What does my risk score mean?', 'metrics_explanation',
+     'Your score summarizes workload, support and balance signals from recent weeks.'),
+    ('I have too many meetings', 'workload',
+     'Consider declining meetings without an agenda and batching the rest on fewer days.'),
+    ('Can I talk to someone?', 'support_request',
+     'Our Employee Assistance Program is available 24/7 - see the resource library for details.'),
+    ('How do I take time off?', 'time_off',
+     'Request leave in the HR portal; your manager will be notified automatically.')
+]
+RESOURCES = [
+    ('Employee Assistance Program', 'mental_health'),
+    ('Managing Stress at Work', 'stress_management'),
+    ('Mindfulness in 10 Minutes', 'stress_management'),
+    ('Setting Healthy Boundaries', 'work_life_balance'),
+    ('Effective Meeting Habits', 'work_life_balance'),
+    ('Recognizing Burnout', 'mental_health'),
+    ('Planning Your Time Off', 'work_life_balance'),
+    ('Talking to Your Manager About Workload', 'stress_management')
+]
+
+USER_CHUNK_SIZE = 5000
+INSERT_BATCH_SIZE = 20000
+
+
+def _build_hierarchy(n_employees, rng):
+    """Breadth-first org tree: manager ids, levels and departments
+    
+    User 1 is the CEO with one VP per department; every later user gets a
+    random span of 3-12 reports until everyone is placed, so ids are
+    assigned level by level and a manager always precedes their reports.
+    """
+    spans = rng.integers(3, 13, n_employees)
+    spans[0] = len(DEPARTMENTS)
+    child_starts = 2 + np.concatenate([[0], np.cumsum(spans)[:-1]])
+    ids = np.arange(1, n_employees + 1)
+    manager_ids = np.searchsorted(child_starts, ids, side='right')
+    manager_ids[0] = 0
+    
+    levels = np.zeros(n_employees, dtype=int)
+    departments = np.full(n_employees, -1)
+    departments[1:min(n_employees, len(DEPARTMENTS) + 1)] = np.arange(min(n_employees - 1, len(DEPARTMENTS)))
+    for _ in range(64):  # Depth is logarithmic; this converges in a handful of passes
+        parent = manager_ids[1:] - 1
+        new_levels = np.concatenate([[0], levels[parent] + 1])
+        new_departments = np.where(departments >= 0, departments, np.concatenate([[-1], departments[parent]]))
+        if np.array_equal(new_levels, levels) and np.array_equal(new_departments, departments):
+            break
+        levels, departments = new_levels, new_departments
+    
+    has_reports = np.bincount(manager_ids, minlength=n_employees + 1)[1:] > 0
+    return manager_ids, levels, departments, has_reports
+
+
+def _user_rows(n_employees, created_at, rng):
+    manager_ids, levels, departments, has_reports = _build_hierarchy(n_employees, rng)
+    first = rng.integers(0, len(FIRST_NAMES), n_employees)
+    last = rng.integers(0, len(LAST_NAMES), n_employees)
+    offices = rng.integers(0, len(OFFICES), n_employees)
+    ic_titles = rng.integers(0, len(IC_TITLES), n_employees)
+    guids = rng.bytes(16 * n_employees)
+    
+    rows = []
+    for i in range(n_employees):
+        user_id = i + 1
+        department = DEPARTMENTS[departments[i]] if departments[i] >= 0 else 'Executive'
+        if levels[i] == 0:
+            title, role = 'Chief Executive Officer', 'admin'
+        elif levels[i] == 1:
+            title, role = f'VP of {department}', 'manager'
+        elif has_reports[i]:
+            title, role = ('Director' if levels[i] == 2 else 'Manager'), 'manager'
+        else:
+            title, role = f'{department} {IC_TITLES[ic_titles[i]]}', 'employee'
+        if department == 'Human Resources' and role != 'employee':
+            role = 'hr'
+        
+        first_name, last_name = FIRST_NAMES[first[i]], LAST_NAMES[last[i]]
+        rows.append({
+            'id': user_id,
+            'employee_id': f'S{user_id:06d}',
+            'email': f'{first_name}.{last_name}.{user_id}@synthetic.workwell.test'.lower(),
+            'display_name': f'{first_name} {last_name}',
+            'department': department,
+            'title': title,
+            'manager_id': int(manager_ids[i]) or None,
+            'office': OFFICES[offices[i]],
+            'role': role,
+            'ad_guid': str(uuid.UUID(bytes=guids[16 * i:16 * i + 16])),
+            'created_at': created_at,
+            'updated_at': created_at
+        })
+    return rows
+
+
+def _weekly_metrics(profiles, weeks, rng):
+    """(users, weeks, metrics) array: each user's profile plus drift and weekly noise"""
+    n_users = len(profiles)
+    base = profiles[RAW_FEATURE_COLUMNS].astype(float)
+    base = base.fillna(base.mean()).to_numpy()
+    
+    trend = np.zeros(n_users)
+    trend[rng.random(n_users) < 0.12] = 1.0   # Burning out over the year
+    trend[rng.random(n_users) < 0.08] = -0.5  # Recovering
+    progress = np.linspace(0, 1, weeks)
+    
+    values = (base[:, np.newaxis, :]
+              + trend[:, np.newaxis, np.newaxis] * progress[np.newaxis, :, np.newaxis] * DETERIORATION
+              + rng.normal(0, 1, (n_users, weeks, len(RAW_FEATURE_COLUMNS))) * WEEKLY_NOISE)
+    
+    # Tenure grows by a month every ~4.3 weeks, ending at the profile's tenure
+    tenure = RAW_FEATURE_COLUMNS.index('job_tenure_months')
+    values[:, :, tenure] = base[:, np.newaxis, tenure] - (weeks - 1 - np.arange(weeks)) * 12 / 52
+    
+    # Clip only to each metric's physical domain (what ingest accepts), so weeks cover the training data's range
+    for j, col in enumerate(RAW_FEATURE_COLUMNS):
+        low, high = METRIC_RANGES[col]
+        values[:, :, j] = np.clip(values[:, :, j], low, high)
+        if col in INTEGER_COLUMNS:
+            values[:, :, j] = np.round(values[:, :, j])
+        if col in SURVEY_SCORE_COLUMNS:
+            values[:, :, j][rng.random((n_users, weeks)) < 0.04] = np.nan  # Skipped survey items
+    return values
+
+
+def _column_values(array, integer=False):
+    """Python list for executemany, with NaN as None"""
+    missing = np.isnan(array)
+    values = (np.nan_to_num(array).astype(np.int64) if integer else array).astype(object)
+    values[missing] = None
+    return values.tolist()
+
+
+def _insert_batched(connection, table, rows):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        connection.execute(insert(table), rows[start:start + INSERT_BATCH_SIZE])
+
+
+def _reset_database():
+    db.drop_all()
+    db.create_all()
+
+
+def load_synthetic_org(predictor, n_employees=1000, weeks=52, seed=7, end_date=None, reset=False,
+                       model_name='realistic_mental_health_model'):
+    """Fill every table with a deterministic synthetic organization for load testing
+    
+    The data depends only on (n_employees, weeks, seed); end_date (default:
+    the Monday of the current week) just positions it in time. Refuses to
+    run against a database that already has users unless reset=True, which
+    drops and recreates all tables.
+    """
+    start = time.perf_counter()
+    end_date = end_date or date.today() - timedelta(days=date.today().weekday())
+    week_dates = [end_date - timedelta(weeks=weeks - 1 - w) for w in range(weeks)]
+    created_at = datetime.combine(week_dates[0] - timedelta(days=7), datetime.min.time())
+    
+    if reset:
+        _reset_database()
+    elif db.session.execute(select(func.count()).select_from(User)).scalar():
+        raise ValueError("Database already has users; pass reset=True to replace everything")
+    db.session.remove()
+    
+    seeds = np.random.SeedSequence(seed).spawn(2)
+    org_rng = np.random.default_rng(seeds[0])
+    users = _user_rows(n_employees, created_at, org_rng)
+    manager_of = {row['id']: row['manager_id'] for row in users}
+    counts = {'users': len(users)}
+    
+    with db.engine.begin() as connection:
+        _insert_batched(connection, User.__table__, users)
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), :max_id)"),
+                               {'max_id': n_employees})
+        
+        survey_id = connection.execute(insert(Survey.__table__).values(
+            title='Quarterly Wellness Pulse', description='Short quarterly check-in', active=True,
+            created_at=created_at
+        )).inserted_primary_key[0]
+        question_ids = []
+        for order, (question, kind, _) in enumerate(SURVEY_QUESTIONS, start=1):
+            question_ids.append(connection.execute(insert(SurveyQuestion.__table__).values(
+                survey_id=survey_id, question_text=question, question_type=kind, question_order=order,
+                scale_min=1 if kind == 'scale' else None, scale_max=10 if kind == 'scale' else None
+            )).inserted_primary_key[0])
+        
+        _insert_batched(connection, Resource.__table__, [
+            {'title': title, 'category': category, 'description': f'{title} - self-paced guide',
+             'url': f'https://intranet.example.com/wellness/{i + 1}', 'views': int(org_rng.integers(0, 5000)),
+             'created_at': created_at, 'updated_at': created_at}
+            for i, (title, category) in enumerate(RESOURCES)
+        ])
+        _insert_batched(connection, ADSyncLog.__table__, [
+            {'sync_start': datetime.combine(day, datetime.min.time()) + timedelta(hours=2),
+             'sync_end': datetime.combine(day, datetime.min.time()) + timedelta(hours=2, minutes=4),
+             'status': 'success', 'users_synced': n_employees, 'groups_synced': len(DEPARTMENTS) * 3, 'errors': 0}
+            for day in week_dates
+        ])
+    
+    # Monthly predictions (every 4th week, ending with the latest) and quarterly surveys
+    prediction_weeks = [w for w in range(weeks) if (weeks - 1 - w) % 4 == 0]
+    survey_weeks = [w for w in range(weeks) if (weeks - 1 - w) % 13 == 0]
+    counts.update(wellness_data=0, risk_predictions=0, alerts=0, survey_responses=0, chat_messages=0)
+    
+    profile_chunks = predictor.iter_realistic_data(n_employees, seed=seed, chunk_size=USER_CHUNK_SIZE)
+    chunk_seeds = seeds[1].spawn(-(-n_employees // USER_CHUNK_SIZE))
+    for chunk_index, (profiles, chunk_seed) in enumerate(zip(profile_chunks, chunk_seeds)):
+        rng = np.random.default_rng(chunk_seed)
+        user_ids = np.arange(len(profiles)) + chunk_index * USER_CHUNK_SIZE + 1
+        values = _weekly_metrics(profiles, weeks, rng)
+        n_users = len(user_ids)
+        
+        # Wellness rows, user-major
+        flat = values.reshape(n_users * weeks, len(RAW_FEATURE_COLUMNS))
+        columns = {
+            col: _column_values(flat[:, j], integer=col in INTEGER_COLUMNS)
+            for j, col in enumerate(RAW_FEATURE_COLUMNS)
+        }
+        row_user_ids = np.repeat(user_ids, weeks).tolist()
+        row_dates = week_dates * n_users
+        row_created = [datetime.combine(day, datetime.min.time()) + timedelta(hours=20) for day in week_dates] * n_users
+        wellness_rows = [
+            dict(zip(['user_id', 'date', 'created_at', *RAW_FEATURE_COLUMNS], row))
+            for row in zip(row_user_ids, row_dates, row_created, *columns.values())
+        ]
+        
+        # Score the monthly snapshots in one batch
+        snapshot = values[:, prediction_weeks, :].reshape(-1, len(RAW_FEATURE_COLUMNS))
+        scored = predictor.predict_risk_batch(snapshot)
+        classes = scored['classes']
+        prediction_rows, alert_rows = [], []
+        latest_week = prediction_weeks[-1]
+        for k, (category, confidence, probabilities, priority) in enumerate(zip(
+            scored['predicted_risk_category'], scored['confidence_score'],
+            scored['class_probabilities'], scored['intervention_priority']
+        )):
+            user_id = int(user_ids[k // len(prediction_weeks)])
+            week = prediction_weeks[k % len(prediction_weeks)]
+            predicted_at = datetime.combine(week_dates[week], datetime.min.time()) + timedelta(hours=6)
+            prediction_rows.append({
+                'user_id': user_id, 'prediction_date': predicted_at, 'created_at': predicted_at,
+                'risk_category': RiskCategory(category), 'risk_score': float(RISK_SCORES[category]),
+                'confidence_score': float(confidence),
+                'class_probabilities': dict(zip(classes, probabilities.tolist())),
+                'model_version': predictor.model_version, 'intervention_priority': priority
+            })
+            if category in ('High', 'Critical') and rng.random() < 0.5:
+                current = week == latest_week
+                status = ('acknowledged' if rng.random() < 0.3 else 'active') if current else 'resolved'
+                alert_rows.append({
+                    'user_id': user_id, 'alert_type': 'high_risk',
+                    'message': f'{category} burnout risk detected ({confidence:.0%} confidence)',
+                    'priority': 'urgent' if category == 'Critical' else 'high', 'status': status,
+                    'created_at': predicted_at,
+                    'acknowledged_at': predicted_at + timedelta(days=1) if status != 'active' else None,
+                    'resolved_at': predicted_at + timedelta(days=int(rng.integers(3, 21))) if status == 'resolved' else None,
+                    'acknowledged_by': manager_of[user_id] if status != 'active' else None
+                })
+        
+        # Overtime alerts for the latest week
+        hours = values[:, -1, RAW_FEATURE_COLUMNS.index('hours_per_week')]
+        latest_at = datetime.combine(week_dates[-1], datetime.min.time()) + timedelta(hours=7)
+        for user_id, worked in zip(user_ids[hours > 60], hours[hours > 60]):
+            alert_rows.append({
+                'user_id': int(user_id), 'alert_type': 'overtime', 'priority': 'medium', 'status': 'active',
+                'message': f'Worked {worked:.0f} hours last week', 'created_at': latest_at,
+                'acknowledged_at': None, 'resolved_at': None, 'acknowledged_by': None
+            })
+        
+        # Quarterly pulse survey, answered by ~65% of employees each time
+        response_rows = []
+        for week in survey_weeks:
+            answered_at = datetime.combine(week_dates[week], datetime.min.time()) + timedelta(days=2, hours=10)
+            responders = np.flatnonzero(rng.random(n_users) < 0.65)
+            comments = rng.integers(0, len(SURVEY_COMMENTS), n_users)
+            commented = rng.random(n_users) < 0.3
+            for question_id, (_, kind, source) in zip(question_ids, SURVEY_QUESTIONS):
+                if source is not None:
+                    answers = values[responders, week, RAW_FEATURE_COLUMNS.index(source)]
+                    if source == 'deadline_pressure':
+                        answers = 11 - answers  # Manageable is the inverse of pressure
+                    answers = np.clip(np.round(np.nan_to_num(answers, nan=5.0)), 1, 10).astype(int)
+                    response_rows.extend(
+                        {'user_id': int(user_ids[i]), 'survey_id': survey_id, 'question_id': question_id,
+                         'response_value': str(answer), 'response_date': answered_at}
+                        for i, answer in zip(responders, answers)
+                    )
+                else:
+                    response_rows.extend(
+                        {'user_id': int(user_ids[i]), 'survey_id': survey_id, 'question_id': question_id,
+                         'response_value': SURVEY_COMMENTS[comments[i]], 'response_date': answered_at}
+                        for i in responders if commented[i]
+                    )
+        
+        # A few assistant conversations for ~25% of employees
+        chat_rows = []
+        for i in np.flatnonzero(rng.random(n_users) < 0.25):
+            for _ in range(int(rng.integers(1, 4))):
+                question, intent, answer = CHAT_EXCHANGES[int(rng.integers(0, len(CHAT_EXCHANGES)))]
+                asked_at = (datetime.combine(week_dates[int(rng.integers(0, weeks))], datetime.min.time())
+                            + timedelta(hours=int(rng.integers(8, 19)), minutes=int(rng.integers(0, 60))))
+                chat_rows.append({'user_id': int(user_ids[i]), 'message_type': 'user', 'message_text': question,
+                                  'timestamp': asked_at, 'confidence_score': None, 'intent_detected': None})
+                chat_rows.append({'user_id': int(user_ids[i]), 'message_type': 'ai', 'message_text': answer,
+                                  'timestamp': asked_at + timedelta(seconds=2),
+                                  'confidence_score': round(float(rng.uniform(0.7, 0.98)), 3),
+                                  'intent_detected': intent})
+        
+        with db.engine.begin() as connection:
+            _insert_batched(connection, WellnessData.__table__, wellness_rows)
+            write_features(connection, row_user_ids, row_dates, flat)
+            write_trend_histories(connection, user_ids.tolist(), [week_dates[-1]] * n_users,
+                                  values[:, :, [RAW_FEATURE_COLUMNS.index(metric) for metric in TREND_METRICS]])
+            _insert_batched(connection, RiskPrediction.__table__, prediction_rows)
+            _insert_batched(connection, Alert.__table__, alert_rows)
+            _insert_batched(connection, SurveyResponse.__table__, response_rows)
+            _insert_batched(connection, ChatMessage.__table__, chat_rows)
+        counts['wellness_data'] += len(wellness_rows)
+        counts['risk_predictions'] += len(prediction_rows)
+        counts['alerts'] += len(alert_rows)
+        counts['survey_responses'] += len(response_rows)
+        counts['chat_messages'] += len(chat_rows)
+    
+    # Bulk inserts bypass the ORM hooks, so build the rollups and trends in one pass each
+    rollups = rebuild_risk_rollups()
+    trends = rebuild_risk_trends()
+    with db.engine.begin() as connection:
+        bump_epoch(connection)
+    activate_model_version(model_name, predictor.model_version, predictor.training_metrics)
+    
+    return {
+        'counts': counts,
+        'rollups': rollups,
+        'trend_buckets': trends['buckets'],
+        'seed': seed,
+        'end_date': end_date.isoformat(),
+        'seconds': round(time.perf_counter() - start, 1)
+    }
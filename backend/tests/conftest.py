@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend's flat modules the way the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stress_predictor import RealisticMentalHealthPredictor
+
+
+@pytest.fixture(scope='session')
+def training_data():
+    return RealisticMentalHealthPredictor().create_realistic_data(n_samples=1000, seed=7)
+
+
+@pytest.fixture(scope='session')
+def predictor(training_data):
+    """A small model trained once per test run"""
+    predictor = RealisticMentalHealthPredictor()
+    predictor.train_realistic_model(training_data, n_jobs=1, cv_folds=0, verbose=False)
+    return predictor
+
+
+@pytest.fixture
+def db_app():
+    """A bare app on an empty in-memory SQLite database, inside an app context"""
+    from flask import Flask
+    from database_schema import db
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope='session')
+def app_backend():
+    """The app module, imported against an in-memory database without loading the model"""
+    os.environ['DATABASE_URL'] = 'sqlite://'
+    os.environ['MODEL_LOADING'] = 'lazy'
+    os.environ['FEATURE_BACKFILL'] = '0'
+    import app_backend
+    return app_backend
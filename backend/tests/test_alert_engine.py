@@ -0,0 +1,29 @@
+from datetime import date, datetime
+
+from database_schema import db, WellnessData, WellnessTrends
+from alert_engine import alert_rules, evaluate_alerts
+
+OVERTIME_ONLY = alert_rules({'score_jump': None, 'critical_risk': None, 'survey_decline': None})
+
+
+def _prediction(user_id):
+    return {
+        'id': user_id, 'user_id': user_id, 'prediction_date': datetime(2024, 3, 1),
+        'risk_category': 'Low', 'risk_score': 20.0, 'confidence_score': 0.9
+    }
+
+
+def test_overtime_rule_reads_the_latest_week_without_stored_trends(db_app):
+    # Bulk-inserted weeks skip the ORM listeners, so no user has trend state
+    db.session.execute(db.insert(WellnessData), [
+        {'user_id': 1, 'date': date(2024, 2, 5), 'hours_per_week': 40, 'overtime_hours': 2},
+        {'user_id': 1, 'date': date(2024, 2, 12), 'hours_per_week': 65, 'overtime_hours': 10},
+        {'user_id': 2, 'date': date(2024, 2, 5), 'hours_per_week': 70, 'overtime_hours': 20},
+        {'user_id': 2, 'date': date(2024, 2, 12), 'hours_per_week': 42, 'overtime_hours': 3},
+    ])
+    assert db.session.execute(db.select(WellnessTrends)).first() is None
+    
+    rows = evaluate_alerts(db.session.connection(), [_prediction(1), _prediction(2)], rules=OVERTIME_ONLY)
+    assert [(row['user_id'], row['alert_type'], row['message']) for row in rows] == [
+        (1, 'overtime', 'Worked 65 hours last week')
+    ]
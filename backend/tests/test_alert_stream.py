@@ -0,0 +1,30 @@
+import logging
+
+import pytest
+
+import alert_stream
+from alert_stream import AlertHub
+
+
+class Stop(BaseException):
+    """Ends the hub's poll loop at its first sleep"""
+
+
+def test_poll_failure_is_logged_with_traceback(db_app, monkeypatch, caplog):
+    hub = AlertHub(poll_seconds=0)
+    
+    def fail():
+        raise RuntimeError('database is locked')
+    
+    def stop(seconds):
+        raise Stop()
+    
+    monkeypatch.setattr(hub, 'poll', fail)
+    monkeypatch.setattr(alert_stream.time, 'sleep', stop)
+    with caplog.at_level(logging.ERROR), pytest.raises(Stop):
+        hub._run(db_app)
+    
+    [record] = caplog.records
+    assert record.name == db_app.logger.name
+    assert record.getMessage() == 'Alert hub poll failed'
+    assert record.exc_info[0] is RuntimeError
@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.fixture
+def client(app_backend, monkeypatch):
+    # Login identities are dicts, which PyJWT's subject check rejects
+    monkeypatch.setitem(app_backend.app.config, 'JWT_VERIFY_SUB', False)
+    return app_backend.app.test_client()
+
+
+def _auth(client, email, password):
+    token = client.post('/api/auth/login', json={'email': email, 'password': password}).json['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_manager_cannot_read_another_managers_dashboard(client):
+    manager = _auth(client, 'mike.chen@corp.company.com', 'manager123')
+    hr = _auth(client, 'lisa.anderson@corp.company.com', 'hr123')
+    
+    assert client.get('/api/dashboard/manager/1002', headers=manager).status_code == 200
+    # Also when the other team's dashboard is already cached
+    assert client.get('/api/dashboard/manager/1003', headers=hr).status_code == 200
+    assert client.get('/api/dashboard/manager/1003', headers=manager).status_code == 403
+    assert client.get('/api/dashboard/manager/1003/alerts/stream', headers=manager).status_code == 403
+    # Their own team passes the check and reaches the lookup (no users rows in the empty database)
+    assert client.get('/api/dashboard/manager/1002/alerts/stream', headers=manager).status_code == 404
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database_schema import db, BatchScoringRun
+from batch_scoring import STALE_RUN_AFTER, MAX_RESUME_AGE, _start_run, _write_chunk
+
+
+def _add_run(status, heartbeat_age, started_age=timedelta(hours=1), model_version='v1'):
+    now = datetime.utcnow()
+    run = BatchScoringRun(
+        model_version=model_version, chunk_size=10, status=status, claimed_by='other-host:1:abcd',
+        started_at=now - started_age, heartbeat_at=now - heartbeat_age, last_user_id=40, users_scored=40
+    )
+    db.session.add(run)
+    db.session.commit()
+    return run.id
+
+
+def test_failed_run_is_claimed_and_resumed(db_app):
+    run_id = _add_run('failed', timedelta(seconds=5))
+    run, resumed = _start_run('v1', 10, True, 'me:2:ef01')
+    assert resumed and run.id == run_id
+    assert (run.status, run.claimed_by, run.last_user_id) == ('running', 'me:2:ef01', 40)
+
+
+def test_stale_running_run_is_claimed(db_app):
+    run_id = _add_run('running', STALE_RUN_AFTER + timedelta(minutes=1))
+    run, resumed = _start_run('v1', 10, True, 'me:2:ef01')
+    assert resumed and run.id == run_id and run.claimed_by == 'me:2:ef01'
+
+
+def test_live_running_run_is_not_taken_over(db_app):
+    _add_run('running', timedelta(seconds=30))
+    with pytest.raises(RuntimeError, match='still in progress'):
+        _start_run('v1', 10, True, 'me:2:ef01')
+    assert BatchScoringRun.query.count() == 1
+
+
+def test_old_or_other_model_runs_start_a_new_run(db_app):
+    old_id = _add_run('failed', MAX_RESUME_AGE, started_age=MAX_RESUME_AGE + timedelta(hours=1))
+    run, resumed = _start_run('v1', 10, True, 'me:2:ef01')
+    assert not resumed and run.id != old_id and run.last_user_id == 0
+    
+    other_id = _add_run('failed', timedelta(seconds=5), model_version='v0')
+    run, resumed = _start_run('v1', 10, True, 'me:2:ef01')
+    assert not resumed and run.id not in (old_id, other_id)
+
+
+def test_previous_owner_cannot_write_after_takeover(db_app):
+    _add_run('failed', timedelta(seconds=5))
+    first, _ = _start_run('v1', 10, True, 'me:2:ef01')
+    # The first process stalls, its run is marked failed and another process resumes it
+    db.session.execute(
+        db.update(BatchScoringRun).where(BatchScoringRun.id == first.id).values(status='failed')
+    )
+    db.session.commit()
+    second, resumed = _start_run('v1', 10, True, 'you:3:2345')
+    assert resumed and second.id == first.id
+    
+    # The first process's next chunk is refused and writes nothing
+    result = {
+        'classes': ['Low'], 'predicted_risk_category': ['Low'], 'confidence_score': [0.9],
+        'class_probabilities': [np.array([1.0])], 'intervention_priority': ['low'], 'model_version': 'v1'
+    }
+    with pytest.raises(RuntimeError, match='claimed by another process'):
+        _write_chunk(first.id, 'me:2:ef01', [1], result)
+    db.session.expire_all()
+    assert db.session.get(BatchScoringRun, first.id).last_user_id == 40
@@ -0,0 +1,27 @@
+import numpy as np
+
+from compiled_forest import CompiledForest
+
+
+def test_predict_proba_matches_sklearn_bit_for_bit(predictor):
+    data = predictor.create_realistic_data(n_samples=3000, seed=11)
+    X = predictor._feature_frame(data).to_numpy(dtype=np.float64)
+    
+    expected = predictor.model.predict_proba(predictor.scaler.transform(X))
+    assert isinstance(predictor.engine, CompiledForest)
+    assert np.array_equal(predictor.engine.predict_proba(X), expected)
+
+
+def test_predict_matches_sklearn(predictor):
+    data = predictor.create_realistic_data(n_samples=500, seed=12)
+    X = predictor._feature_frame(data).to_numpy(dtype=np.float64)
+    
+    expected = predictor.model.predict(predictor.scaler.transform(X))
+    assert np.array_equal(predictor.engine.predict(X), expected)
+
+
+def test_single_row_input(predictor):
+    data = predictor.create_realistic_data(n_samples=10, seed=13)
+    X = predictor._feature_frame(data).to_numpy(dtype=np.float64)
+    
+    assert np.array_equal(predictor.engine.predict_proba(X[0]), predictor.engine.predict_proba(X[:1]))
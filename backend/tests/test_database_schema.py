@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import event, insert
+
+from database_schema import db, User, RiskPrediction, RiskCategory, get_team_risk_summary
+
+CATEGORIES = list(RiskCategory)
+
+
+def _add_user(user_id, manager_id=None):
+    db.session.add(User(
+        id=user_id, employee_id=f'E{user_id}', email=f'user{user_id}@corp.test', display_name=f'User {user_id}',
+        manager_id=manager_id
+    ))
+
+
+@pytest.fixture
+def seeded_org(db_app):
+    """Manager 1 with 40 reports (30 with predictions), 10 of which manage 3 people each"""
+    rng = np.random.default_rng(5)
+    _add_user(1)
+    for user_id in range(2, 42):
+        _add_user(user_id, manager_id=1)
+    next_id = 42
+    for manager_id in range(2, 12):
+        for _ in range(3):
+            _add_user(next_id, manager_id=manager_id)
+            next_id += 1
+    db.session.commit()
+    
+    start = datetime(2026, 1, 1)
+    rows = []
+    for user_id in list(range(2, 32)) + list(range(42, next_id)):
+        for week in range(int(rng.integers(1, 6))):
+            rows.append({
+                'user_id': user_id, 'prediction_date': start + timedelta(weeks=week),
+                'risk_category': CATEGORIES[int(rng.integers(len(CATEGORIES)))], 'risk_score': 50.0,
+                'confidence_score': 0.7, 'model_version': 'test'
+            })
+    db.session.execute(insert(RiskPrediction.__table__), rows)
+    db.session.commit()
+    db.session.remove()
+
+
+def _summary_by_loop(manager_ids):
+    """The original implementation: one latest-prediction query per report"""
+    summary = {'total': 0, 'low_risk': 0, 'medium_risk': 0, 'high_risk': 0, 'critical_risk': 0}
+    keys = dict(zip(CATEGORIES, ['low_risk', 'medium_risk', 'high_risk', 'critical_risk']))
+    for manager_id in manager_ids:
+        for subordinate in db.session.get(User, manager_id).subordinates:
+            latest = RiskPrediction.query.filter_by(user_id=subordinate.id).order_by(
+                RiskPrediction.prediction_date.desc()
+            ).first()
+            if latest:
+                summary['total'] += 1
+                summary[keys[latest.risk_category]] += 1
+    return summary
+
+
+def _count_statements(fn):
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, len(statements)
+
+
+def test_team_summary_matches_per_report_loop_in_two_queries(seeded_org):
+    summary, statements = _count_statements(lambda: get_team_risk_summary(1))
+    assert statements == 2
+    assert summary == _summary_by_loop([1])
+    assert summary['total'] == 30
+
+
+def test_indirect_team_summary_covers_the_reporting_chain(seeded_org):
+    summary, statements = _count_statements(lambda: get_team_risk_summary(1, include_indirect=True))
+    assert statements == 2
+    assert summary == {
+        key: direct + indirect for (key, direct), indirect in
+        zip(_summary_by_loop([1]).items(), _summary_by_loop(range(2, 12)).values())
+    }
+
+
+def test_unknown_manager(seeded_org):
+    assert get_team_risk_summary(9999) is None
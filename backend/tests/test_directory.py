@@ -0,0 +1,118 @@
+import threading
+from contextlib import ExitStack
+
+import pytest
+from ldap3.core.exceptions import LDAPCommunicationError
+
+import directory as directory_module
+from directory import Directory, DirectoryUnavailable
+
+EMPLOYEE = 'sarah.johnson@corp.company.com'
+MANAGER = 'mike.chen@corp.company.com'
+
+
+class Clock:
+    """Stands in for time.monotonic in the directory module"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(directory_module.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def make_directory(app_backend):
+    def make(**options):
+        return Directory(url='mock', seed=app_backend.MOCK_AD_USERS, **options)
+    return make
+
+
+def test_cached_user_is_searched_again_after_ttl(make_directory, clock):
+    directory = make_directory(ttl_seconds=300)
+    assert directory.get_user(EMPLOYEE)['role'] == 'employee'
+    assert directory.get_user(EMPLOYEE.upper())['employeeId'] == '1001'
+    assert (directory.searches, directory.hits, directory.misses) == (1, 1, 1)
+    
+    clock.now += 301
+    directory.get_user(EMPLOYEE)
+    assert (directory.searches, directory.misses) == (2, 2)
+
+
+def test_unknown_user_is_cached_for_the_negative_ttl(make_directory, clock):
+    directory = make_directory(ttl_seconds=300, negative_ttl_seconds=60)
+    assert directory.get_user('nobody@corp.company.com') is None
+    assert directory.get_user('nobody@corp.company.com') is None
+    assert (directory.searches, directory.negative_hits) == (1, 1)
+    
+    clock.now += 61
+    assert directory.get_user('nobody@corp.company.com') is None
+    assert directory.searches == 2
+
+
+def test_connection_that_fails_is_discarded(make_directory, monkeypatch):
+    directory = make_directory()
+    with directory.pool.connection() as connection:
+        pass
+    
+    def fail(*args, **kwargs):
+        raise LDAPCommunicationError('connection reset')
+    
+    monkeypatch.setattr(connection, 'search', fail)
+    with pytest.raises(DirectoryUnavailable):
+        directory.get_user(EMPLOYEE)
+    assert directory.pool.stats() == {'size': 4, 'idle': 0, 'opened': 1, 'discarded': 1}
+    
+    # The next lookup opens a fresh connection
+    assert directory.get_user(EMPLOYEE)['role'] == 'employee'
+    assert directory.pool.stats()['opened'] == 2
+
+
+def test_exhausted_pool_raises_directory_unavailable(make_directory):
+    directory = make_directory(pool_size=1, pool_timeout=0.05)
+    with directory.pool.connection():
+        with pytest.raises(DirectoryUnavailable, match='No directory connection became free'):
+            directory.get_user(EMPLOYEE)
+
+
+def test_exhausted_pool_is_a_503(app_backend, monkeypatch):
+    monkeypatch.setattr(app_backend.directory.pool, 'timeout', 0.05)
+    client = app_backend.app.test_client()
+    with ExitStack() as stack:
+        for _ in range(app_backend.directory.pool.size):
+            stack.enter_context(app_backend.directory.pool.connection())
+        response = client.post('/api/auth/login', json={'email': MANAGER, 'password': 'manager123'})
+    assert response.status_code == 503
+
+
+def test_empty_password_is_refused_without_a_bind(make_directory):
+    directory = make_directory()
+    assert directory.authenticate(MANAGER, '') is None
+    assert directory.authenticate(MANAGER, None) is None
+    assert (directory.searches, directory.binds) == (0, 0)
+    
+    assert directory.authenticate(MANAGER, 'wrong') is None
+    assert directory.authenticate(MANAGER, 'manager123')['role'] == 'manager'
+    assert directory.binds == 2
+
+
+def test_counters_are_consistent_across_threads(make_directory):
+    directory = make_directory(pool_size=2)
+    
+    def login():
+        for _ in range(10):
+            directory.authenticate(EMPLOYEE, 'employee123')
+    
+    threads = [threading.Thread(target=login) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (directory.searches, directory.binds) == (80, 80)
@@ -0,0 +1,90 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import model_artifact
+from model_artifact import write_artifact, read_artifact, read_manifest
+
+
+def _write(directory, value, files=None):
+    return write_artifact(str(directory), {'a': np.full(3, value)}, {'model_version': f'v{value}'}, files=files)
+
+
+def _served(directory):
+    manifest, arrays = read_artifact(str(directory))
+    return manifest['model_version'], arrays['a'].tolist()
+
+
+def _versions(directory):
+    return sorted(glob.glob(f"{directory}.v-*"))
+
+
+def test_each_write_repoints_the_link_and_keeps_one_previous_version(tmp_path):
+    directory = tmp_path / 'model'
+    _write(directory, 1)
+    first = os.path.realpath(directory)
+    _write(directory, 2)
+    second = os.path.realpath(directory)
+    
+    assert os.path.islink(directory)
+    assert _served(directory) == ('v2', [2, 2, 2])
+    assert _versions(directory) == sorted([first, second])
+    
+    _write(directory, 3)
+    assert _served(directory) == ('v3', [3, 3, 3])
+    assert first not in _versions(directory) and len(_versions(directory)) == 2
+
+
+def test_failed_write_leaves_the_previous_version_served(tmp_path):
+    directory = tmp_path / 'model'
+    _write(directory, 1)
+    before = _versions(directory)
+    
+    def broken(path):
+        raise OSError('disk full')
+    
+    with pytest.raises(OSError):
+        _write(directory, 2, files={'extra.bin': broken})
+    assert _served(directory) == ('v1', [1, 1, 1])
+    assert _versions(directory) == before
+    assert not glob.glob(f"{directory}.lnk-*")
+
+
+def test_legacy_directory_is_replaced_by_a_link(tmp_path):
+    directory = tmp_path / 'model'
+    directory.mkdir()
+    (directory / 'stale.txt').write_text('old layout')
+    
+    _write(directory, 1)
+    assert os.path.islink(directory)
+    assert _served(directory) == ('v1', [1, 1, 1])
+    assert len(_versions(directory)) == 2  # The new version and the moved-aside directory
+
+
+def test_legacy_directory_is_restored_when_the_swap_fails(tmp_path, monkeypatch):
+    directory = tmp_path / 'model'
+    directory.mkdir()
+    (directory / 'stale.txt').write_text('old layout')
+    
+    def refuse(source, destination):
+        raise OSError('replace failed')
+    
+    monkeypatch.setattr(model_artifact.os, 'replace', refuse)
+    with pytest.raises(OSError):
+        _write(directory, 1)
+    assert not os.path.islink(directory)
+    assert (directory / 'stale.txt').read_text() == 'old layout'
+    assert _versions(directory) == []
+    assert not glob.glob(f"{directory}.lnk-*")
+
+
+def test_reader_that_resolved_the_link_keeps_its_version(tmp_path):
+    directory = tmp_path / 'model'
+    _write(directory, 1)
+    resolved = os.path.realpath(directory)
+    _write(directory, 2)
+    
+    assert read_manifest(resolved)['model_version'] == 'v1'
+    assert read_manifest(str(directory))['model_version'] == 'v2'
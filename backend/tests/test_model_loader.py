@@ -0,0 +1,21 @@
+import logging
+import os
+
+from model_loader import ModelLoader
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models',
+                          'realistic_mental_health_model')
+
+
+def test_on_load_failure_is_logged_with_traceback(caplog):
+    def fail(predictor):
+        raise RuntimeError('model_metrics unavailable')
+    
+    loader = ModelLoader(MODEL_PATH, mode='lazy', on_load=fail)
+    with caplog.at_level(logging.ERROR, logger='model_loader'):
+        predictor = loader.get()
+    
+    assert predictor is not None  # The model still goes live
+    [record] = caplog.records
+    assert 'on_load failed' in record.getMessage()
+    assert record.exc_info[0] is RuntimeError
@@ -0,0 +1,40 @@
+from prediction_cache import PredictionCache
+from stress_predictor import RAW_FEATURE_COLUMNS, TREND_FEATURE_COLUMNS
+
+
+def _record(**overrides):
+    record = dict.fromkeys(RAW_FEATURE_COLUMNS, 5.0)
+    record.update(dict.fromkeys(TREND_FEATURE_COLUMNS, 1.0))
+    record.update(overrides)
+    return record
+
+
+def test_equal_inputs_share_an_entry():
+    cache = PredictionCache()
+    calls = []
+    cache.get_or_compute(_record(hours_per_week=42), 'v1', calls.append)
+    cache.get_or_compute(_record(hours_per_week=42.0000000001), 'v1', calls.append)
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_different_trend_values_miss(predictor):
+    cache = PredictionCache()
+    rising = _record(**{name: 2.0 for name in TREND_FEATURE_COLUMNS if 'slope' in name})
+    falling = _record(**{name: -2.0 for name in TREND_FEATURE_COLUMNS if 'slope' in name})
+    assert cache.make_key(rising, 'v1') != cache.make_key(falling, 'v1')
+    
+    first = cache.get_or_compute(rising, predictor.model_version, predictor.predict_risk)
+    second = cache.get_or_compute(falling, predictor.model_version, predictor.predict_risk)
+    assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 0
+    assert first == predictor.predict_risk(rising)
+    assert second == predictor.predict_risk(falling)
+
+
+def test_new_model_version_clears_the_cache():
+    cache = PredictionCache()
+    calls = []
+    cache.get_or_compute(_record(), 'v1', calls.append)
+    cache.get_or_compute(_record(), 'v2', calls.append)
+    assert len(calls) == 2
+    assert cache.stats()['model_version'] == 'v2'
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from database_schema import db, WellnessData, WellnessTrends
+from stress_predictor import TREND_METRICS, TREND_WINDOWS, TREND_FEATURE_COLUMNS, TREND_VERSION
+from rolling_features import TrendState, rolling_trend_matrix, rebuild_trends
+
+START = date(2024, 1, 1)
+
+
+def _weekly_values(lengths, seed=0):
+    """Drifting weekly TREND_METRICS values with a fifth missing, users numbered from 1"""
+    rng = np.random.default_rng(seed)
+    user_ids = np.repeat(np.arange(1, len(lengths) + 1), lengths)
+    values = np.array([45.0, 6.0, 12.0]) + rng.normal(0, 1, (len(user_ids), len(TREND_METRICS))) * [8.0, 4.0, 6.0]
+    values += np.arange(len(user_ids))[:, np.newaxis] % 17 * 0.3
+    values[rng.random(values.shape) < 0.2] = np.nan
+    return user_ids, values
+
+
+def _direct(history):
+    """Trend features of the last row of history, one window and metric at a time"""
+    row = []
+    for j in range(len(TREND_METRICS)):
+        for window in TREND_WINDOWS:
+            y = history[-window:, j]
+            x = np.arange(len(y))[~np.isnan(y)]
+            y = y[~np.isnan(y)]
+            if len(y) == 0:
+                row += [np.nan] * 3
+            elif len(y) == 1:
+                row += [y[0], 0.0, 0.0]
+            else:
+                row += [y.mean(), np.polyfit(x, y, 1)[0], y.std(ddof=1)]
+    return row
+
+
+def test_pushed_state_matches_full_recompute():
+    # Short histories, missing weeks and many resyncs
+    lengths = [1, 2, 3, 5, 11, 12, 13, 40, 300]
+    user_ids, values = _weekly_values(lengths)
+    values[user_ids == 5] = 50.0  # Constant weeks: volatility must be exactly 0
+    
+    reference = rolling_trend_matrix(user_ids, values)
+    incremental = np.empty_like(reference)
+    direct = np.empty_like(reference)
+    for user_id in np.unique(user_ids):
+        rows = np.flatnonzero(user_ids == user_id)
+        state = TrendState()
+        for i in rows:
+            state.push(values[i])
+            state = TrendState.from_dict(state.to_dict())  # Persisted between weeks
+            incremental[i] = state.features()
+            direct[i] = _direct(values[rows[0]:i + 1])
+        assert np.allclose(TrendState.from_history(values[rows]).features(), incremental[rows[-1]],
+                           equal_nan=True, rtol=1e-9, atol=1e-9)
+    
+    assert np.array_equal(np.isnan(incremental), np.isnan(reference))
+    assert np.allclose(incremental, reference, equal_nan=True, rtol=1e-9, atol=1e-9)
+    assert np.allclose(reference, direct, equal_nan=True, rtol=1e-9, atol=1e-9)
+    assert np.all(incremental[user_ids == 5][:, 2::3] == 0.0)
+
+
+def _stored_trends():
+    rows = db.session.execute(
+        db.select(WellnessTrends).order_by(WellnessTrends.user_id)
+    ).scalars().all()
+    return {
+        row.user_id: (row.last_date, row.weeks_seen, row.trend_version,
+                      np.array([getattr(row, col) for col in TREND_FEATURE_COLUMNS], dtype=float))
+        for row in rows
+    }
+
+
+def _assert_stored_match(user_ids, values, days):
+    """Stored trends equal a full recompute over these weekly rows (sorted by user, then date)"""
+    stored = _stored_trends()
+    reference = rolling_trend_matrix(user_ids, values)
+    for user_id in np.unique(user_ids):
+        rows = np.flatnonzero(user_ids == user_id)
+        last_date, weeks_seen, trend_version, features = stored[user_id]
+        assert (last_date, weeks_seen, trend_version) == (days[rows[-1]], len(rows), TREND_VERSION)
+        assert np.allclose(features, reference[rows[-1]], equal_nan=True, rtol=1e-9, atol=1e-9)
+    return stored
+
+
+def _add_week(user_id, day, values):
+    metrics = {metric: None if np.isnan(value) else float(value) for metric, value in zip(TREND_METRICS, values)}
+    db.session.add(WellnessData(user_id=int(user_id), date=day, **metrics))
+
+
+def test_stored_trends_follow_weeks_written_through_the_orm(db_app):
+    lengths = [1, 3, 13, 30]
+    user_ids, values = _weekly_values(lengths, seed=1)
+    days = np.empty(len(user_ids), dtype=object)
+    for user_id in np.unique(user_ids):
+        rows = np.flatnonzero(user_ids == user_id)
+        # Weeks are rows, not calendar weeks: some dates skip a week
+        offsets = np.cumsum([1 + (k % 5 == 4) for k in range(len(rows))])
+        days[rows] = [START + timedelta(weeks=int(offset)) for offset in offsets]
+    
+    # Hold back a few weeks from the middle of the longer histories: arriving last, they rebuild their users
+    late = np.zeros(len(user_ids), dtype=bool)
+    for user_id in (3, 4):
+        rows = np.flatnonzero(user_ids == user_id)
+        late[rows[[2, 7]]] = True
+    
+    # Users in turn, one week per flush and sometimes several weeks in one: pushed onto the stored state
+    for user_id in np.unique(user_ids):
+        for n, i in enumerate(np.flatnonzero((user_ids == user_id) & ~late)):
+            _add_week(user_id, days[i], values[i])
+            if n % 3 != 1:
+                db.session.commit()
+        db.session.commit()
+    _assert_stored_match(user_ids[~late], values[~late], days[~late])
+    
+    for i in np.flatnonzero(late):
+        _add_week(user_ids[i], days[i], values[i])
+        db.session.commit()
+    
+    # A corrected week rebuilds its user too
+    correction = np.flatnonzero(user_ids == 4)[10]
+    values[correction, 0] += 20.0
+    week = db.session.execute(
+        db.select(WellnessData).filter_by(user_id=4, date=days[correction])
+    ).scalar_one()
+    week.hours_per_week = float(values[correction, 0])
+    db.session.commit()
+    
+    stored = _assert_stored_match(user_ids, values, days)
+    
+    assert rebuild_trends(db.session.connection(), list(stored)) == len(lengths)
+    db.session.commit()
+    rebuilt = _stored_trends()
+    for user_id, (last_date, weeks_seen, trend_version, features) in stored.items():
+        assert rebuilt[user_id][:3] == (last_date, weeks_seen, trend_version)
+        assert np.allclose(rebuilt[user_id][3], features, equal_nan=True, rtol=1e-9, atol=1e-9)
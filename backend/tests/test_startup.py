@@ -0,0 +1,20 @@
+import pytest
+
+from check_startup import IMPORT_BUDGET_SECONDS, measure_import
+
+
+@pytest.fixture(scope='module')
+def startup():
+    return measure_import()
+
+
+def test_import_is_within_budget(startup):
+    assert startup['seconds'] <= IMPORT_BUDGET_SECONDS
+
+
+def test_import_does_not_touch_the_model(startup):
+    assert startup['model_state'] == 'not_loaded'
+
+
+def test_import_defers_heavy_modules(startup):
+    assert startup['loaded_modules'] == []
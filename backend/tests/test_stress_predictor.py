@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from stress_predictor import RAW_FEATURE_COLUMNS
+
+
+def test_single_record_path_matches_dataframe_path(predictor, training_data):
+    # Includes the generator's missing values, so imputation is covered too
+    sample = training_data[RAW_FEATURE_COLUMNS].head(500)
+    assert sample.isna().any().any()
+    for record in sample.to_dict('records'):
+        fast = predictor.predict_risk(record)['class_probabilities']
+        reference = predictor.predict_risk_batch(pd.DataFrame([record]))['class_probabilities'][0]
+        assert np.array_equal(list(fast.values()), reference)
+
+
+def test_single_record_path_imputes_null_fields(predictor):
+    record = dict.fromkeys(RAW_FEATURE_COLUMNS)
+    record.update(hours_per_week=58, overtime_hours=18)
+    fast = predictor.predict_risk(record)['class_probabilities']
+    reference = predictor.predict_risk_batch(pd.DataFrame([record]))
+    assert np.array_equal(list(fast.values()), reference['class_probabilities'][0])
@@ -0,0 +1,195 @@
+import csv
+import io
+import os
+import time
+import pandas as pd
+from sqlalchemy import select
+
+from database_schema import db, User, WellnessData, WELLNESS_METRIC_COLUMNS
+from feature_store import refresh_features
+from rolling_features import update_trends
+from response_cache import bump_data_versions
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+INTEGER_COLUMNS = {'meetings_per_day', 'after_hours_emails', 'weekend_work_days', 'job_tenure_months'}
+
+# Plausible value ranges; anything outside is rejected rather than clipped
+METRIC_RANGES = {
+    'hours_per_week': (0, 168),
+    'overtime_hours': (0, 168),
+    'meetings_per_day': (0, 24),
+    'after_hours_emails': (0, 10000),
+    'weekend_work_days': (0, 7),  # Days per week
+    'manager_support_score': (1, 10),
+    'work_life_balance_score': (1, 10),
+    'team_collaboration_score': (1, 10),
+    'role_clarity_score': (1, 10),
+    'deadline_pressure': (1, 10),
+    'vacation_days_taken': (0, 366),
+    'daily_breaks': (0, 24),
+    'job_tenure_months': (0, 1200)
+}
+
+MAX_REPORTED_REJECTIONS = 20
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where the resource module is unavailable)"""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KB on Linux
+
+
+def _read_chunks(source, fmt, chunk_size):
+    if fmt == 'csv':
+        return pd.read_csv(source, chunksize=chunk_size, dtype=str, skipinitialspace=True)
+    if fmt == 'ndjson':
+        return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False)
+    raise ValueError(f"Unsupported format '{fmt}' (expected 'csv' or 'ndjson')")
+
+
+def _upsert_statement(columns):
+    """INSERT ... ON CONFLICT (user_id, date) DO UPDATE for the columns present in the file"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk upsert is not implemented for {dialect}")
+    
+    stmt = insert(WellnessData.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'date'],
+        set_={col: stmt.excluded[col] for col in columns}
+    )
+
+
+def _validate_chunk(chunk, employee_ids, user_ids):
+    """Coerce one chunk; returns (clean DataFrame, Series of rejection reasons)"""
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+    
+    def reject(mask, reason):
+        reasons[mask & (reasons == '')] = reason
+    
+    if 'user_id' in chunk.columns:
+        ids = pd.to_numeric(chunk['user_id'], errors='coerce')
+        reject(~ids.isin(user_ids), 'unknown user_id')
+    elif 'employee_id' in chunk.columns:
+        ids = chunk['employee_id'].astype(str).str.strip().map(employee_ids)
+        reject(ids.isna(), 'unknown employee_id')
+    else:
+        raise ValueError("Input needs a 'user_id' or 'employee_id' column")
+    
+    if 'date' not in chunk.columns:
+        raise ValueError("Input needs a 'date' column")
+    dates = pd.to_datetime(chunk['date'], errors='coerce', format='ISO8601')
+    reject(dates.isna(), 'invalid date')
+    
+    clean = pd.DataFrame({'user_id': ids, 'date': dates.dt.date}, index=chunk.index)
+    for col in WELLNESS_METRIC_COLUMNS:
+        if col not in chunk.columns:
+            continue
+        raw = chunk[col]
+        blank = raw.isna() | (raw.astype(str).str.strip() == '')
+        values = pd.to_numeric(raw.where(~blank), errors='coerce')
+        reject(values.isna() & ~blank, f'{col}: not a number')
+        low, high = METRIC_RANGES[col]
+        reject(values.notna() & ~values.between(low, high), f'{col}: outside {low}-{high}')
+        clean[col] = values.round().astype('Int64') if col in INTEGER_COLUMNS else values
+    
+    valid = reasons == ''
+    clean = clean[valid].astype({'user_id': 'int64'})
+    # Last occurrence wins for repeated (user_id, date) keys within a chunk
+    clean = clean.drop_duplicates(['user_id', 'date'], keep='last')
+    return clean, reasons[~valid]
+
+
+def ingest_wellness_stream(source, fmt='csv', chunk_size=10000, chunks_per_transaction=5, rejects_path=None):
+    """Stream CSV/NDJSON wellness metrics into wellness_data, upserting on (user_id, date)
+    
+    Reads chunk_size rows at a time, so memory stays flat regardless of the
+    input size. Each transaction covers chunks_per_transaction chunks.
+    Returns a report with throughput, rejected rows and peak RSS.
+    """
+    start = time.perf_counter()
+    with db.engine.connect() as connection:
+        employee_ids = dict(connection.execute(select(User.employee_id, User.id)).all())
+    user_ids = set(employee_ids.values())
+    
+    report = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0, 'rejections': []}
+    header_lines = 1 if fmt == 'csv' else 0
+    rejects_file = rejects_writer = None
+    statement = None
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    chunks_in_transaction = 0
+    try:
+        for chunk in _read_chunks(source, fmt, chunk_size):
+            chunk = chunk.reset_index(drop=True)
+            first_line = report['rows_read'] + header_lines + 1
+            report['rows_read'] += len(chunk)
+            
+            clean, rejected = _validate_chunk(chunk, employee_ids, user_ids)
+            report['rows_rejected'] += len(rejected)
+            for index, reason in rejected.items():
+                if len(report['rejections']) >= MAX_REPORTED_REJECTIONS:
+                    break
+                report['rejections'].append({'line': first_line + index, 'reason': reason})
+            if rejects_path and len(rejected):
+                if rejects_writer is None:
+                    rejects_file = open(rejects_path, 'w', newline='')
+                    rejects_writer = csv.writer(rejects_file)
+                    rejects_writer.writerow(['line', 'reason'])
+                rejects_writer.writerows((first_line + index, reason) for index, reason in rejected.items())
+            
+            if clean.empty:
+                continue
+            if statement is None:
+                metric_columns = [col for col in WELLNESS_METRIC_COLUMNS if col in clean.columns]
+                statement = _upsert_statement(metric_columns)
+            records = clean.astype(object).where(clean.notna(), None).to_dict('records')
+            connection.execute(statement, records)
+            # Upserts may update only some metrics, so recompute from the merged rows
+            keys = list(zip(clean['user_id'].tolist(), clean['date'].tolist()))
+            refresh_features(connection, keys)
+            update_trends(connection, keys)
+            bump_data_versions(connection, clean['user_id'].unique().tolist())
+            report['rows_written'] += len(records)
+            
+            chunks_in_transaction += 1
+            if chunks_in_transaction >= chunks_per_transaction:
+                transaction.commit()
+                transaction = connection.begin()
+                chunks_in_transaction = 0
+        transaction.commit()
+    except Exception:
+        transaction.rollback()
+        raise
+    finally:
+        connection.close()
+        if rejects_file is not None:
+            rejects_file.close()
+    
+    elapsed = time.perf_counter() - start
+    report['seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows_read'] / elapsed) if elapsed else None
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def ingest_wellness_file(path, fmt=None, **kwargs):
+    """ingest_wellness_stream for a file, guessing the format from its extension"""
+    if fmt is None:
+        fmt = 'ndjson' if os.path.splitext(path)[1].lower() in ('.ndjson', '.jsonl', '.json') else 'csv'
+    with open(path, 'r', encoding='utf-8', newline='') as source:
+        return ingest_wellness_stream(source, fmt, **kwargs)
+
+
+def ingest_wellness_request(stream, fmt, **kwargs):
+    """ingest_wellness_stream for a raw (binary) HTTP request body"""
+    return ingest_wellness_stream(io.TextIOWrapper(stream, encoding='utf-8', newline=''), fmt, **kwargs)
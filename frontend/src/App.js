@@ -2,6 +2,19 @@ import React, { useState, useEffect } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, LineChart, Line, PieChart, Pie, Cell, ResponsiveContainer } from 'recharts';
 import { Bell, Users, TrendingUp, AlertTriangle, CheckCircle, User, Settings, Calendar, MessageSquare, Target, Brain, Heart, Shield, Cpu, Database, Activity, Zap, Eye, EyeOff, BarChart3, MessageCircle, Send, X, Minimize2, Maximize2, DollarSign, Lock, Globe, Loader2 } from 'lucide-react';
 
+// Alert timestamps arrive as ISO UTC times so cached API responses stay valid; show them relative to now
+const timeAgo = (timestamp) => {
+  const seconds = (Date.now() - new Date(timestamp).getTime()) / 1000;
+  if (Number.isNaN(seconds)) return timestamp;
+  for (const [unit, size] of [['day', 86400], ['hour', 3600], ['minute', 60]]) {
+    if (seconds >= size) {
+      const count = Math.floor(seconds / size);
+      return `${count} ${unit}${count !== 1 ? 's' : ''} ago`;
+    }
+  }
+  return 'just now';
+};
+
 const WorkWellAI = () => {
   // Authentication state
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -1608,7 +1621,7 @@ const WorkWellAI = () => {
                       <p className="font-medium text-gray-800">{alert.employee}</p>
                       <p className="text-sm text-gray-600">{alert.message}</p>
                     </div>
-                    <span className="text-xs text-gray-500">{alert.timestamp}</span>
+                    <span className="text-xs text-gray-500">{timeAgo(alert.timestamp)}</span>
                   </div>
                 </div>
               ))}
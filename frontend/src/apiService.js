@@ -57,6 +57,14 @@ export const authAPI = {
 
 // Dashboard APIs
 export const dashboardAPI = {
+  // Landing page in one request: { user, dashboard, survey, health, errors? }.
+  // Pass e.g. ['dashboard', 'survey'] to fetch only those sections.
+  getBootstrap: async (sections) => {
+    const params = sections ? { sections: sections.join(',') } : {};
+    const response = await api.get('/api/bootstrap', { params });
+    return response.data;
+  },
+  
   getEmployeeDashboard: async (employeeId) => {
     const response = await api.get(`/api/dashboard/employee/${employeeId}`);
     return response.data;
@@ -67,6 +75,17 @@ export const dashboardAPI = {
     return response.data;
   },
   
+  // Live alerts for the manager's team; call .close() on the result to stop.
+  // The browser reconnects on its own and resumes from the last event id.
+  subscribeToManagerAlerts: (managerId, onAlert, onReset) => {
+    const token = encodeURIComponent(localStorage.getItem('access_token') || '');
+    const source = new EventSource(`${API_BASE_URL}/api/dashboard/manager/${managerId}/alerts/stream?jwt=${token}`);
+    source.addEventListener('alert', (event) => onAlert(JSON.parse(event.data)));
+    // Missed too many events to replay: refetch the dashboard
+    source.addEventListener('reset', () => onReset && onReset());
+    return source;
+  },
+  
   getHRDashboard: async () => {
     const response = await api.get('/api/dashboard/hr');
     return response.data;
@@ -105,6 +124,11 @@ export const predictionAPI = {
     const response = await api.post('/api/predict/risk', employeeData);
     return response.data;
   },
+  
+  predictRiskBatch: async (employees) => {
+    const response = await api.post('/api/predict/risk/batch', { employees });
+    return response.data;
+  },
 };
 
 // Health check